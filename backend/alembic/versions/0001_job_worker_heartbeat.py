@@ -0,0 +1,66 @@
+"""Record which process runs a job and when it last reported in
+
+Revision ID: 0001
+Revises:
+Create Date: 2026-10-18
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0001"
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+def _create_jobs():
+    """The jobs table as of this revision, for databases create_all has not set up"""
+    op.create_table(
+        "jobs",
+        sa.Column("id", sa.String(), primary_key=True),
+        sa.Column("kind", sa.String(), nullable=False),
+        sa.Column("status", sa.String(), nullable=False),
+        sa.Column("priority", sa.Integer(), nullable=False),
+        sa.Column("owner_id", sa.Integer(), sa.ForeignKey("users.id"), nullable=False),
+        sa.Column("project_id", sa.Integer(), nullable=True),
+        sa.Column("params", sa.JSON(), nullable=True),
+        sa.Column("progress", sa.Float(), nullable=True),
+        sa.Column("result", sa.JSON(), nullable=True),
+        sa.Column("result_path", sa.String(), nullable=True),
+        sa.Column("result_filename", sa.String(), nullable=True),
+        sa.Column("result_media_type", sa.String(), nullable=True),
+        sa.Column("error", sa.Text(), nullable=True),
+        sa.Column("worker_id", sa.String(), nullable=True),
+        sa.Column("heartbeat_at", sa.DateTime(timezone=True), nullable=True),
+        sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.func.now()),
+        sa.Column("started_at", sa.DateTime(timezone=True), nullable=True),
+        sa.Column("finished_at", sa.DateTime(timezone=True), nullable=True)
+    )
+    op.create_index("ix_jobs_id", "jobs", ["id"])
+    op.create_index("ix_jobs_status", "jobs", ["status"])
+    op.create_index("ix_jobs_project_id", "jobs", ["project_id"])
+    op.create_index("ix_jobs_worker_id", "jobs", ["worker_id"])
+
+
+def upgrade():
+    if not sa.inspect(op.get_bind()).has_table("jobs"):
+        _create_jobs()
+        return
+
+    # Databases created by create_all already have the columns
+    columns = {column["name"] for column in sa.inspect(op.get_bind()).get_columns("jobs")}
+    with op.batch_alter_table("jobs") as batch:
+        if "worker_id" not in columns:
+            batch.add_column(sa.Column("worker_id", sa.String(), nullable=True))
+        if "heartbeat_at" not in columns:
+            batch.add_column(sa.Column("heartbeat_at", sa.DateTime(timezone=True), nullable=True))
+    indexes = {index["name"] for index in sa.inspect(op.get_bind()).get_indexes("jobs")}
+    if "ix_jobs_worker_id" not in indexes:
+        op.create_index("ix_jobs_worker_id", "jobs", ["worker_id"])
+
+
+def downgrade():
+    op.drop_index("ix_jobs_worker_id", table_name="jobs")
+    with op.batch_alter_table("jobs") as batch:
+        batch.drop_column("heartbeat_at")
+        batch.drop_column("worker_id")
@@ -0,0 +1,142 @@
+"""Move documents stored whole in projects.generated_content into project_nodes
+
+Rows written before project_nodes existed keep every section/slide in the
+project's JSON; split them so reads and writes of one node never parse the
+whole document.
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-18
+"""
+import json
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+revision = "0002"
+down_revision = "0001"
+branch_labels = None
+depends_on = None
+
+BATCH_SIZE = 200
+
+projects = sa.table(
+    "projects",
+    sa.column("id", sa.Integer),
+    sa.column("document_type", sa.String),
+    sa.column("generated_content", sa.Text)
+)
+project_nodes = sa.table(
+    "project_nodes",
+    sa.column("project_id", sa.Integer),
+    sa.column("position", sa.Integer),
+    sa.column("kind", sa.String),
+    sa.column("title", sa.String),
+    sa.column("body", sa.JSON)
+)
+
+
+def _node_key(document_type: str) -> str:
+    # The Enum column stores member names (PPTX), older rows may hold values (pptx)
+    return "slides" if str(document_type).lower() == "pptx" else "sections"
+
+
+def _create_project_nodes():
+    """The project_nodes table as of this revision, for databases create_all has not set up"""
+    op.create_table(
+        "project_nodes",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("project_id", sa.Integer(), sa.ForeignKey("projects.id", ondelete="CASCADE"), nullable=False),
+        sa.Column("position", sa.Integer(), nullable=False),
+        sa.Column("kind", sa.String(), nullable=False),
+        sa.Column("title", sa.String(), nullable=True),
+        sa.Column("body", sa.JSON().with_variant(postgresql.JSONB(), "postgresql"), nullable=False),
+        sa.Column("updated_at", sa.DateTime(timezone=True), server_default=sa.func.now()),
+        sa.UniqueConstraint("project_id", "position", name="uq_project_nodes_position")
+    )
+    op.create_index("ix_project_nodes_id", "project_nodes", ["id"])
+    op.create_index("ix_project_nodes_project_id", "project_nodes", ["project_id"])
+
+
+def upgrade():
+    bind = op.get_bind()
+
+    if not sa.inspect(bind).has_table("project_nodes"):
+        _create_project_nodes()
+
+    last_id = 0
+    while True:
+        rows = bind.execute(
+            sa.select(projects.c.id, projects.c.document_type, projects.c.generated_content)
+            .where(projects.c.id > last_id, projects.c.generated_content.isnot(None))
+            .order_by(projects.c.id)
+            .limit(BATCH_SIZE)
+        ).all()
+        if not rows:
+            break
+        for project_id, document_type, raw in rows:
+            last_id = project_id
+            key = _node_key(document_type)
+            try:
+                content = json.loads(raw)
+            except ValueError:
+                continue
+            if not isinstance(content, dict) or key not in content:
+                continue
+
+            bodies = content.pop(key) or []
+            if bodies:
+                bind.execute(project_nodes.insert(), [
+                    {
+                        "project_id": project_id,
+                        "position": position,
+                        "kind": key[:-1],
+                        "title": str(body.get("title", "")) if isinstance(body, dict) else None,
+                        "body": body
+                    }
+                    for position, body in enumerate(bodies)
+                ])
+            bind.execute(
+                projects.update().where(projects.c.id == project_id).values(generated_content=json.dumps(content))
+            )
+
+
+def downgrade():
+    # Code before this revision reads the whole document from generated_content,
+    # so put every project's sections/slides back there before dropping the table
+    bind = op.get_bind()
+
+    last_id = 0
+    while True:
+        rows = bind.execute(
+            sa.select(projects.c.id, projects.c.document_type, projects.c.generated_content)
+            .where(projects.c.id > last_id, projects.c.generated_content.isnot(None))
+            .order_by(projects.c.id)
+            .limit(BATCH_SIZE)
+        ).all()
+        if not rows:
+            break
+        bodies_by_project = {}
+        for project_id, body in bind.execute(
+            sa.select(project_nodes.c.project_id, project_nodes.c.body)
+            .where(project_nodes.c.project_id.in_([row[0] for row in rows]))
+            .order_by(project_nodes.c.project_id, project_nodes.c.position)
+        ):
+            bodies_by_project.setdefault(project_id, []).append(body)
+
+        for project_id, document_type, raw in rows:
+            last_id = project_id
+            try:
+                content = json.loads(raw)
+            except ValueError:
+                continue
+            key = _node_key(document_type)
+            if not isinstance(content, dict) or key in content:
+                continue
+            content[key] = bodies_by_project.get(project_id, [])
+            bind.execute(
+                projects.update().where(projects.c.id == project_id).values(generated_content=json.dumps(content))
+            )
+
+    op.drop_table("project_nodes")
@@ -0,0 +1,26 @@
+"""Index projects by owner and creation time for the project list
+
+The list filters on the owner and pages newest first by created_at; tables
+created by create_all before the index was declared do not have it.
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-18
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0003"
+down_revision = "0002"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    indexes = {index["name"] for index in sa.inspect(op.get_bind()).get_indexes("projects")}
+    if "ix_projects_owner_created" not in indexes:
+        op.create_index("ix_projects_owner_created", "projects", ["owner_id", "created_at"])
+
+
+def downgrade():
+    op.drop_index("ix_projects_owner_created", table_name="projects")
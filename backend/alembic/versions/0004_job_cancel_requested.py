@@ -0,0 +1,26 @@
+"""Let a job's owner cancel it while another process runs it
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-18
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0004"
+down_revision = "0003"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Databases created by create_all already have the column
+    columns = {column["name"] for column in sa.inspect(op.get_bind()).get_columns("jobs")}
+    if "cancel_requested" not in columns:
+        with op.batch_alter_table("jobs") as batch:
+            batch.add_column(sa.Column("cancel_requested", sa.Boolean(), nullable=False, server_default=sa.false()))
+
+
+def downgrade():
+    with op.batch_alter_table("jobs") as batch:
+        batch.drop_column("cancel_requested")
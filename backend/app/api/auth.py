@@ -1,44 +1,58 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Query, status
 from fastapi.security import OAuth2PasswordBearer, OAuth2PasswordRequestForm
-from sqlalchemy.orm import Session
+from jose import JWTError
+from sqlalchemy.ext.asyncio import AsyncSession
 from datetime import timedelta
+from typing import Optional
 
-from app.database import get_db
+from app.database import get_async_db, AsyncSessionLocal
 from app.models.user import User
 from app.schemas.auth import UserRegister, Token, UserLogin
 from app.schemas.user import UserResponse
 from app.services.auth import (
     authenticate_user,
-    get_password_hash,
     create_access_token,
-    get_user_by_email,
+    decode_access_token,
+    get_user_by_email_async,
     ACCESS_TOKEN_EXPIRE_MINUTES
 )
+from app.services.password_hasher import password_hasher, HashQueueFull
+from app.services.user_cache import user_cache
 
 router = APIRouter(prefix="/api/auth", tags=["authentication"])
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="api/auth/login")
 
-def get_current_user(
-    token: str = Depends(oauth2_scheme),
-    db: Session = Depends(get_db)
+async def get_current_user(token: str = Depends(oauth2_scheme)) -> User:
+    """
+    Get current authenticated user from JWT token
+    Tokens carry the user id, so most requests are a signature check plus a
+    user cache hit; the users table is only read on a miss.
+    """
+    return await _user_from_token(token)
+
+async def get_current_user_from_query(
+    token: str = Query(..., description="Access token; EventSource cannot send an Authorization header")
 ) -> User:
-    """Get current authenticated user from JWT token"""
-    from jose import JWTError, jwt
-    import os
-    
+    """
+    Like get_current_user, with the token in the query string
+    Only for the EventSource stream route: a token in a URL ends up in access
+    logs and browser history, so no other endpoint accepts it.
+    """
+    return await _user_from_token(token)
+
+async def _user_from_token(token: str) -> User:
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
         headers={"WWW-Authenticate": "Bearer"},
     )
-    
+
     try:
-        SECRET_KEY = os.getenv("SECRET_KEY", "your-secret-key-change-in-production")
-        ALGORITHM = "HS256"
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+        payload = decode_access_token(token)
         email: str = payload.get("sub")
         is_guest: bool = payload.get("is_guest", False)
+        user_id: Optional[int] = payload.get("uid")
         
         if email is None:
             raise credentials_exception
@@ -58,19 +72,34 @@ def get_current_user(
             
     except JWTError:
         raise credentials_exception
-    
-    user = get_user_by_email(db, email=email)
+
+    user = user_cache.get(user_id) if user_id is not None else None
     if user is None:
-        raise credentials_exception
+        async with AsyncSessionLocal() as db:
+            if user_id is not None:
+                user = await db.get(User, user_id)
+            else:
+                # Tokens issued before the uid claim
+                user = await get_user_by_email_async(db, email=email)
+        if user is None or user.email != email:
+            raise credentials_exception
+        user_cache.put(user)
     user.is_guest = False  # Add custom attribute for regular users
     return user
 
+def _hash_busy(error: HashQueueFull) -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        detail=str(error),
+        headers={"Retry-After": "5"}
+    )
+
 @router.post("/register", response_model=UserResponse, status_code=status.HTTP_201_CREATED)
-def register(user_data: UserRegister, db: Session = Depends(get_db)):
+async def register(user_data: UserRegister, db: AsyncSession = Depends(get_async_db)):
     """Register a new user"""
     try:
         # Check if user already exists
-        existing_user = get_user_by_email(db, user_data.email)
+        existing_user = await get_user_by_email_async(db, user_data.email)
         if existing_user:
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
@@ -78,7 +107,7 @@ def register(user_data: UserRegister, db: Session = Depends(get_db)):
             )
         
         # Create new user
-        hashed_password = get_password_hash(user_data.password)
+        hashed_password = await password_hasher.hash(user_data.password)
         db_user = User(
             email=user_data.email,
             hashed_password=hashed_password,
@@ -86,10 +115,14 @@ def register(user_data: UserRegister, db: Session = Depends(get_db)):
             is_active=True
         )
         db.add(db_user)
-        db.commit()
-        db.refresh(db_user)
+        await db.commit()
+        await db.refresh(db_user)
         
         return db_user
+    except HTTPException:
+        raise
+    except HashQueueFull as e:
+        raise _hash_busy(e)
     except Exception as e:
         # Catch any other exception and return a 500 error with details
         raise HTTPException(
@@ -98,12 +131,15 @@ def register(user_data: UserRegister, db: Session = Depends(get_db)):
         )
 
 @router.post("/login", response_model=Token)
-def login(
+async def login(
     form_data: OAuth2PasswordRequestForm = Depends(),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Login and get access token"""
-    user = authenticate_user(db, form_data.username, form_data.password)
+    try:
+        user = await authenticate_user(db, form_data.username, form_data.password)
+    except HashQueueFull as e:
+        raise _hash_busy(e)
     if not user:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -113,7 +149,7 @@ def login(
     
     access_token_expires = timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
     access_token = create_access_token(
-        data={"sub": user.email}, expires_delta=access_token_expires
+        data={"sub": user.email, "uid": user.id}, expires_delta=access_token_expires
     )
     
     return {"access_token": access_token, "token_type": "bearer"}
@@ -0,0 +1,232 @@
+from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi.responses import FileResponse
+from pydantic import ValidationError
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+from typing import List, Callable
+import tempfile
+
+from app.database import get_db, AsyncSessionLocal
+from app.models.job import Job, JobKind, JobStatus
+from app.models.project import Project, DocumentType, GenerationMode
+from app.models.user import User
+from app.schemas.job import JobCreate, JobResponse
+from app.schemas.project import ProjectBulkExportRequest
+from app.api.auth import get_current_user
+from app.api.projects import (
+    _load_project,
+    _node_count,
+    _generate_project_content,
+    _refine_project_content,
+    _open_export,
+    _open_pdf_preview,
+    _load_bulk_projects,
+    _bulk_export_entries
+)
+from app.services.bulk_export import stream_zip
+from app.services.job_queue import job_queue, JobOutcome, JobQueueFull
+from app.services.generator_registry import generator_registry
+from app.services.llm_governor import llm_governor, LLMPriority
+
+router = APIRouter(prefix="/api/jobs", tags=["jobs"])
+
+async def _load_job_project(session: AsyncSession, job: Job) -> Project:
+    """Load the project a job works on, still owned by the job's owner"""
+    project = await _load_project(session, job.project_id, job.owner_id)
+    if not project:
+        raise ValueError("Project not found")
+    return project
+
+# Handlers work on the project through their own async session; the job
+# queue records the job row's status and progress.
+
+async def _run_generate(job: Job, report_progress: Callable[[float], None]) -> JobOutcome:
+    mode = GenerationMode(job.params.get("mode", GenerationMode.SINGLE.value))
+    use_cache = not job.params.get("bypass_cache", False)
+    async with AsyncSessionLocal() as session:
+        project = await _load_job_project(session, job)
+        with llm_governor.caller(f"user:{job.owner_id}", LLMPriority.BACKGROUND):
+            await _generate_project_content(generator_registry.get(), session, project, mode, use_cache)
+    return JobOutcome(result={"project_id": project.id})
+
+async def _run_refine(job: Job, report_progress: Callable[[float], None]) -> JobOutcome:
+    async with AsyncSessionLocal() as session:
+        project = await _load_job_project(session, job)
+        if not project.has_content:
+            raise ValueError("No content to refine. Generate content first.")
+        # The document may have changed since the job was submitted
+        section_index = job.params.get("section_index")
+        if section_index is not None and not 0 <= section_index < _node_count(project):
+            raise ValueError(f"Section index {section_index} out of range")
+        with llm_governor.caller(f"user:{job.owner_id}", LLMPriority.BACKGROUND):
+            await _refine_project_content(
+                generator_registry.get(), session, project, job.params["refinement_prompt"], section_index
+            )
+    return JobOutcome(result={"project_id": project.id})
+
+async def _run_export(job: Job, report_progress: Callable[[float], None]) -> JobOutcome:
+    async with AsyncSessionLocal() as session:
+        project = await _load_job_project(session, job)
+    if not project.has_content:
+        raise ValueError("No content to export. Generate content first.")
+    file_stream, filename, media_type, _ = await _open_export(project)
+    return JobOutcome(file_stream=file_stream, filename=filename, media_type=media_type)
+
+async def _run_preview_pdf(job: Job, report_progress: Callable[[float], None]) -> JobOutcome:
+    async with AsyncSessionLocal() as session:
+        project = await _load_job_project(session, job)
+    if not project.has_content:
+        raise ValueError("No content to preview")
+    if project.document_type != DocumentType.PPTX:
+        raise ValueError("PDF preview only available for presentations")
+    pdf_stream, _ = await _open_pdf_preview(project)
+    return JobOutcome(file_stream=pdf_stream, filename=f"{project.title}.pdf", media_type="application/pdf")
+
+async def _run_export_bulk(job: Job, report_progress: Callable[[float], None]) -> JobOutcome:
+    document_type = job.params.get("document_type")
+    async with AsyncSessionLocal() as session:
+        projects = await _load_bulk_projects(
+            session,
+            job.owner_id,
+            job.params.get("project_ids"),
+            DocumentType(document_type) if document_type else None
+        )
+    if not projects:
+        raise ValueError("No projects with content to export")
+
+    # Spooled to an anonymous temp file; the queue copies it to the result file
+    archive = tempfile.TemporaryFile()
+    try:
+        async for data in stream_zip(_bulk_export_entries(projects, report_progress)):
+            archive.write(data)
+    except BaseException:
+        archive.close()
+        raise
+    archive.seek(0)
+    return JobOutcome(
+        result={"projects": len(projects)},
+        file_stream=archive,
+        filename="projects.zip",
+        media_type="application/zip"
+    )
+
+job_queue.register(JobKind.GENERATE.value, _run_generate)
+job_queue.register(JobKind.REFINE.value, _run_refine)
+job_queue.register(JobKind.EXPORT.value, _run_export)
+job_queue.register(JobKind.PREVIEW_PDF.value, _run_preview_pdf)
+job_queue.register(JobKind.EXPORT_BULK.value, _run_export_bulk)
+
+def _get_owned_job(db: Session, job_id: str, current_user: User) -> Job:
+    job = db.query(Job).filter(
+        Job.id == job_id,
+        Job.owner_id == current_user.id
+    ).first()
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
+
+@router.post("/", response_model=JobResponse, status_code=status.HTTP_202_ACCEPTED)
+def submit_job(
+    job_request: JobCreate,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """Queue a generation, refinement, export, preview or bulk export job"""
+    if getattr(current_user, 'is_guest', False):
+        raise HTTPException(status_code=403, detail="Guest users cannot submit background jobs")
+
+    project = None
+    if job_request.kind == JobKind.EXPORT_BULK:
+        # Works on many projects: params hold project_ids and/or document_type
+        try:
+            ProjectBulkExportRequest(**job_request.params)
+        except ValidationError as e:
+            raise HTTPException(status_code=400, detail=f"Invalid bulk export params: {e.errors()}")
+    else:
+        project = db.query(Project).filter(
+            Project.id == job_request.project_id,
+            Project.owner_id == current_user.id
+        ).first()
+
+        if not project:
+            raise HTTPException(status_code=404, detail="Project not found")
+
+    if job_request.kind == JobKind.REFINE:
+        if not job_request.params.get("refinement_prompt"):
+            raise HTTPException(status_code=400, detail="refinement_prompt is required for refine jobs")
+        # Checked here as the refine route does, so the job cannot patch the wrong section
+        section_index = job_request.params.get("section_index")
+        if section_index is not None and (
+            not isinstance(section_index, int) or isinstance(section_index, bool)
+            or not 0 <= section_index < _node_count(project)
+        ):
+            raise HTTPException(status_code=400, detail=f"Section index {section_index} out of range")
+
+    try:
+        return job_queue.submit(
+            db,
+            job_request.kind.value,
+            owner_id=current_user.id,
+            project_id=project.id if project else None,
+            params=job_request.params,
+            priority=job_request.priority
+        )
+    except JobQueueFull as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "5"})
+
+@router.get("/", response_model=List[JobResponse])
+def get_jobs(
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """List the current user's recent jobs"""
+    if getattr(current_user, 'is_guest', False):
+        return []
+
+    return db.query(Job).filter(
+        Job.owner_id == current_user.id
+    ).order_by(Job.created_at.desc()).limit(50).all()
+
+@router.get("/{job_id}", response_model=JobResponse)
+def get_job(
+    job_id: str,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """Poll a job's status and progress"""
+    return _get_owned_job(db, job_id, current_user)
+
+@router.get("/{job_id}/result")
+def get_job_result(
+    job_id: str,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """Fetch the output of a finished job"""
+    job = _get_owned_job(db, job_id, current_user)
+
+    if job.status != JobStatus.SUCCEEDED.value:
+        raise HTTPException(status_code=409, detail=f"Job is {job.status}")
+
+    if job.result_path:
+        return FileResponse(
+            job.result_path,
+            media_type=job.result_media_type,
+            filename=job.result_filename
+        )
+
+    return job.result or {}
+
+@router.delete("/{job_id}", response_model=JobResponse)
+def cancel_job(
+    job_id: str,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """Cancel a queued or running job"""
+    job = _get_owned_job(db, job_id, current_user)
+
+    if job.status not in (JobStatus.QUEUED.value, JobStatus.RUNNING.value):
+        raise HTTPException(status_code=409, detail=f"Job is already {job.status}")
+
+    return job_queue.cancel(db, job)
@@ -0,0 +1,63 @@
+import os
+import secrets
+from typing import Optional
+
+from fastapi import APIRouter, Depends, Header, HTTPException
+
+from app.services.db_pool import pool_stats
+from app.services.generator_registry import generator_registry
+from app.services.generation_cache import generation_cache
+from app.services.generation_runs import generation_runs
+from app.services.llm_governor import llm_governor
+from app.services.password_hasher import password_hasher
+from app.services.slides_copy_pool import slides_copy_pool
+from app.services.slides_templates import slides_template_layouts
+from app.services.user_cache import user_cache
+
+# Operators send this in X-Metrics-Token; the endpoints are off while it is unset
+METRICS_TOKEN = os.getenv("METRICS_TOKEN")
+
+
+def require_metrics_token(x_metrics_token: Optional[str] = Header(None)):
+    """Keep internal load and pool figures away from API users"""
+    if not METRICS_TOKEN:
+        raise HTTPException(status_code=404, detail="Not Found")
+    if not x_metrics_token or not secrets.compare_digest(x_metrics_token, METRICS_TOKEN):
+        raise HTTPException(status_code=401, detail="Invalid metrics token")
+
+
+router = APIRouter(prefix="/api/metrics", tags=["metrics"], dependencies=[Depends(require_metrics_token)])
+
+@router.get("/llm")
+def get_llm_metrics():
+    """Gemini traffic: admission queue depth and wait times, per-model calls, cache hits"""
+    return {
+        "governor": llm_governor.stats(),
+        "generator": generator_registry.stats(),
+        "cache": generation_cache.stats(),
+        "runs": generation_runs.stats()
+    }
+
+
+@router.get("/db")
+def get_db_metrics():
+    """Connection pools: size, connections checked out, overflow in use, checkout waits and latency"""
+    return pool_stats()
+
+
+@router.get("/auth")
+def get_auth_metrics():
+    """User cache hits and misses, and password hashing queue depth and latency"""
+    return {
+        "user_cache": user_cache.stats(),
+        "password_hashing": password_hasher.stats()
+    }
+
+
+@router.get("/exports")
+def get_export_metrics():
+    """Google Slides template layouts and the pool of ready template copies"""
+    return {
+        "slides_templates": slides_template_layouts.stats(),
+        "slides_copy_pool": slides_copy_pool.stats()
+    }
@@ -1,10 +1,14 @@
-from fastapi import APIRouter, Depends, HTTPException, status, Query
-from fastapi.responses import Response
-from sqlalchemy.orm import Session
-from typing import List, Optional
+from fastapi import APIRouter, Depends, Header, HTTPException, status, Query
+from fastapi.responses import Response, StreamingResponse
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import Text, and_, cast, func, or_, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session, lazyload, raiseload, selectinload
+from typing import AsyncIterator, BinaryIO, Callable, List, Optional, Tuple, Union
 
-from app.database import get_db
-from app.models.project import Project, DocumentType
+from app.database import get_db, get_async_db, AsyncSessionLocal
+from app.models.project import Project, DocumentType, GenerationMode
+from app.models.project_node import ProjectNode
 from app.models.user import User
 from app.schemas.project import (
     ProjectCreate, 
@@ -12,17 +16,56 @@ from app.schemas.project import (
     ProjectUpdate,
     ProjectGenerateRequest,
     ProjectRefineRequest,
-    ProjectContentUpdate
+    ProjectContentUpdate,
+    ProjectNodeResponse,
+    ProjectNodeUpdate,
+    ProjectListView,
+    ProjectSummary,
+    ProjectBulkExportRequest
 )
-from app.api.auth import get_current_user
-from app.services.document_generator import DocumentGenerator
-from app.services.file_exporter import FileExporter
+from app.api.auth import get_current_user, get_current_user_from_query
+from app.services.document_generator import DocumentGenerator, RefinementNotApplied
+from app.services.generator_registry import generator_registry
+from app.services.generation_runs import generation_runs, GenerationRun
+from app.services.llm_governor import llm_governor, LLMPriority, LLMBusy
+from app.services.file_exporter import FileExporter, RENDERER_SLIDES
+from app.services.export_cache import export_cache
+from app.services.export_templates import export_templates
+from app.services.slide_renderer import SlideRenderer
+from app.services.export_executor import ExportQueueFull
+from app.services.bulk_export import build_concurrently, stream_zip, BULK_EXPORT_MAX_PROJECTS
+import asyncio
+import base64
+import io
 import json
+import os
 
 from datetime import datetime
 
 router = APIRouter(prefix="/api/projects", tags=["projects"])
 
+# "local" renders previews in-process, "slides" goes through Google Slides
+PDF_PREVIEW_ENGINE = os.getenv("PDF_PREVIEW_ENGINE", "local")
+EXPORT_STREAM_CHUNK = int(os.getenv("EXPORT_STREAM_CHUNK", str(64 * 1024)))  # bytes per response chunk
+# A bulk export waits this many half-second rounds for room in the export pool per file
+BULK_EXPORT_QUEUE_RETRIES = 120
+
+def get_generator() -> DocumentGenerator:
+    """Dependency returning the shared, lifespan-managed DocumentGenerator"""
+    try:
+        return generator_registry.get()
+    except ValueError as e:
+        raise HTTPException(status_code=503, detail=f"Document generation unavailable: {str(e)}")
+
+def _llm_caller(current_user: User):
+    """Attribute model calls to the user's rate bucket and priority lane"""
+    if getattr(current_user, 'is_guest', False):
+        return llm_governor.caller("guest", LLMPriority.GUEST)
+    return llm_governor.caller(f"user:{current_user.id}", LLMPriority.USER)
+
+def _llm_busy(e: LLMBusy) -> HTTPException:
+    return HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "10"})
+
 @router.post("/", response_model=ProjectResponse, status_code=status.HTTP_201_CREATED)
 def create_project(
     project: ProjectCreate,
@@ -53,18 +96,118 @@ def create_project(
     db.refresh(db_project)
     return db_project
 
-@router.get("/", response_model=List[ProjectResponse])
+@router.get("/", response_model=Union[List[ProjectSummary], List[ProjectResponse]])
 def get_projects(
+    response: Response,
+    view: ProjectListView = Query(ProjectListView.SUMMARY, description="summary leaves out generated_content"),
+    document_type: Optional[DocumentType] = Query(None),
+    limit: int = Query(50, ge=1, le=200),
+    cursor: Optional[str] = Query(None, description="X-Next-Cursor from the previous page"),
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
-    """Get all projects for current user"""
+    """List the current user's projects, newest first, one page at a time"""
     # Guest users always get empty list
     if getattr(current_user, 'is_guest', False):
         return []
     
-    projects = db.query(Project).filter(Project.owner_id == current_user.id).all()
-    return projects
+    query = db.query(Project).filter(Project.owner_id == current_user.id)
+    if document_type:
+        query = query.filter(Project.document_type == document_type)
+    if cursor:
+        query = _after_cursor(query, _decode_cursor(cursor), current_user.id)
+    query = query.order_by(Project.created_at.desc(), Project.id.desc())
+    
+    if view == ProjectListView.FULL:
+        projects = query.options(selectinload(Project.nodes)).limit(limit + 1).all()
+        page = projects[:limit]
+    else:
+        rows = query.with_entities(
+            Project.id,
+            Project.title,
+            Project.topic,
+            Project.document_type,
+            Project.owner_id,
+            Project.created_at,
+            Project.updated_at,
+            func.coalesce(func.length(Project._content), 0).label("envelope_size")
+        ).limit(limit + 1).all()
+        page = _summarize(db, rows[:limit])
+        projects = rows
+    
+    # Fetching one extra row tells us whether another page exists
+    if len(projects) > limit:
+        response.headers["X-Next-Cursor"] = _encode_cursor(page[-1].id)
+    return page
+
+def _encode_cursor(project_id: int) -> str:
+    return base64.urlsafe_b64encode(f"p{project_id}".encode()).decode().rstrip("=")
+
+def _decode_cursor(cursor: str) -> int:
+    try:
+        decoded = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+        if not decoded.startswith("p"):
+            raise ValueError(decoded)
+        return int(decoded[1:])
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+def _after_cursor(query, cursor_id: int, owner_id: int):
+    """
+    Keyset condition on (created_at, id) after the cursor's project
+    The anchor's created_at is read in SQL rather than round-tripped through
+    Python, so stored timestamp formats compare exactly. Only the user's own
+    projects can anchor a page; if the anchor project was deleted meanwhile
+    (or is not theirs), ids (which follow creation order) take over.
+    """
+    anchor = select(Project.created_at).where(
+        Project.id == cursor_id,
+        Project.owner_id == owner_id
+    ).scalar_subquery()
+    return query.filter(or_(
+        Project.created_at < anchor,
+        and_(Project.created_at == anchor, Project.id < cursor_id),
+        and_(anchor.is_(None), Project.id < cursor_id)
+    ))
+
+def _summarize(db: Session, rows) -> List[ProjectSummary]:
+    """Attach content size and section count, computed in SQL for just this page"""
+    stats = {}
+    if rows:
+        stats = {
+            project_id: (count, size)
+            for project_id, count, size in db.query(
+                ProjectNode.project_id,
+                func.count(ProjectNode.id),
+                func.coalesce(func.sum(func.length(cast(ProjectNode.body, Text))), 0)
+            ).filter(
+                ProjectNode.project_id.in_([row.id for row in rows])
+            ).group_by(ProjectNode.project_id)
+        }
+    
+    # Documents still stored whole (not yet split into nodes) are counted from their JSON
+    legacy_ids = [row.id for row in rows if row.id not in stats and row.envelope_size]
+    if legacy_ids:
+        for project in db.query(Project).options(raiseload(Project.nodes)).filter(Project.id.in_(legacy_ids)):
+            content = json.loads(project._content)
+            if project.node_key in content:
+                stats[project.id] = (len(content[project.node_key]), 0)
+    
+    summaries = []
+    for row in rows:
+        count, size = stats.get(row.id, (0, 0))
+        summaries.append(ProjectSummary(
+            id=row.id,
+            title=row.title,
+            topic=row.topic,
+            document_type=row.document_type.value,
+            owner_id=row.owner_id,
+            created_at=row.created_at,
+            updated_at=row.updated_at,
+            content_size=row.envelope_size + size,
+            section_count=count
+        ))
+    return summaries
 
 @router.get("/{project_id}", response_model=ProjectResponse)
 def get_project(
@@ -101,20 +244,23 @@ def get_project(
 async def generate_document(
     project_id: int,
     request: Optional[ProjectGenerateRequest] = None,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    db: AsyncSession = Depends(get_async_db),
+    current_user: User = Depends(get_current_user),
+    generator: DocumentGenerator = Depends(get_generator)
 ):
     """Generate the complete document in one go"""
     # Guest users: generate content but don't save to database
     if getattr(current_user, 'is_guest', False):
         try:
-            generator = DocumentGenerator()
             # Use provided topic or fallback to sample
             topic = request.topic if request and request.topic else "Sample Topic"
             doc_type_str = request.document_type if request and request.document_type else "docx"
             doc_type = DocumentType(doc_type_str)
             
-            content = await generator.generate_document(topic, doc_type)
+            mode = request.mode if request else GenerationMode.SINGLE
+            use_cache = not (request and request.bypass_cache)
+            with _llm_caller(current_user):
+                content = await generator.generate_document(topic, doc_type, mode, use_cache)
             
             return Project(
                 id=999999,
@@ -125,141 +271,173 @@ async def generate_document(
                 generated_content=json.dumps(content),
                 created_at=datetime.utcnow()
             )
+        except LLMBusy as e:
+            raise _llm_busy(e)
         except Exception as e:
             raise HTTPException(status_code=500, detail=f"Error generating document: {str(e)}")
     
-    project = db.query(Project).filter(
-        Project.id == project_id,
-        Project.owner_id == current_user.id
-    ).first()
+    project = await _load_project(db, project_id, current_user.id)
     
     if not project:
         raise HTTPException(status_code=404, detail="Project not found")
     
     try:
-        generator = DocumentGenerator()
-        content = await generator.generate_document(project.topic, project.document_type)
-        
-        # Store as JSON string
-        project.generated_content = json.dumps(content)
-        db.commit()
-        db.refresh(project)
-        
-        return project
+        mode = request.mode if request else GenerationMode.SINGLE
+        use_cache = not (request and request.bypass_cache)
+        with _llm_caller(current_user):
+            return await _generate_project_content(generator, db, project, mode, use_cache)
+    except LLMBusy as e:
+        raise _llm_busy(e)
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error generating document: {str(e)}")
 
+async def _load_project(db: AsyncSession, project_id: int, owner_id: int) -> Optional[Project]:
+    """Load a project and its sections/slides on an async session"""
+    result = await db.execute(
+        select(Project).where(Project.id == project_id, Project.owner_id == owner_id)
+    )
+    return result.scalar_one_or_none()
+
+async def _generate_project_content(
+    generator: DocumentGenerator,
+    db: AsyncSession,
+    project: Project,
+    mode: GenerationMode = GenerationMode.SINGLE,
+    use_cache: bool = True
+) -> Project:
+    """
+    Generate a project's document and store it
+    A project that already has content is being regenerated, so the cached
+    document for its topic is skipped; the new one still refreshes the cache.
+    """
+    use_cache = use_cache and not project.has_content
+    content = await generator.generate_document(project.topic, project.document_type, mode, use_cache)
+    
+    # Store the envelope and one row per section/slide
+    project.set_content(content)
+    await db.commit()
+    await db.refresh(project)
+    export_cache.invalidate_project(project.id)
+    
+    return project
+
 @router.get("/{project_id}/generate/stream")
 async def generate_document_stream(
     project_id: int,
-    token: str = Query(..., description="Access token for authentication"),
     topic: Optional[str] = Query(None, description="Topic for guest generation"),
     document_type: Optional[str] = Query(None, description="Document type for guest generation"),
-    db: Session = Depends(get_db)
+    mode: GenerationMode = Query(GenerationMode.SINGLE, description="single prompt or outline-then-parallel sections"),
+    bypass_cache: bool = Query(False, description="Skip the generation cache and call the model"),
+    resume: Optional[str] = Query(None, description="Last event id received, for clients that cannot send Last-Event-ID"),
+    last_event_id: Optional[str] = Header(None, alias="Last-Event-ID"),
+    db: AsyncSession = Depends(get_async_db),
+    current_user: User = Depends(get_current_user_from_query),
+    generator: DocumentGenerator = Depends(get_generator)
 ):
-    """Stream the document generation process"""
-    # Validate token manually since EventSource doesn't support headers
-    from jose import JWTError, jwt
-    import os
-    from app.services.auth import get_user_by_email
-    
-    try:
-        SECRET_KEY = os.getenv("SECRET_KEY", "your-secret-key-change-in-production")
-        ALGORITHM = "HS256"
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        email: str = payload.get("sub")
-        if email is None:
-            raise HTTPException(status_code=401, detail="Invalid token")
-    except JWTError:
-        raise HTTPException(status_code=401, detail="Invalid token")
-        
-    current_user = get_user_by_email(db, email=email)
-    if not current_user:
-        raise HTTPException(status_code=401, detail="User not found")
-
+    """Stream the document generation process; reconnects resume the same run"""
     # Guest Logic for Stream
     if getattr(current_user, 'is_guest', False):
          async def guest_event_generator():
-            generator = DocumentGenerator()
-            full_content = ""
             try:
                 # Use provided topic or fallback
                 guest_topic = topic if topic else "Sample Topic"
                 guest_doc_type_str = document_type if document_type else "docx"
                 guest_doc_type = DocumentType(guest_doc_type_str)
 
-                async for chunk in generator.generate_document_stream(guest_topic, guest_doc_type):
-                    full_content += chunk
-                    yield f"data: {json.dumps({'chunk': chunk})}\n\n"
-                
-                # Clean and parse
-                cleaned_content = generator._clean_json_response(full_content)
-                parsed_content = json.loads(cleaned_content)
-                
-                if guest_doc_type == DocumentType.DOCX:
-                    final_content = {"type": "docx", "sections": parsed_content.get("sections", [])}
-                else:
-                    final_content = {"type": "pptx", "slides": parsed_content.get("slides", [])}
-                
-                yield f"data: {json.dumps({'status': 'complete', 'content': final_content})}\n\n"
+                # Raw chunks, section/slide events as they complete, then the parsed document
+                with _llm_caller(current_user):
+                    async for event in generator.generate_document_events(
+                        guest_topic, guest_doc_type, mode, use_cache=not bypass_cache
+                    ):
+                        yield f"data: {json.dumps(event)}\n\n"
             except Exception as e:
                 yield f"data: {json.dumps({'error': str(e)})}\n\n"
          
          from fastapi.responses import StreamingResponse
          return StreamingResponse(guest_event_generator(), media_type="text/event-stream")
 
-    project = db.query(Project).filter(
-        Project.id == project_id,
-        Project.owner_id == current_user.id
-    ).first()
-    
-    if not project:
-        raise HTTPException(status_code=404, detail="Project not found")
-    
-    async def event_generator():
-        generator = DocumentGenerator()
-        full_content = ""
+    # A reconnecting EventSource sends the id of the last event it received;
+    # attach to that run instead of paying for a second generation
+    run, after_seq = _resumable_run(last_event_id or resume, project_id, current_user.id)
+    if run and run.done and after_seq >= run.last_seq:
+        # Nothing left to send; 204 tells EventSource to stop reconnecting
+        return Response(status_code=status.HTTP_204_NO_CONTENT)
+
+    if run is None:
+        # Another tab or a quick retry is already generating this project; join it
+        run = _joinable_run(project_id, current_user.id)
+        after_seq = 0
+
+    if run is None:
+        project = await _load_project(db, project_id, current_user.id)
         
-        try:
-            async for chunk in generator.generate_document_stream(project.topic, project.document_type):
-                full_content += chunk
-                # Send raw chunk for typing effect
-                yield f"data: {json.dumps({'chunk': chunk})}\n\n"
-            
-            # After stream ends, save the full content
-            try:
-                # Clean and parse the full content
-                cleaned_content = generator._clean_json_response(full_content)
-                parsed_content = json.loads(cleaned_content)
-                
-                # Format based on type
-                if project.document_type == DocumentType.DOCX:
-                    final_content = {"type": "docx", "sections": parsed_content.get("sections", [])}
-                else:
-                    final_content = {"type": "pptx", "slides": parsed_content.get("slides", [])}
-                
-                # Save to DB
-                project.generated_content = json.dumps(final_content)
-                db.commit()
-                
-                # Send final success event
-                yield f"data: {json.dumps({'status': 'complete', 'content': final_content})}\n\n"
-                
-            except Exception as e:
-                yield f"data: {json.dumps({'error': f'Parsing error: {str(e)}'})}\n\n"
-                
-        except Exception as e:
-            yield f"data: {json.dumps({'error': str(e)})}\n\n"
+        if not project:
+            raise HTTPException(status_code=404, detail="Project not found")
+
+        # A request that arrived with this one may have started a run while the
+        # project loaded; nothing awaits between this check and create
+        run = _joinable_run(project_id, current_user.id)
+
+    if run is None:
+        async def store(content: dict):
+            # Save to DB before announcing completion
+            await _store_content(project.id, current_user.id, content)
+
+        # Raw chunks for the typing effect plus a structured event for every
+        # section/slide as soon as it is complete; the run copies the caller context
+        with _llm_caller(current_user):
+            run = generation_runs.create(
+                project.id,
+                current_user.id,
+                generator.generate_document_events(
+                    project.topic, project.document_type, mode,
+                    # Regenerating a document must not hand back the one it replaces
+                    use_cache=not (bypass_cache or project.has_content)
+                ),
+                store
+            )
+
+    async def event_generator():
+        async for seq, data in run.subscribe(after_seq):
+            yield f"id: {run.event_id(seq)}\ndata: {data}\n\n"
 
     from fastapi.responses import StreamingResponse
     return StreamingResponse(event_generator(), media_type="text/event-stream")
 
+def _joinable_run(project_id: int, owner_id: int) -> Optional[GenerationRun]:
+    """The project's in-flight run, if the caller may attach to it"""
+    run = generation_runs.in_flight(project_id)
+    return run if run and run.owner_id == owner_id else None
+
+def _resumable_run(event_id: Optional[str], project_id: int, owner_id: int) -> Tuple[Optional[GenerationRun], int]:
+    """The run and sequence number a "<run id>:<seq>" event id points to, if it can be resumed"""
+    if not event_id:
+        return None, 0
+    run_id, _, seq = event_id.partition(":")
+    run = generation_runs.get(run_id)
+    if not run or run.project_id != project_id or run.owner_id != owner_id or not seq.isdigit():
+        return None, 0
+    return run, int(seq)
+
+async def _store_content(project_id: int, owner_id: int, content: dict):
+    """
+    Save a finished stream's document
+    Uses its own short session, so a long stream does not hold a connection.
+    """
+    async with AsyncSessionLocal() as db:
+        project = await _load_project(db, project_id, owner_id)
+        if project:
+            project.set_content(content)
+            await db.commit()
+    export_cache.invalidate_project(project_id)
+
 @router.post("/{project_id}/refine", response_model=ProjectResponse)
 async def refine_document(
     project_id: int,
     refine_request: ProjectRefineRequest,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    db: AsyncSession = Depends(get_async_db),
+    current_user: User = Depends(get_current_user),
+    generator: DocumentGenerator = Depends(get_generator)
 ):
     """Refine the document content"""
     
@@ -272,10 +450,10 @@ async def refine_document(
             # For now, let's just generate a fresh document based on the refinement prompt as the "topic".
             # This is a simplification for the demo.
             
-            generator = DocumentGenerator()
             # We'll use the refinement prompt as the new "instruction" for a fresh generation
             # This isn't perfect but it works for a stateless guest demo
-            content = await generator.generate_document(refine_request.refinement_prompt, DocumentType.DOCX)
+            with _llm_caller(current_user):
+                content = await generator.generate_document(refine_request.refinement_prompt, DocumentType.DOCX)
             
             return Project(
                 id=999999,
@@ -286,37 +464,71 @@ async def refine_document(
                 generated_content=json.dumps(content),
                 created_at=datetime.utcnow()
             )
+        except LLMBusy as e:
+            raise _llm_busy(e)
         except Exception as e:
              raise HTTPException(status_code=500, detail=f"Error refining document: {str(e)}")
 
-    project = db.query(Project).filter(
-        Project.id == project_id,
-        Project.owner_id == current_user.id
-    ).first()
+    project = await _load_project(db, project_id, current_user.id)
     
     if not project:
         raise HTTPException(status_code=404, detail="Project not found")
     
-    if not project.generated_content:
+    if not project.has_content:
         raise HTTPException(status_code=400, detail="No content to refine. Generate content first.")
     
+    section_index = refine_request.section_index
+    if section_index is not None and not 0 <= section_index < _node_count(project):
+        raise HTTPException(status_code=400, detail=f"Section index {section_index} out of range")
+    
     try:
-        generator = DocumentGenerator()
-        current_content = json.loads(project.generated_content)
+        with _llm_caller(current_user):
+            return await _refine_project_content(
+                generator, db, project, refine_request.refinement_prompt, section_index
+            )
+    except LLMBusy as e:
+        raise _llm_busy(e)
+    except RefinementNotApplied as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error refining document: {str(e)}")
+
+async def _refine_project_content(
+    generator: DocumentGenerator,
+    db: AsyncSession,
+    project: Project,
+    refinement_prompt: str,
+    section_index: Optional[int] = None
+) -> Project:
+    """
+    Refine a project's stored document and save the result
+    Only the targeted sections/slides go to the model when the scope is given
+    or can be inferred from the prompt; otherwise the whole document does.
+    """
+    content = project.get_content()
+    if section_index is not None:
+        targets = [section_index]
+    else:
+        targets = generator.infer_refinement_targets(refinement_prompt, content)
+    
+    if targets:
+        refined_content = await generator.refine_sections(
+            content, refinement_prompt, project.document_type, targets
+        )
+    else:
         refined_content = await generator.refine_content(
-            project.generated_content,
-            refine_request.refinement_prompt,
+            json.dumps(content),
+            refinement_prompt,
             project.document_type
         )
-        
-        # Update content
-        project.generated_content = json.dumps(refined_content)
-        db.commit()
-        db.refresh(project)
-        
-        return project
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Error refining document: {str(e)}")
+    
+    # Update content
+    project.set_content(refined_content)
+    await db.commit()
+    await db.refresh(project)
+    export_cache.invalidate_project(project.id)
+    
+    return project
 
 @router.patch("/{project_id}/content", response_model=ProjectResponse)
 def update_project_content(
@@ -336,21 +548,26 @@ def update_project_content(
     
     try:
         # Update the generated content with the edited version
-        project.generated_content = json.dumps(content_update.content)
+        project.set_content(content_update.content)
         db.commit()
         db.refresh(project)
+        export_cache.invalidate_project(project.id)
         return project
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error updating content: {str(e)}")
 
-@router.get("/{project_id}/preview-pdf")
-def get_pdf_preview(
-    project_id: int,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
-):
-    """Generate PDF preview for PPTX projects"""
-    project = db.query(Project).filter(
+def _get_project_node(db: Session, project_id: int, position: int, current_user: User) -> ProjectNode:
+    """Load one section/slide row of a project the user owns, without the rest of the document"""
+    node = db.query(ProjectNode).join(Project, ProjectNode.project_id == Project.id).filter(
+        Project.id == project_id,
+        Project.owner_id == current_user.id,
+        ProjectNode.position == position
+    ).first()
+    if node:
+        return node
+    
+    # Nodes are only read if the row has to be split below
+    project = db.query(Project).options(lazyload(Project.nodes)).filter(
         Project.id == project_id,
         Project.owner_id == current_user.id
     ).first()
@@ -358,168 +575,357 @@ def get_pdf_preview(
     if not project:
         raise HTTPException(status_code=404, detail="Project not found")
     
-    if not project.generated_content:
-        raise HTTPException(status_code=400, detail="No content to preview")
+    # Whole-document rows are split by migration 0002; one written by an
+    # older process during a rolling deploy is split here
+    if project.split_legacy_content():
+        db.commit()
+        node = db.query(ProjectNode).filter(
+            ProjectNode.project_id == project.id,
+            ProjectNode.position == position
+        ).first()
     
-    if project.document_type != DocumentType.PPTX:
-        raise HTTPException(status_code=400, detail="PDF preview only available for presentations")
+    if not node:
+        raise HTTPException(status_code=404, detail=f"Section {position} not found")
+    
+    return node
+
+@router.get("/{project_id}/nodes/{position}", response_model=ProjectNodeResponse)
+def get_project_node(
+    project_id: int,
+    position: int,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """Get a single section/slide without loading the rest of the document"""
+    return _get_project_node(db, project_id, position, current_user)
+
+@router.patch("/{project_id}/nodes/{position}", response_model=ProjectNodeResponse)
+def update_project_node(
+    project_id: int,
+    position: int,
+    node_update: ProjectNodeUpdate,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """Replace a single section/slide with manual edits"""
+    node = _get_project_node(db, project_id, position, current_user)
+    
+    node.body = node_update.body
+    node.title = Project.node_title(node_update.body)
+    db.commit()
+    db.refresh(node)
+    export_cache.invalidate_project(project_id)
+    return node
+
+def _node_count(project: Project) -> int:
+    """Number of sections/slides in a project's stored document"""
+    return len(project.get_content().get(project.node_key, []))
+
+def _render_pdf_with_slides(content_data: dict, template_id: str, path: str):
+    """Build the deck on Google Slides from the template and download it as PDF to path"""
+    from app.services.google_slides_service import get_google_slides_service
+    from app.services.slides_copy_pool import slides_copy_pool
+    
+    service = get_google_slides_service()
+    presentation_id = None
     
     try:
-        from app.services.file_exporter import FileExporter
-        from app.services.google_slides_service import GoogleSlidesService
-        import os
+        # Take a ready copy of the template, or copy it now if the pool is empty
+        presentation_id = slides_copy_pool.take(content_data["title"], template_id)
         
-        # Parse content
-        content_data = json.loads(project.generated_content)
-        content_data["title"] = project.title
+        # Populate the deck in one batchUpdate (same logic as export)
+        service.build_deck(presentation_id, content_data["title"], content_data.get("slides", []), template_id)
         
-        # Generate PPTX using Google Slides
-        template_id = os.getenv("GOOGLE_SLIDES_TEMPLATE_ID")
-        if not template_id:
-            raise HTTPException(status_code=500, detail="Template not configured")
+        # Export as PDF
+        with open(path, "wb") as f:
+            service.export_presentation_as_pdf_to(presentation_id, f)
         
-        service = GoogleSlidesService()
-        presentation_id = None
+        # Clean up
+        service.delete_file(presentation_id)
         
+    except Exception as e:
+        if presentation_id:
+            try:
+                service.delete_file(presentation_id)
+            except:
+                pass
+        raise e
+
+async def _get_previewable_project(db: AsyncSession, project_id: int, current_user: User) -> Project:
+    """Load a project that has slides to preview"""
+    project = await _load_project(db, project_id, current_user.id)
+    
+    if not project:
+        raise HTTPException(status_code=404, detail="Project not found")
+    
+    if not project.has_content:
+        raise HTTPException(status_code=400, detail="No content to preview")
+    
+    if project.document_type != DocumentType.PPTX:
+        raise HTTPException(status_code=400, detail="PDF preview only available for presentations")
+    
+    return project
+
+@router.get("/{project_id}/preview-pdf")
+async def get_pdf_preview(
+    project_id: int,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: User = Depends(get_current_user)
+):
+    """Generate PDF preview for PPTX projects"""
+    project = await _get_previewable_project(db, project_id, current_user)
+    
+    try:
+        pdf_stream, cache_status = await _open_pdf_preview(project)
+        return _stream_response(pdf_stream, "application/pdf", {"X-Export-Cache": cache_status})
+    except ExportQueueFull as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "5"})
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error generating PDF preview: {str(e)}")
+
+async def _open_pdf_preview(project: Project) -> Tuple[BinaryIO, str]:
+    """Render (or fetch from cache) a project's PDF preview; returns (readable stream, cache status)"""
+    # The local renderer needs no network; PDF_PREVIEW_ENGINE=slides renders
+    # through the Google Slides template instead (slower, but pixel-exact)
+    template_id = os.getenv("GOOGLE_SLIDES_TEMPLATE_ID")
+    use_slides = PDF_PREVIEW_ENGINE == "slides" and bool(template_id)
+    
+    # Serve an unchanged deck straight from the export cache
+    cache_key = export_cache.make_key(
+        project.generated_content,
+        project.title,
+        project.document_type,
+        "pdf" if use_slides else "pdf-local",
+        template_id if use_slides else None
+    )
+    pdf_stream = export_cache.open(project.id, cache_key)
+    if pdf_stream is not None:
+        return pdf_stream, "hit"
+    
+    # Parse content
+    content_data = project.get_content()
+    content_data["title"] = project.title
+    
+    if use_slides:
+        path = export_cache.temp_path()
         try:
-            # Create presentation from template
-            presentation_id = service.create_presentation_from_template(project.title, template_id)
-            
-            # Get slides and populate content (similar to export logic)
-            presentation_slides = service.get_presentation_slides(presentation_id)
-            if len(presentation_slides) < 2:
-                raise ValueError("Template must have at least 2 slides")
-            
-            title_slide_id = presentation_slides[0]['objectId']
-            
-            # Find content slide
-            content_slide_id = None
-            best_score = 0
-            
-            for slide in presentation_slides:
-                score = 0
-                has_content = False
-                has_title = False
-                
-                for element in slide.get('pageElements', []):
-                    shape = element.get('shape')
-                    if shape and shape.get('text'):
-                        for te in shape['text']['textElements']:
-                            if 'textRun' in te:
-                                content = te['textRun']['content']
-                                if '{{SLIDE_CONTENT}}' in content:
-                                    has_content = True
-                                if '{{SLIDE_TITLE}}' in content:
-                                    has_title = True
-                
-                if has_content:
-                    score += 1
-                if has_title:
-                    score += 1
-                    
-                if score > best_score:
-                    best_score = score
-                    content_slide_id = slide['objectId']
-                    
-                if best_score == 2:
-                    break
-            
-            if not content_slide_id:
-                if len(presentation_slides) > 3:
-                    content_slide_id = presentation_slides[3]['objectId']
-                else:
-                    content_slide_id = presentation_slides[1]['objectId']
-            
-            content_slide_index = 0
-            for i, slide in enumerate(presentation_slides):
-                if slide['objectId'] == content_slide_id:
-                    content_slide_index = i
+            await run_in_threadpool(_render_pdf_with_slides, content_data, template_id, path)
+        except Exception:
+            os.remove(path)
+            raise
+        return _cache_built_file(project.id, cache_key, path), "miss"
+    
+    pdf_bytes = await SlideRenderer.render_pdf_async(content_data)
+    export_cache.put(project.id, cache_key, pdf_bytes)
+    return io.BytesIO(pdf_bytes), "miss"
+
+def _cache_built_file(project_id: int, cache_key: str, path: str) -> BinaryIO:
+    """Open a freshly built file and hand it to the export cache"""
+    # Opened before the move: the handle stays valid even if the cache evicts the file
+    stream = open(path, "rb")
+    export_cache.put_file(project_id, cache_key, path)
+    return stream
+
+def _stream_response(stream: BinaryIO, media_type: str, headers: dict) -> StreamingResponse:
+    """Send a file in EXPORT_STREAM_CHUNK pieces and close it afterwards"""
+    size = stream.seek(0, io.SEEK_END)
+    stream.seek(0)
+
+    def chunks():
+        try:
+            while True:
+                chunk = stream.read(EXPORT_STREAM_CHUNK)
+                if not chunk:
                     break
-            
-            # Replace title slide
-            service.replace_text(presentation_id, {
-                "{{MAIN_TITLE}}": project.title,
-                "{{SUBTITLE}}": "Generated by OceanAI"
-            }, slide_ids=[title_slide_id])
-            
-            # Duplicate and populate content slides
-            slides = content_data.get("slides", [])
-            for i, slide_data in enumerate(slides):
-                # Insert each new slide right after the content template slide
-                # This ensures slides appear in the correct order (1, 2, 3, ...)
-                insertion_index = content_slide_index + 1 + i
-                new_slide_id = service.duplicate_slide(presentation_id, content_slide_id, insertion_index=insertion_index)
-
-                bullets = slide_data.get("bullets", [])
-                content_text = "\n".join(bullets) if bullets else ""
-                
-                service.replace_text(presentation_id, {
-                    "{{SLIDE_TITLE}}": slide_data.get("title", ""),
-                    "{{SLIDE_CONTENT}}": content_text
-                }, slide_ids=[new_slide_id])
-            
-            # Delete template slide
-            service.delete_slide(presentation_id, content_slide_id)
-            
-            # Export as PDF
-            pdf_bytes = service.export_presentation_as_pdf(presentation_id)
-            
-            # Clean up
-            service.delete_file(presentation_id)
-            
-            return Response(content=pdf_bytes, media_type="application/pdf")
-            
-        except Exception as e:
-            if presentation_id:
-                try:
-                    service.delete_file(presentation_id)
-                except:
-                    pass
-            raise e
-            
+                yield chunk
+        finally:
+            stream.close()
+
+    return StreamingResponse(
+        chunks(),
+        media_type=media_type,
+        headers={**headers, "Content-Length": str(size)}
+    )
+
+@router.get("/{project_id}/preview-thumbnail/{slide_index}")
+async def get_slide_thumbnail(
+    project_id: int,
+    slide_index: int,
+    width: int = Query(480, ge=64, le=1920, description="Thumbnail width in pixels"),
+    db: AsyncSession = Depends(get_async_db),
+    current_user: User = Depends(get_current_user)
+):
+    """Render a PNG thumbnail of one slide (0 is the title slide)"""
+    project = await _get_previewable_project(db, project_id, current_user)
+    
+    cache_key = export_cache.make_key(
+        project.generated_content, project.title, project.document_type, f"png-{slide_index}-{width}"
+    )
+    png_bytes = export_cache.get(project.id, cache_key)
+    if png_bytes is not None:
+        return Response(content=png_bytes, media_type="image/png", headers={"X-Export-Cache": "hit"})
+    
+    content_data = project.get_content()
+    content_data["title"] = project.title
+    
+    try:
+        png_bytes = await SlideRenderer.render_thumbnail_async(content_data, slide_index, width)
+    except IndexError:
+        raise HTTPException(status_code=404, detail="Slide not found")
+    except ExportQueueFull as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "5"})
     except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Error generating PDF preview: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Error rendering thumbnail: {str(e)}")
+    
+    export_cache.put(project.id, cache_key, png_bytes)
+    return Response(content=png_bytes, media_type="image/png", headers={"X-Export-Cache": "miss"})
 
 @router.get("/{project_id}/export")
-def export_document(
+async def export_document(
     project_id: int,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: User = Depends(get_current_user)
 ):
     """Export project as a file"""
-    project = db.query(Project).filter(
-        Project.id == project_id,
-        Project.owner_id == current_user.id
-    ).first()
+    project = await _load_project(db, project_id, current_user.id)
     
     if not project:
         raise HTTPException(status_code=404, detail="Project not found")
     
-    if not project.generated_content:
+    if not project.has_content:
         raise HTTPException(status_code=400, detail="No content to export. Generate content first.")
     
     try:
-        content_data = json.loads(project.generated_content)
-        content_data["title"] = project.title  # Add title to content
-        
-        file_bytes = FileExporter.export_to_file(content_data, project.document_type)
-        
-        # Determine file extension and MIME type
-        if project.document_type == DocumentType.DOCX:
-            filename = f"{project.title}.docx"
-            media_type = "application/vnd.openxmlformats-officedocument.wordprocessingml.document"
-        else:
-            filename = f"{project.title}.pptx"
-            media_type = "application/vnd.openxmlformats-officedocument.presentationml.presentation"
-        
-        return Response(
-            content=file_bytes,
-            media_type=media_type,
-            headers={"Content-Disposition": f"attachment; filename={filename}"}
+        file_stream, filename, media_type, cache_status = await _open_export(project)
+        return _stream_response(
+            file_stream,
+            media_type,
+            {
+                "Content-Disposition": f"attachment; filename={filename}",
+                "X-Export-Cache": cache_status
+            }
         )
+    except ExportQueueFull as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "5"})
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error exporting document: {str(e)}")
 
+async def _open_export(project: Project) -> Tuple[BinaryIO, str, str, str]:
+    """
+    Build (or fetch from cache) a project's file
+    Returns (readable stream, filename, media type, cache status). The file is
+    written straight into the export cache's directory and streamed from there.
+    """
+    # PPTX output depends on the Slides template, DOCX does not
+    template_id = os.getenv("GOOGLE_SLIDES_TEMPLATE_ID") if project.document_type == DocumentType.PPTX else None
+    # The owner's python-docx/python-pptx template
+    local_template = export_templates.select(project.owner_id, project.document_type)
+    cache_key = export_cache.make_key(
+        project.generated_content, project.title, project.document_type, "export", template_id, local_template
+    )
+    file_stream = export_cache.open(project.id, cache_key)
+    cache_status = "hit"
+    
+    if file_stream is None:
+        content_data = project.get_content()
+        content_data["title"] = project.title  # Add title to content
+        
+        path = export_cache.temp_path()
+        try:
+            renderer = await FileExporter.export_to_path_async(content_data, project.document_type, path, local_template)
+        except Exception:
+            os.remove(path)
+            raise
+        if template_id and renderer != RENDERER_SLIDES:
+            # Slides failed and python-pptx built the deck: file it under the
+            # local renderer's key so the next export tries Slides again
+            cache_key = export_cache.make_key(
+                project.generated_content, project.title, project.document_type, "export", None, local_template
+            )
+        file_stream = _cache_built_file(project.id, cache_key, path)
+        cache_status = "miss"
+    
+    # Determine file extension and MIME type
+    if project.document_type == DocumentType.DOCX:
+        filename = f"{project.title}.docx"
+        media_type = "application/vnd.openxmlformats-officedocument.wordprocessingml.document"
+    else:
+        filename = f"{project.title}.pptx"
+        media_type = "application/vnd.openxmlformats-officedocument.presentationml.presentation"
+    
+    return file_stream, filename, media_type, cache_status
+
+@router.post("/export-bulk")
+async def export_bulk(
+    export_request: ProjectBulkExportRequest,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: User = Depends(get_current_user)
+):
+    """Export several projects as one ZIP, streamed as each file is built"""
+    try:
+        projects = await _load_bulk_projects(
+            db, current_user.id, export_request.project_ids, export_request.document_type
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    if not projects:
+        raise HTTPException(status_code=404, detail="No projects with content to export")
+    
+    return StreamingResponse(
+        stream_zip(_bulk_export_entries(projects)),
+        media_type="application/zip",
+        headers={"Content-Disposition": "attachment; filename=projects.zip"}
+    )
+
+async def _load_bulk_projects(
+    db: AsyncSession,
+    owner_id: int,
+    project_ids: Optional[List[int]] = None,
+    document_type: Optional[DocumentType] = None
+) -> List[Project]:
+    """The owner's projects with content, by id or all of them, optionally of one type"""
+    query = select(Project).where(Project.owner_id == owner_id)
+    if project_ids:
+        if len(set(project_ids)) > BULK_EXPORT_MAX_PROJECTS:
+            raise ValueError(f"At most {BULK_EXPORT_MAX_PROJECTS} projects can be exported at once")
+        query = query.where(Project.id.in_(set(project_ids)))
+    if document_type:
+        query = query.where(Project.document_type == document_type)
+    query = query.order_by(Project.created_at.desc(), Project.id.desc()).limit(BULK_EXPORT_MAX_PROJECTS)
+    
+    result = await db.execute(query)
+    return [project for project in result.scalars().all() if project.has_content]
+
+async def _bulk_export_entries(
+    projects: List[Project],
+    report_progress: Optional[Callable[[float], None]] = None
+) -> AsyncIterator[Tuple[str, BinaryIO]]:
+    """(archive name, stream) for each project's file as its build finishes, then a list of failures"""
+    failures = []
+    finished = 0
+    async for project, built, error in build_concurrently(projects, _open_export_when_ready):
+        finished += 1
+        if error is not None:
+            failures.append(f"{project.id} {project.title}: {error}")
+        else:
+            file_stream, filename, _, _ = built
+            yield f"{project.id}-{filename.replace('/', '_').replace(chr(92), '_')}", file_stream
+        if report_progress:
+            report_progress(finished / len(projects))
+    
+    if failures:
+        yield "export-errors.txt", io.BytesIO(("\n".join(failures) + "\n").encode("utf-8"))
+
+async def _open_export_when_ready(project: Project):
+    """_open_export, waiting for room in the export pool instead of failing"""
+    for _ in range(BULK_EXPORT_QUEUE_RETRIES):
+        try:
+            return await _open_export(project)
+        except ExportQueueFull:
+            await asyncio.sleep(0.5)
+    return await _open_export(project)
+
 @router.delete("/{project_id}", status_code=status.HTTP_204_NO_CONTENT)
 def delete_project(
     project_id: int,
@@ -537,5 +943,6 @@ def delete_project(
     
     db.delete(project)
     db.commit()
+    export_cache.invalidate_project(project_id)
     return None
 
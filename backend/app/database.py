@@ -1,17 +1,37 @@
 from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 import os
 from dotenv import load_dotenv
+from app.services.db_pool import async_pool_stats, configure_engine, engine_options, sync_pool_stats
 
 load_dotenv()
 
 # Use SQLite for easier setup, can switch to PostgreSQL later
 DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./oceanai.db")
 
-engine = create_engine(DATABASE_URL)
+def _async_database_url(url: str) -> str:
+    """The same database through its asyncio driver: aiosqlite or asyncpg"""
+    for prefix in ("postgres://", "postgresql://", "postgresql+psycopg2://"):
+        if url.startswith(prefix):
+            return "postgresql+asyncpg://" + url[len(prefix):]
+    if url.startswith("sqlite://"):
+        return "sqlite+aiosqlite://" + url[len("sqlite://"):]
+    return url
+
+ASYNC_DATABASE_URL = os.getenv("ASYNC_DATABASE_URL", _async_database_url(DATABASE_URL))
+
+engine = create_engine(DATABASE_URL, **engine_options(DATABASE_URL, sync_pool_stats))
+configure_engine(engine, sync_pool_stats)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# Used by the async routes so database I/O never blocks the event loop.
+# Objects stay readable after commit, since lazy loads are not possible there.
+async_engine = create_async_engine(ASYNC_DATABASE_URL, **engine_options(ASYNC_DATABASE_URL, async_pool_stats, is_async=True))
+configure_engine(async_engine.sync_engine, async_pool_stats)
+AsyncSessionLocal = async_sessionmaker(async_engine, class_=AsyncSession, autoflush=False, expire_on_commit=False)
+
 Base = declarative_base()
 
 def get_db():
@@ -22,3 +42,21 @@ def get_db():
     finally:
         db.close()
 
+async def get_async_db():
+    """Dependency for getting an async database session"""
+    async with AsyncSessionLocal() as db:
+        yield db
+
+def upgrade_database():
+    """Create missing tables, then apply the Alembic migrations for changes to existing ones"""
+    from alembic import command
+    from alembic.config import Config
+    import app.models  # noqa: F401
+
+    Base.metadata.create_all(bind=engine)
+    backend_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    config = Config(os.path.join(backend_dir, "alembic.ini"))
+    config.set_main_option("script_location", os.path.join(backend_dir, "alembic"))
+    with engine.begin() as connection:
+        config.attributes["connection"] = connection
+        command.upgrade(config, "head")
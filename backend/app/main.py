@@ -1,15 +1,40 @@
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-from app.api import auth, projects
-from app.database import engine, Base
+from app.api import auth, projects, jobs, metrics
+from app.database import upgrade_database
+from app.services.job_queue import job_queue
+from app.services.export_executor import export_executor
+from app.services.generator_registry import generator_registry
+from app.services.password_hasher import password_hasher
+from app.services.generation_runs import generation_runs
+from app.services.slides_copy_pool import slides_copy_pool
 
-# Create database tables
-Base.metadata.create_all(bind=engine)
+# Create database tables and migrate existing ones
+upgrade_database()
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Start and stop the Gemini client, background jobs and generation runs, the export process pool, the Slides template copy pool and the password hashing threads"""
+    generator_registry.start()
+    export_executor.start()
+    password_hasher.start()
+    await job_queue.start()
+    await generation_runs.start()
+    await slides_copy_pool.start()
+    yield
+    await slides_copy_pool.stop()
+    await generation_runs.stop()
+    await job_queue.stop()
+    password_hasher.shutdown()
+    export_executor.shutdown()
+    generator_registry.stop()
 
 app = FastAPI(
     title="OceanAI Document Generator API",
     description="AI-powered document generation system (Word & PowerPoint)",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
 )
 
 # CORS middleware
@@ -31,11 +56,14 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor"],
 )
 
 # Include routers
 app.include_router(auth.router)
 app.include_router(projects.router)
+app.include_router(jobs.router)
+app.include_router(metrics.router)
 
 @app.get("/")
 def root():
@@ -48,7 +76,8 @@ def root():
             "Project creation",
             "AI document generation (Word & PowerPoint)",
             "Content refinement",
-            "Document export"
+            "Document export",
+            "Background jobs"
         ]
     }
 
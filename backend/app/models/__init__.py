@@ -1,7 +1,12 @@
 from .document import Document
 from .user import User
 from .project import Project
+from .project_node import ProjectNode
+from .job import Job
+from .generation_cache import GenerationCacheEntry
+from .generation_run import GenerationRunEvent
+from .slides_template import SlidesTemplateLayout
 
-__all__ = ["Document", "User", "Project"]
+__all__ = ["Document", "User", "Project", "ProjectNode", "Job", "GenerationCacheEntry", "GenerationRunEvent", "SlidesTemplateLayout"]
 
 
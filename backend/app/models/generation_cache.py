@@ -0,0 +1,17 @@
+from sqlalchemy import Column, String, Text, DateTime
+from sqlalchemy.sql import func
+from app.database import Base
+
+class GenerationCacheEntry(Base):
+    __tablename__ = "generation_cache"
+
+    key = Column(String, primary_key=True)  # sha256 of normalized prompt, model, type and mode
+    model_name = Column(String, nullable=False)
+    document_type = Column(String, nullable=False)
+    mode = Column(String, nullable=False)
+    topic = Column(String, nullable=False)  # normalized topic, for the near-duplicate index
+    content = Column(Text, nullable=False)  # generated document JSON
+
+    # Timestamps
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    expires_at = Column(DateTime(timezone=True), nullable=False, index=True)
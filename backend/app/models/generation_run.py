@@ -0,0 +1,16 @@
+from sqlalchemy import Column, Integer, String, Text, DateTime, UniqueConstraint
+from sqlalchemy.sql import func
+from app.database import Base
+
+class GenerationRunEvent(Base):
+    """Streamed events of a generation run that no longer fit in its in-memory buffer"""
+    __tablename__ = "generation_run_events"
+    __table_args__ = (UniqueConstraint("run_id", "seq", name="uq_generation_run_events_run_seq"),)
+
+    id = Column(Integer, primary_key=True)
+    run_id = Column(String, nullable=False, index=True)
+    seq = Column(Integer, nullable=False)
+    data = Column(Text, nullable=False)  # event JSON as sent to the client
+
+    # Timestamps
+    created_at = Column(DateTime(timezone=True), server_default=func.now(), index=True)
@@ -0,0 +1,54 @@
+from sqlalchemy import Boolean, Column, Integer, String, Text, DateTime, ForeignKey, JSON, Float, false
+from sqlalchemy.orm import relationship
+from sqlalchemy.sql import func
+from app.database import Base
+import enum
+
+class JobKind(str, enum.Enum):
+    GENERATE = "generate"
+    REFINE = "refine"
+    EXPORT = "export"
+    PREVIEW_PDF = "preview_pdf"
+    EXPORT_BULK = "export_bulk"
+
+class JobStatus(str, enum.Enum):
+    QUEUED = "queued"
+    RUNNING = "running"
+    SUCCEEDED = "succeeded"
+    FAILED = "failed"
+    CANCELLED = "cancelled"
+
+class Job(Base):
+    __tablename__ = "jobs"
+
+    id = Column(String, primary_key=True, index=True)  # uuid4 hex
+    kind = Column(String, nullable=False)  # JobKind value
+    status = Column(String, nullable=False, default=JobStatus.QUEUED.value, index=True)
+    priority = Column(Integer, nullable=False, default=5)  # lower runs first
+
+    owner_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    project_id = Column(Integer, nullable=True, index=True)  # no FK so deleting a project keeps its job history
+    params = Column(JSON, nullable=True)
+
+    # Progress and results
+    progress = Column(Float, default=0.0)  # 0.0 - 1.0
+    result = Column(JSON, nullable=True)  # small JSON results
+    result_path = Column(String, nullable=True)  # file artifacts (exports, previews)
+    result_filename = Column(String, nullable=True)
+    result_media_type = Column(String, nullable=True)
+    error = Column(Text, nullable=True)
+
+    # The process running the job and when it last reported in, so a restart
+    # only fails jobs whose process stopped, not those of its sibling workers
+    worker_id = Column(String, nullable=True, index=True)
+    heartbeat_at = Column(DateTime(timezone=True), nullable=True)
+    # Set when the owner cancels a job another process is running; that process
+    # cancels it at its next heartbeat
+    cancel_requested = Column(Boolean, nullable=False, default=False, server_default=false())
+
+    # Timestamps
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    started_at = Column(DateTime(timezone=True), nullable=True)
+    finished_at = Column(DateTime(timezone=True), nullable=True)
+
+    owner = relationship("User", back_populates="jobs")
@@ -1,23 +1,41 @@
-from sqlalchemy import Column, Integer, String, Text, DateTime, ForeignKey, Enum
+from sqlalchemy import Column, Integer, String, Text, DateTime, ForeignKey, Enum, Index
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
+from typing import Any, Dict, Optional
 from app.database import Base
+from app.models.project_node import ProjectNode
 import enum
+import json
 
 class DocumentType(str, enum.Enum):
     DOCX = "docx"
     PPTX = "pptx"
 
+class GenerationMode(str, enum.Enum):
+    SINGLE = "single"  # whole document in one prompt
+    PARALLEL = "parallel"  # outline first, then every section/slide concurrently
+
 class Project(Base):
     __tablename__ = "projects"
+    # Serves the project list: owner filter plus newest-first keyset pagination
+    __table_args__ = (Index("ix_projects_owner_created", "owner_id", "created_at"),)
 
     id = Column(Integer, primary_key=True, index=True)
     title = Column(String, nullable=False)
     topic = Column(String, nullable=False)
     document_type = Column(Enum(DocumentType), nullable=False)
     
-    # Generated content
-    generated_content = Column(Text, nullable=True)  # JSON string for structured content
+    # Generated content: the document without its sections/slides, which live in
+    # project_nodes. Rows written before nodes existed still hold the whole document.
+    _content = Column("generated_content", Text, nullable=True)
+    nodes = relationship(
+        "ProjectNode",
+        back_populates="project",
+        order_by=ProjectNode.position,
+        cascade="all, delete-orphan",
+        # Loaded with the project: async sessions cannot lazy load
+        lazy="selectin"
+    )
     
     # Metadata
     owner_id = Column(Integer, ForeignKey("users.id"), nullable=False)
@@ -28,3 +46,67 @@ class Project(Base):
 
     owner = relationship("User", back_populates="projects")
 
+    @property
+    def has_content(self) -> bool:
+        return self._content is not None
+
+    @property
+    def node_key(self) -> str:
+        return "slides" if self.document_type in (DocumentType.PPTX, "pptx") else "sections"
+
+    @property
+    def generated_content(self) -> Optional[str]:
+        """The whole document as a JSON string, as the API has always returned it"""
+        content = self.get_content()
+        return json.dumps(content) if content is not None else None
+
+    @generated_content.setter
+    def generated_content(self, value: Optional[str]):
+        self.set_content(json.loads(value) if value is not None else None)
+
+    def get_content(self) -> Optional[Dict[str, Any]]:
+        """The whole document as a dict"""
+        if self._content is None:
+            return None
+        content = json.loads(self._content)
+        if self.node_key not in content:
+            content[self.node_key] = [node.body for node in self.nodes]
+        return content
+
+    def set_content(self, content: Optional[Dict[str, Any]]):
+        """Store a document, writing only the sections/slides that changed"""
+        if content is None:
+            self._content = None
+            self.nodes = []
+            return
+
+        key = self.node_key
+        bodies = content.get(key, [])
+        self._content = json.dumps({k: v for k, v in content.items() if k != key})
+
+        kind = key[:-1]
+        existing = list(self.nodes)
+        for position, body in enumerate(bodies):
+            if position < len(existing):
+                node = existing[position]
+                if node.body != body:
+                    node.body = body
+                    node.title = self.node_title(body)
+            else:
+                self.nodes.append(ProjectNode(
+                    position=position, kind=kind, title=self.node_title(body), body=body
+                ))
+        # Orphaned rows are deleted on flush
+        del self.nodes[len(bodies):]
+
+    def split_legacy_content(self) -> bool:
+        """Move a whole-document row written before project_nodes existed into node rows"""
+        if self._content is not None and self.node_key in json.loads(self._content):
+            self.set_content(json.loads(self._content))
+            return True
+        return False
+
+    @staticmethod
+    def node_title(body: Any) -> Optional[str]:
+        return str(body.get("title", "")) if isinstance(body, dict) else None
+
@@ -0,0 +1,23 @@
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, JSON, UniqueConstraint
+from sqlalchemy.dialects.postgresql import JSONB
+from sqlalchemy.orm import relationship
+from sqlalchemy.sql import func
+from app.database import Base
+
+class ProjectNode(Base):
+    """One section (docx) or slide (pptx) of a project's generated document"""
+    __tablename__ = "project_nodes"
+    __table_args__ = (UniqueConstraint("project_id", "position", name="uq_project_nodes_position"),)
+
+    id = Column(Integer, primary_key=True, index=True)
+    project_id = Column(Integer, ForeignKey("projects.id", ondelete="CASCADE"), nullable=False, index=True)
+    position = Column(Integer, nullable=False)  # 0-based order in the document
+    kind = Column(String, nullable=False)  # "section" or "slide"
+    title = Column(String, nullable=True)
+
+    # The node exactly as generated, e.g. {"title": ..., "content": [...]}; JSONB on PostgreSQL
+    body = Column(JSON().with_variant(JSONB(), "postgresql"), nullable=False)
+
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+
+    project = relationship("Project", back_populates="nodes")
@@ -0,0 +1,14 @@
+from sqlalchemy import Column, String, Text, DateTime
+from sqlalchemy.sql import func
+from app.database import Base
+
+class SlidesTemplateLayout(Base):
+    """Where the placeholders of one revision of a Google Slides template are"""
+    __tablename__ = "slides_template_layouts"
+
+    template_id = Column(String, primary_key=True)  # Drive file id
+    revision = Column(String, primary_key=True)  # Drive revision the layout was read from
+    layout = Column(Text, nullable=False)  # layout JSON, see GoogleSlidesService.find_template_layout
+
+    # Timestamps
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
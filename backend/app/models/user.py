@@ -16,5 +16,6 @@ class User(Base):
 
     documents = relationship("Document", back_populates="owner", cascade="all, delete-orphan")
     projects = relationship("Project", back_populates="owner", cascade="all, delete-orphan")
+    jobs = relationship("Job", back_populates="owner", cascade="all, delete-orphan")
 
 
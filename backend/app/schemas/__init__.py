@@ -1,7 +1,11 @@
 from .document import DocumentCreate, DocumentResponse, DocumentUpdate
 from .user import UserCreate, UserResponse
 from .auth import UserRegister, Token, UserLogin
-from .project import ProjectCreate, ProjectResponse, ProjectUpdate, ProjectRefineRequest, ProjectContentUpdate
+from .project import (
+    ProjectCreate, ProjectResponse, ProjectUpdate, ProjectRefineRequest, ProjectContentUpdate,
+    ProjectNodeResponse, ProjectNodeUpdate, ProjectListView, ProjectSummary, ProjectBulkExportRequest
+)
+from .job import JobCreate, JobResponse
 
 __all__ = [
     "DocumentCreate",
@@ -16,7 +20,14 @@ __all__ = [
     "ProjectResponse",
     "ProjectUpdate",
     "ProjectRefineRequest",
-    "ProjectContentUpdate"
+    "ProjectContentUpdate",
+    "ProjectNodeResponse",
+    "ProjectNodeUpdate",
+    "ProjectListView",
+    "ProjectSummary",
+    "ProjectBulkExportRequest",
+    "JobCreate",
+    "JobResponse"
 ]
 
 
@@ -0,0 +1,28 @@
+from pydantic import BaseModel, Field
+from typing import Optional, Dict, Any
+from datetime import datetime
+from app.models.job import JobKind
+
+class JobCreate(BaseModel):
+    kind: JobKind
+    project_id: Optional[int] = None  # required for every kind except export_bulk
+    priority: int = Field(5, ge=0, le=9)
+    params: Dict[str, Any] = {}
+
+class JobResponse(BaseModel):
+    id: str
+    kind: str
+    status: str
+    priority: int
+    project_id: Optional[int] = None
+    progress: float = 0.0
+    result: Optional[Dict[str, Any]] = None
+    result_filename: Optional[str] = None
+    error: Optional[str] = None
+    cancel_requested: bool = False
+    created_at: Optional[datetime] = None
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+
+    class Config:
+        from_attributes = True
@@ -1,7 +1,8 @@
-from pydantic import BaseModel
-from typing import Optional
+from pydantic import BaseModel, Field
+from typing import List, Optional
 from datetime import datetime
-from app.models.project import DocumentType
+from app.models.project import DocumentType, GenerationMode
+import enum
 
 class ProjectCreate(BaseModel):
     title: str
@@ -26,14 +27,52 @@ class ProjectResponse(BaseModel):
     class Config:
         from_attributes = True
 
+class ProjectListView(str, enum.Enum):
+    SUMMARY = "summary"  # metadata plus content size, without the document
+    FULL = "full"  # every field of ProjectResponse
+
+class ProjectSummary(BaseModel):
+    id: int
+    title: str
+    topic: str
+    document_type: str
+    owner_id: int
+    created_at: datetime
+    updated_at: Optional[datetime] = None
+    content_size: int = 0  # characters of stored JSON
+    section_count: int = 0
+
+    class Config:
+        from_attributes = True
+
 class ProjectGenerateRequest(BaseModel):
     project_id: Optional[int] = None
     topic: Optional[str] = None
     document_type: Optional[str] = None
+    mode: GenerationMode = GenerationMode.SINGLE
+    bypass_cache: bool = False
 
 class ProjectRefineRequest(BaseModel):
     refinement_prompt: str
+    # 0-based section/slide to refine; inferred from the prompt when omitted
+    section_index: Optional[int] = None
 
 class ProjectContentUpdate(BaseModel):
     content: dict
 
+class ProjectNodeResponse(BaseModel):
+    position: int
+    kind: str
+    title: Optional[str] = None
+    body: dict
+
+    class Config:
+        from_attributes = True
+
+class ProjectNodeUpdate(BaseModel):
+    body: dict
+
+class ProjectBulkExportRequest(BaseModel):
+    # Projects to export; every project with content when omitted
+    project_ids: Optional[List[int]] = Field(None, min_length=1)
+    document_type: Optional[DocumentType] = None
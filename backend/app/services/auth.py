@@ -1,16 +1,18 @@
 from datetime import datetime, timedelta
 from typing import Optional
 from jose import JWTError, jwt
-from passlib.context import CryptContext
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 from app.models.user import User
+from app.services.password_hasher import password_hasher
 import os
 
 SECRET_KEY = os.getenv("SECRET_KEY", "your-secret-key-change-in-production")
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 30
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+pwd_context = password_hasher.context
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     """Verify a password against a hash"""
@@ -31,16 +33,33 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
     return encoded_jwt
 
-def authenticate_user(db: Session, email: str, password: str) -> Optional[User]:
-    """Authenticate a user by email and password"""
-    user = db.query(User).filter(User.email == email).first()
+def decode_access_token(token: str) -> dict:
+    """Verify a JWT's signature and expiry and return its claims; raises JWTError"""
+    return jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+
+async def authenticate_user(db: AsyncSession, email: str, password: str) -> Optional[User]:
+    """
+    Authenticate a user by email and password
+    bcrypt runs on the password hasher's threads; a hash made with outdated
+    settings is replaced while the plain password is at hand.
+    """
+    user = await get_user_by_email_async(db, email)
     if not user:
         return None
-    if not verify_password(password, user.hashed_password):
+    valid, new_hash = await password_hasher.verify_and_update(password, user.hashed_password)
+    if not valid:
         return None
+    if new_hash:
+        user.hashed_password = new_hash
+        await db.commit()
     return user
 
 def get_user_by_email(db: Session, email: str) -> Optional[User]:
     """Get user by email"""
     return db.query(User).filter(User.email == email).first()
 
+async def get_user_by_email_async(db: AsyncSession, email: str) -> Optional[User]:
+    """Get user by email without blocking the event loop"""
+    result = await db.execute(select(User).where(User.email == email))
+    return result.scalar_one_or_none()
+
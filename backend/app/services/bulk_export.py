@@ -0,0 +1,86 @@
+import os
+import asyncio
+import zipfile
+from typing import Any, AsyncIterator, Awaitable, BinaryIO, Callable, Iterable, List, Tuple
+
+BULK_EXPORT_CONCURRENCY = int(os.getenv("BULK_EXPORT_CONCURRENCY", "4"))  # files built at once per archive
+BULK_EXPORT_MAX_PROJECTS = int(os.getenv("BULK_EXPORT_MAX_PROJECTS", "500"))
+BULK_EXPORT_CHUNK = 64 * 1024
+
+
+class _ZipSink:
+    """Write-only file for ZipFile whose output is collected and drained between entries"""
+
+    def __init__(self):
+        self._parts: List[bytes] = []
+        self._position = 0
+
+    def write(self, data: bytes) -> int:
+        self._parts.append(bytes(data))
+        self._position += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self._position
+
+    def flush(self):
+        pass
+
+    def drain(self) -> bytes:
+        data = b"".join(self._parts)
+        self._parts = []
+        return data
+
+
+async def build_concurrently(
+    items: Iterable[Any],
+    build: Callable[[Any], Awaitable[Any]],
+    concurrency: int = BULK_EXPORT_CONCURRENCY
+) -> AsyncIterator[Tuple[Any, Any, Exception]]:
+    """
+    Run build over items, at most `concurrency` at a time
+    Yields (item, result, None) or (item, None, error) in completion order.
+    """
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def guarded(item):
+        async with semaphore:
+            try:
+                return item, await build(item), None
+            except Exception as e:
+                return item, None, e
+
+    tasks = [asyncio.create_task(guarded(item)) for item in items]
+    try:
+        for next_done in asyncio.as_completed(tasks):
+            yield await next_done
+    finally:
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+
+async def stream_zip(entries: AsyncIterator[Tuple[str, BinaryIO]]) -> AsyncIterator[bytes]:
+    """
+    Zip (name, readable stream) entries as they arrive and yield the archive in pieces
+    Entries are stored rather than deflated: DOCX/PPTX/PDF are already compressed.
+    Only one chunk of one file is in memory at a time.
+    """
+    sink = _ZipSink()
+    with zipfile.ZipFile(sink, "w", compression=zipfile.ZIP_STORED, allowZip64=True) as archive:
+        async for name, stream in entries:
+            with stream, archive.open(name, "w", force_zip64=True) as member:
+                while True:
+                    chunk = stream.read(BULK_EXPORT_CHUNK)
+                    if not chunk:
+                        break
+                    member.write(chunk)
+                    data = sink.drain()
+                    if data:
+                        yield data
+            data = sink.drain()
+            if data:
+                yield data
+    data = sink.drain()
+    if data:
+        yield data
@@ -0,0 +1,169 @@
+import os
+import time
+import threading
+from typing import Any, Dict, Type
+
+from sqlalchemy import event
+from sqlalchemy import exc as sqlalchemy_exc
+from sqlalchemy.engine import Engine
+from sqlalchemy.engine.url import make_url
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+
+# Processes serving the app (uvicorn/gunicorn workers); they share the server's connection limit
+WEB_CONCURRENCY = int(os.getenv("WEB_CONCURRENCY", "1"))
+DB_MAX_CONNECTIONS = int(os.getenv("DB_MAX_CONNECTIONS", "100"))
+# Database work expected at once per process: request handlers plus background job workers
+DB_REQUEST_CONCURRENCY = int(os.getenv("DB_REQUEST_CONCURRENCY", "10"))
+DB_JOB_CONCURRENCY = int(os.getenv("JOB_WORKERS", "4"))
+# Explicit sizes win over the derived ones
+DB_POOL_SIZE = os.getenv("DB_POOL_SIZE")
+DB_MAX_OVERFLOW = os.getenv("DB_MAX_OVERFLOW")
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "30"))  # seconds to wait for a free connection
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "1800"))  # seconds before a connection is replaced
+DB_SQLITE_BUSY_TIMEOUT = int(os.getenv("DB_SQLITE_BUSY_TIMEOUT", "5000"))  # milliseconds
+
+# Every process runs a sync and an async engine
+ENGINES_PER_PROCESS = 2
+
+
+class PoolStats:
+    """Checkout counters for one engine's pool"""
+
+    def __init__(self, name: str):
+        self.name = name
+        self.pool = None
+        self._lock = threading.Lock()
+        self.checkouts = 0
+        self.waits = 0
+        self.timeouts = 0
+        self.overflow_opened = 0
+        self.peak_overflow = 0
+        self._checkout_total = 0.0
+        self._checkout_max = 0.0
+
+    def record(self, seconds: float, waited: bool, overflow: int, opened_overflow: bool):
+        with self._lock:
+            self.checkouts += 1
+            if opened_overflow:
+                self.overflow_opened += 1
+            self._checkout_total += seconds
+            self._checkout_max = max(self._checkout_max, seconds)
+            if waited:
+                self.waits += 1
+            self.peak_overflow = max(self.peak_overflow, overflow)
+
+    def record_timeout(self):
+        with self._lock:
+            self.waits += 1
+            self.timeouts += 1
+
+    def snapshot(self) -> Dict[str, Any]:
+        data: Dict[str, Any] = {
+            "checkouts": self.checkouts,
+            "waits": self.waits,
+            "timeouts": self.timeouts,
+            "overflow_opened": self.overflow_opened,
+            "peak_overflow": self.peak_overflow,
+            "avg_checkout_ms": round(self._checkout_total / self.checkouts * 1000, 3) if self.checkouts else 0.0,
+            "max_checkout_ms": round(self._checkout_max * 1000, 3)
+        }
+        if self.pool is not None:
+            data.update({
+                "size": self.pool.size(),
+                "max_overflow": self.pool._max_overflow,
+                "checked_out": self.pool.checkedout(),
+                "overflow": max(0, self.pool.overflow())
+            })
+        return data
+
+
+def _instrumented(base: Type[QueuePool], stats: PoolStats) -> Type[QueuePool]:
+    """A subclass of the queue pool that times every checkout"""
+
+    class InstrumentedPool(base):
+        def _do_get(self):
+            # Every pooled and overflow connection is in use, so this checkout queues
+            waited = self.checkedout() >= self.size() + max(0, self._max_overflow)
+            overflow_before = self.overflow()
+            started = time.perf_counter()
+            try:
+                entry = super()._do_get()
+            except sqlalchemy_exc.TimeoutError:
+                stats.record_timeout()
+                raise
+            overflow = self.overflow()
+            opened_overflow = overflow > 0 and overflow > overflow_before
+            stats.record(time.perf_counter() - started, waited, max(0, overflow), opened_overflow)
+            return entry
+
+    InstrumentedPool.__name__ = f"Instrumented{base.__name__}"
+    return InstrumentedPool
+
+
+def pool_sizes() -> Dict[str, int]:
+    """
+    pool_size and max_overflow for one engine
+    The steady pool covers the expected concurrency; overflow absorbs bursts up
+    to this engine's share of DB_MAX_CONNECTIONS across every worker process.
+    """
+    share = max(2, DB_MAX_CONNECTIONS // (WEB_CONCURRENCY * ENGINES_PER_PROCESS))
+    demand = DB_REQUEST_CONCURRENCY + DB_JOB_CONCURRENCY
+    size = int(DB_POOL_SIZE) if DB_POOL_SIZE else min(demand, share)
+    overflow = int(DB_MAX_OVERFLOW) if DB_MAX_OVERFLOW else max(0, share - size)
+    return {"pool_size": size, "max_overflow": overflow}
+
+
+def _is_memory_sqlite(url) -> bool:
+    return url.get_backend_name() == "sqlite" and url.database in (None, "", ":memory:")
+
+
+def engine_options(database_url: str, stats: PoolStats, is_async: bool = False) -> Dict[str, Any]:
+    """Keyword arguments for create_engine / create_async_engine"""
+    url = make_url(database_url)
+    if _is_memory_sqlite(url):
+        # One connection holds the whole database; keep SQLAlchemy's default pool
+        return {}
+
+    options: Dict[str, Any] = {
+        "poolclass": _instrumented(AsyncAdaptedQueuePool if is_async else QueuePool, stats),
+        "pool_timeout": DB_POOL_TIMEOUT,
+        **pool_sizes()
+    }
+    if url.get_backend_name() == "sqlite":
+        options["connect_args"] = {"check_same_thread": False} if not is_async else {}
+    else:
+        # Drop connections the server or a proxy closed while they sat idle
+        options["pool_pre_ping"] = True
+        options["pool_recycle"] = DB_POOL_RECYCLE
+    return options
+
+
+def configure_engine(engine: Engine, stats: PoolStats):
+    """Attach the stats to the engine's pool and set SQLite pragmas on each new connection"""
+    stats.pool = engine.pool
+    if engine.dialect.name != "sqlite":
+        return
+
+    memory = _is_memory_sqlite(engine.url)
+
+    @event.listens_for(engine, "connect")
+    def _sqlite_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        # Readers no longer block the writer, and a locked database is retried instead of failing
+        if not memory:
+            cursor.execute("PRAGMA journal_mode=WAL")
+            cursor.execute("PRAGMA synchronous=NORMAL")
+        cursor.execute(f"PRAGMA busy_timeout={DB_SQLITE_BUSY_TIMEOUT}")
+        cursor.close()
+
+
+sync_pool_stats = PoolStats("sync")
+async_pool_stats = PoolStats("async")
+
+
+def pool_stats() -> Dict[str, Any]:
+    return {
+        "workers": WEB_CONCURRENCY,
+        "max_connections": DB_MAX_CONNECTIONS,
+        "engines": {stats.name: stats.snapshot() for stats in (sync_pool_stats, async_pool_stats)}
+    }
@@ -1,24 +1,112 @@
 import os
+import time
+import asyncio
 import google.generativeai as genai
-from typing import Dict, Any
+from typing import Dict, Any, List, Optional
+import re
 import json
-from app.models.project import DocumentType
+from app.models.project import DocumentType, GenerationMode
+from app.services.stream_parser import IncrementalDocumentParser
+from app.services.generation_cache import generation_cache
+from app.services.llm_governor import llm_governor, LLMBusy
+
+# Max section/slide bodies generated at once in parallel mode
+SECTION_CONCURRENCY = int(os.getenv("GEMINI_SECTION_CONCURRENCY", "5"))
+
+ORDINALS = {
+    "first": 0, "second": 1, "third": 2, "fourth": 3, "fifth": 4,
+    "sixth": 5, "seventh": 6, "eighth": 7, "ninth": 8, "tenth": 9,
+    "last": -1, "final": -1, "penultimate": -2
+}
+
+# Instructions about the whole document are never narrowed to the sections they mention
+DOCUMENT_WIDE = re.compile(
+    r"\b(?:whole|entire|overall|throughout|everywhere"
+    r"|(?:all|every|each)\s+(?:of\s+the\s+)?(?:sections?|slides?|parts?|paragraphs?|bullets?))\b"
+)
+# Follows a number that is a quantity rather than a section/slide: "slide 1 to 3 bullets"
+COUNTABLE = re.compile(
+    r"\s*(?:more\s+|fewer\s+|short\s+|shorter\s+)?"
+    r"(?:bullets?|points?|words?|sentences?|paragraphs?|lines?|items?|characters?|pages?|minutes?)\b"
+)
+
+DEFAULT_MODEL = 'models/gemini-2.5-flash'
+
+
+class RefinementNotApplied(Exception):
+    """Raised when a targeted refinement reply updated none of the requested sections/slides"""
+
 
 class DocumentGenerator:
     """Generate documents using Gemini AI"""
     
-    def __init__(self):
-        api_key = os.getenv("GEMINI_API_KEY")
-        if not api_key:
-            raise ValueError("GEMINI_API_KEY not found in environment variables")
-        genai.configure(api_key=api_key)
-        self.model = genai.GenerativeModel('models/gemini-2.5-flash')
+    def __init__(self, models: Optional[Dict[DocumentType, Any]] = None):
+        """
+        models maps each document type to a configured GenerativeModel
+        The app gets a shared instance from generator_registry; constructing one
+        without models configures the client directly, for scripts.
+        """
+        if models is None:
+            api_key = os.getenv("GEMINI_API_KEY")
+            if not api_key:
+                raise ValueError("GEMINI_API_KEY not found in environment variables")
+            genai.configure(api_key=api_key)
+            model = genai.GenerativeModel(DEFAULT_MODEL)
+            models = {document_type: model for document_type in DocumentType}
+        self.models = models
+        # model name -> call counters
+        self.metrics: Dict[str, Dict[str, float]] = {}
+    
+    def model_for(self, document_type: DocumentType):
+        return self.models[DocumentType(document_type)]
     
-    async def generate_document(self, topic: str, document_type: DocumentType) -> Dict[str, Any]:
+    async def _generate(self, document_type: DocumentType, prompt: str, stream: bool = False):
+        """Every Gemini call goes through here, so quotas, retries and metrics live in one place"""
+        model = self.model_for(document_type)
+        stats = self.metrics.setdefault(model.model_name, {"calls": 0, "errors": 0, "seconds": 0.0})
+        
+        async def call():
+            stats["calls"] += 1
+            started = time.perf_counter()
+            try:
+                return await model.generate_content_async(prompt, stream=stream)
+            except Exception:
+                stats["errors"] += 1
+                raise
+            finally:
+                # For streams this is the time until the response starts
+                stats["seconds"] += time.perf_counter() - started
+        
+        # Admission control, rate limits and retries
+        if stream:
+            return llm_governor.stream(call)
+        return await llm_governor.run(call)
+    
+    async def generate_document(
+        self,
+        topic: str,
+        document_type: DocumentType,
+        mode: GenerationMode = GenerationMode.SINGLE,
+        use_cache: bool = True
+    ) -> Dict[str, Any]:
         """
         Generate a complete document in one go
         Returns structured content based on document type
         """
+        cache_args = self._cache_args(topic, document_type, mode)
+        if use_cache:
+            cached = await generation_cache.get(*cache_args)
+            if cached is not None:
+                return cached
+        
+        content = await self._generate_uncached(topic, document_type, mode)
+        await generation_cache.put(*cache_args, content)
+        return content
+    
+    async def _generate_uncached(self, topic: str, document_type: DocumentType, mode: GenerationMode) -> Dict[str, Any]:
+        if mode == GenerationMode.PARALLEL:
+            return await self._generate_parallel(topic, document_type)
+        
         if document_type == DocumentType.DOCX:
             return await self._generate_word_document(topic)
         elif document_type == DocumentType.PPTX:
@@ -31,7 +119,7 @@ class DocumentGenerator:
         prompt = self._get_docx_prompt(topic)
 
         try:
-            response = await self.model.generate_content_async(prompt)
+            response = await self._generate(DocumentType.DOCX, prompt)
             content = response.text.strip()
             
             # Parse JSON
@@ -42,6 +130,8 @@ class DocumentGenerator:
                 "type": "docx",
                 "sections": document_data.get("sections", [])
             }
+        except LLMBusy:
+            raise
         except Exception as e:
             raise Exception(f"Error generating document: {str(e)}")
     
@@ -57,13 +147,216 @@ class DocumentGenerator:
         else:
             raise ValueError(f"Unsupported document type: {document_type}")
 
+        # Failures are raised rather than yielded: every chunk is parsed as document text
         try:
-            response = await self.model.generate_content_async(prompt, stream=True)
+            response = await self._generate(document_type, prompt, stream=True)
             async for chunk in response:
                 if chunk.text:
                     yield chunk.text
+        except LLMBusy:
+            raise
+        except Exception as e:
+            raise Exception(f"Error generating document: {str(e)}")
+
+    async def generate_document_events(
+        self,
+        topic: str,
+        document_type: DocumentType,
+        mode: GenerationMode = GenerationMode.SINGLE,
+        use_cache: bool = True
+    ):
+        """
+        Generate document content with streaming, as structured events
+        Yields {"chunk": ...} for the typing effect, section/slide events as soon as
+        each object in the JSON is complete, then {"status": "complete", "content": ...}
+        """
+        cache_args = self._cache_args(topic, document_type, mode)
+        if use_cache:
+            cached = await generation_cache.get(*cache_args)
+            if cached is not None:
+                for event in self._replay_events(cached, document_type):
+                    yield event
+                return
+        
+        if mode == GenerationMode.PARALLEL:
+            events = self._generate_parallel_events(topic, document_type)
+        else:
+            events = self._generate_single_events(topic, document_type)
+        
+        async for event in events:
+            if event.get("status") == "complete" and not event.get("partial"):
+                await generation_cache.put(*cache_args, event["content"])
+            yield event
+
+    async def _generate_single_events(self, topic: str, document_type: DocumentType):
+        """Yield chunk and per-node events from one streamed prompt"""
+        parser = IncrementalDocumentParser()
+        async for chunk in self.generate_document_stream(topic, document_type):
+            yield {"chunk": chunk}
+            for event in parser.feed(chunk):
+                yield event
+
+        yield self._finalize_stream(parser, document_type)
+
+    def _replay_events(self, content: Dict[str, Any], document_type: DocumentType):
+        """Turn a cached document into the same events a live generation produces"""
+        key = "sections" if document_type == DocumentType.DOCX else "slides"
+        kind = "section" if document_type == DocumentType.DOCX else "slide"
+        
+        yield {"event": "cache_hit"}
+        for index, node in enumerate(content.get(key, [])):
+            yield {"event": f"{kind}_started", "index": index}
+            yield {"event": f"{kind}_complete", "index": index, kind: node}
+        yield {"status": "complete", "content": content}
+
+    def _cache_args(self, topic: str, document_type: DocumentType, mode: GenerationMode):
+        """Arguments identifying a generation for the generation cache"""
+        if document_type == DocumentType.DOCX:
+            prompt = self._get_docx_prompt(topic)
+        elif document_type == DocumentType.PPTX:
+            prompt = self._get_pptx_prompt(topic)
+        else:
+            raise ValueError(f"Unsupported document type: {document_type}")
+        return prompt, topic, self.model_for(document_type).model_name, document_type.value, GenerationMode(mode).value
+
+    def _finalize_stream(self, parser: IncrementalDocumentParser, document_type: DocumentType) -> Dict[str, Any]:
+        """
+        Parse the full streamed text into the completion event
+        Falls back to the nodes seen along the way, flagged as partial.
+        """
+        key = "sections" if document_type == DocumentType.DOCX else "slides"
+        partial = False
+        try:
+            parsed_content = json.loads(self._clean_json_response(parser.text()))
+            nodes = parsed_content.get(key, [])
+        except ValueError as e:
+            # A truncated tail should not throw away sections that already arrived intact
+            if not parser.nodes:
+                raise Exception(f"Parsing error: {str(e)}")
+            nodes = parser.nodes
+            partial = True
+
+        event = {"status": "complete", "content": {"type": document_type.value, key: nodes}}
+        if partial:
+            event["partial"] = True
+        return event
+
+    async def _generate_parallel(self, topic: str, document_type: DocumentType) -> Dict[str, Any]:
+        """Outline-then-fan-out generation: one outline call, then all sections at once"""
+        content = None
+        async for event in self._generate_parallel_events(topic, document_type):
+            if event.get("status") == "complete":
+                content = event["content"]
+        return content
+
+    async def _generate_parallel_events(self, topic: str, document_type: DocumentType):
+        """Yield outline, per-node and completion events for parallel generation"""
+        key = "sections" if document_type == DocumentType.DOCX else "slides"
+        kind = "section" if document_type == DocumentType.DOCX else "slide"
+        
+        titles = await self._generate_outline(topic, document_type)
+        yield {"event": "outline", "titles": titles}
+        
+        semaphore = asyncio.Semaphore(SECTION_CONCURRENCY)
+        
+        async def generate_node(index: int):
+            async with semaphore:
+                return index, await self._generate_node(topic, document_type, titles, index)
+        
+        for index in range(len(titles)):
+            yield {"event": f"{kind}_started", "index": index}
+        
+        # Report each node as it lands, then assemble in outline order
+        nodes = [None] * len(titles)
+        tasks = [asyncio.create_task(generate_node(i)) for i in range(len(titles))]
+        try:
+            for finished in asyncio.as_completed(tasks):
+                index, node = await finished
+                nodes[index] = node
+                yield {"event": f"{kind}_complete", "index": index, kind: node}
+        finally:
+            for task in tasks:
+                task.cancel()
+        
+        yield {"status": "complete", "content": {"type": document_type.value, key: nodes}}
+
+    async def _generate_outline(self, topic: str, document_type: DocumentType) -> List[str]:
+        """Ask for the section/slide titles only"""
+        if document_type == DocumentType.DOCX:
+            what = "3-5 section titles for a comprehensive document"
+        else:
+            what = "5 slide titles for a PowerPoint presentation"
+        
+        prompt = f"""Create an outline of {what} on the topic: "{topic}"
+
+Respond in JSON format:
+{{
+    "titles": ["Title 1", "Title 2", ...]
+}}
+
+Only return the titles, in the order they should appear."""
+
+        try:
+            response = await self._generate(document_type, prompt)
+            outline = json.loads(self._clean_json_response(response.text.strip()))
+            titles = [str(t) for t in outline.get("titles", []) if t]
+            if not titles:
+                raise ValueError("Outline is empty")
+            return titles
+        except LLMBusy:
+            raise
+        except Exception as e:
+            raise Exception(f"Error generating outline: {str(e)}")
+
+    async def _generate_node(self, topic: str, document_type: DocumentType, titles: List[str], index: int) -> Dict[str, Any]:
+        """Generate the body of one section/slide, with the whole outline as context"""
+        outline = "\n".join(f"{i + 1}. {t}" for i, t in enumerate(titles))
+        title = titles[index]
+        
+        if document_type == DocumentType.DOCX:
+            prompt = f"""You are writing one section of a comprehensive document on the topic: "{topic}"
+
+Document outline:
+{outline}
+
+Write section {index + 1}, "{title}", with 2-3 paragraphs (each paragraph 3-4 sentences).
+Do not repeat material that belongs to the other sections.
+
+Respond in JSON format:
+{{
+    "title": "{title}",
+    "content": [
+        "First paragraph text...",
+        "Second paragraph text..."
+    ]
+}}"""
+        else:
+            prompt = f"""You are writing one slide of a PowerPoint presentation on the topic: "{topic}"
+
+Presentation outline:
+{outline}
+
+Write slide {index + 1}, "{title}", with 3-5 bullet points.
+Do not repeat material that belongs to the other slides.
+
+Respond in JSON format:
+{{
+    "title": "{title}",
+    "bullets": [
+        "Bullet point 1",
+        "Bullet point 2"
+    ]
+}}"""
+
+        try:
+            response = await self._generate(document_type, prompt)
+            node = json.loads(self._clean_json_response(response.text.strip()))
+            node.setdefault("title", title)
+            return node
+        except LLMBusy:
+            raise
         except Exception as e:
-            yield f"Error: {str(e)}"
+            raise Exception(f"Error generating {title!r}: {str(e)}")
 
     def _get_docx_prompt(self, topic: str) -> str:
         return f"""Create a comprehensive document on the topic: "{topic}"
@@ -118,7 +411,7 @@ Make the content engaging, informative, and well-structured for a presentation."
         prompt = self._get_pptx_prompt(topic)
 
         try:
-            response = await self.model.generate_content_async(prompt)
+            response = await self._generate(DocumentType.PPTX, prompt)
             content = response.text.strip()
             
             # Parse JSON
@@ -129,6 +422,8 @@ Make the content engaging, informative, and well-structured for a presentation."
                 "type": "pptx",
                 "slides": document_data.get("slides", [])
             }
+        except LLMBusy:
+            raise
         except Exception as e:
             raise Exception(f"Error generating presentation: {str(e)}")
     
@@ -151,7 +446,7 @@ Apply the refinement and return the updated content in the same JSON format as t
 Make sure to maintain the structure but improve it according to the refinement prompt."""
 
         try:
-            response = await self.model.generate_content_async(prompt)
+            response = await self._generate(doc_type_str, prompt)
             content = response.text.strip()
             
             # Parse JSON
@@ -168,12 +463,142 @@ Make sure to maintain the structure but improve it according to the refinement p
                     "type": "pptx",
                     "slides": refined_data.get("slides", [])
                 }
+        except LLMBusy:
+            raise
         except Exception as e:
             raise Exception(f"Error refining content: {str(e)}")
     
-    def _clean_json_response(self, content: str) -> str:
-        """Clean JSON response from markdown code blocks"""
-        # Remove markdown code blocks
+    async def refine_sections(
+        self,
+        content: Dict[str, Any],
+        refinement_prompt: str,
+        document_type: DocumentType,
+        indices: List[int]
+    ) -> Dict[str, Any]:
+        """
+        Refine only the given sections/slides and merge them back into the document
+        The model sees the targeted nodes plus an outline of titles, so the cost
+        tracks the size of the change rather than the size of the document.
+        """
+        document_type = DocumentType(document_type)
+        key = "sections" if document_type == DocumentType.DOCX else "slides"
+        kind = "section" if document_type == DocumentType.DOCX else "slide"
+        nodes = list(content.get(key, []))
+        
+        outline = "\n".join(f"{i + 1}. {node.get('title', '')}" for i, node in enumerate(nodes))
+        targets = {str(i + 1): nodes[i] for i in indices}
+        
+        prompt = f"""Refine part of a {document_type.value.upper()} document based on this instruction: "{refinement_prompt}"
+
+Document outline (for context only, do not rewrite other {kind}s):
+{outline}
+
+{kind.capitalize()}s to refine, keyed by their number in the outline:
+{json.dumps(targets, indent=2)}
+
+Apply the refinement and return only these {kind}s as a JSON object keyed by the same numbers,
+with each {kind} in the same JSON format as above."""
+
+        try:
+            response = await self._generate(document_type, prompt)
+            patch = self._parse_refinement_patch(response.text.strip(), key)
+        except LLMBusy:
+            raise
+        except Exception as e:
+            raise Exception(f"Error refining content: {str(e)}")
+        
+        if isinstance(patch, list):
+            # Some responses drop the keys and return the nodes in order
+            patch = {str(i + 1): node for i, node in zip(indices, patch)}
+        
+        updated = 0
+        for number, node in patch.items():
+            # Ignore anything the model returned outside the requested scope
+            if str(number) not in targets or not isinstance(node, dict):
+                continue
+            index = int(number) - 1
+            node.setdefault("title", nodes[index].get("title", ""))
+            nodes[index] = node
+            updated += 1
+        
+        if not updated:
+            raise RefinementNotApplied(
+                f"The refinement did not return any of the requested {kind}s: "
+                + ", ".join(sorted(targets, key=int))
+            )
+        
+        return {**content, "type": document_type.value, key: nodes}
+    
+    @staticmethod
+    def infer_refinement_targets(refinement_prompt: str, content: Dict[str, Any]) -> List[int]:
+        """
+        Guess which sections/slides an instruction is about
+        Understands "section 2", "slides 3 and 4", "slide 2 to slide 4", "the last
+        slide" and titles quoted or written out as whole words. An empty result
+        means the instruction is document-wide, or too ambiguous to narrow down.
+        """
+        nodes = content.get("sections", content.get("slides", []))
+        text = refinement_prompt.lower()
+        if DOCUMENT_WIDE.search(text):
+            return []
+        targets = set()
+        
+        for match in re.finditer(r"\b(section|slide|part)s?\s+(\d+)\s*(?:-|to|through)\s*(?:the\s+)?\1s?\s+(\d+)", text):
+            # The noun repeats, so this is a range: "slide 2 to slide 4"
+            targets.update(range(int(match.group(2)) - 1, int(match.group(3))))
+            text = text[:match.start()] + " " * (match.end() - match.start()) + text[match.end():]
+        
+        for match in re.finditer(r"\b(?:sections?|slides?|parts?)\s+((?:\d+(?:\s*(?:,|and|&|-|to)\s*)?)+)", text):
+            numbers = [int(n) for n in re.findall(r"\d+", match.group(1))]
+            spans = re.search(r"\d\s*(?:-|to)\s*\d", match.group(1)) and len(numbers) == 2
+            if COUNTABLE.match(text, match.end()):
+                # "shorten slide 1 to 3 bullets": the last number is a quantity
+                numbers = numbers[:-1]
+            elif spans and 1 <= numbers[0] < numbers[1] <= len(nodes):
+                numbers = list(range(numbers[0], numbers[1] + 1))
+            elif spans:
+                # Not a range within the document, e.g. "slide 1 to 30"
+                numbers = numbers[:1]
+            targets.update(n - 1 for n in numbers)
+        
+        for word, position in ORDINALS.items():
+            if re.search(rf"\b{word}\s+(?:section|slide|part)\b", text):
+                targets.add(position if position >= 0 else len(nodes) + position)
+        
+        titles = {}
+        for i, node in enumerate(nodes):
+            title = str(node.get("title", "")).lower().strip()
+            if len(title) >= 4 and re.search(rf"(?<!\w){re.escape(title)}(?!\w)", text):
+                titles[i] = title
+        # "market overview" names one section, not also the one titled "overview"
+        named = [i for i, title in titles.items() if not any(title != other and title in other for other in titles.values())]
+        if len(named) > 1 and not targets:
+            # Several titles and no number: likely ordinary words in a general instruction
+            return []
+        targets.update(named)
+        
+        return sorted(i for i in targets if 0 <= i < len(nodes))
+    
+    def _parse_refinement_patch(self, content: str, key: str) -> Any:
+        """
+        Parse a targeted refinement reply into a number-keyed dict or an ordered list
+        Accepts {"2": {...}}, [{...}] and {"sections"/"slides": [{...}]}. The raw
+        reply is parsed before falling back to brace slicing, which would turn a
+        bare list into invalid JSON.
+        """
+        try:
+            patch = json.loads(self._strip_code_fence(content))
+        except json.JSONDecodeError:
+            patch = json.loads(self._clean_json_response(content))
+        
+        if isinstance(patch, dict) and isinstance(patch.get(key), list):
+            patch = patch[key]
+        if not isinstance(patch, (dict, list)):
+            raise ValueError("Refinement reply is not a JSON object or list")
+        return patch
+    
+    def _strip_code_fence(self, content: str) -> str:
+        """Remove a surrounding markdown code block"""
         if content.startswith("```json"):
             content = content[7:]
         elif content.startswith("```"):
@@ -182,7 +607,11 @@ Make sure to maintain the structure but improve it according to the refinement p
         if content.endswith("```"):
             content = content[:-3]
             
-        content = content.strip()
+        return content.strip()
+    
+    def _clean_json_response(self, content: str) -> str:
+        """Clean JSON response from markdown code blocks"""
+        content = self._strip_code_fence(content)
         
         # Find first { and last }
         start = content.find("{")
@@ -0,0 +1,276 @@
+import io
+import os
+import json
+import hashlib
+import tempfile
+import time
+import threading
+from collections import OrderedDict
+from typing import BinaryIO, Dict, Optional, Set, Tuple
+
+EXPORT_CACHE_DIR = os.getenv(
+    "EXPORT_CACHE_DIR",
+    os.path.join(tempfile.gettempdir(), "oceanai_export_cache")
+)
+EXPORT_CACHE_MEMORY_BYTES = int(os.getenv("EXPORT_CACHE_MEMORY_BYTES", str(64 * 1024 * 1024)))
+EXPORT_CACHE_DISK_BYTES = int(os.getenv("EXPORT_CACHE_DISK_BYTES", str(512 * 1024 * 1024)))
+
+# Unfinished files older than this were left by a crashed export and are swept
+TMP_MAX_AGE = 3600
+
+
+class ExportCache:
+    """
+    Two-tier cache for exported DOCX/PPTX/PDF artifacts
+    Entries are content-addressed, so a changed document simply misses;
+    invalidate_project() drops stale artifacts eagerly when content is rewritten.
+    Files being written live in a tmp/ subdirectory until they are complete, so
+    eviction and size accounting only ever see finished entries. Disk entries
+    are indexed by project; entries another worker process wrote are not in
+    this process's index and are left to eviction.
+    """
+
+    def __init__(self, directory: str, max_memory_bytes: int, max_disk_bytes: int):
+        self.directory = directory
+        self.max_memory_bytes = max_memory_bytes
+        self.max_disk_bytes = max_disk_bytes
+
+        self._lock = threading.Lock()
+        self._memory: "OrderedDict[str, tuple]" = OrderedDict()  # key -> (project_id, bytes)
+        self._memory_bytes = 0
+        self._tmp_dir = os.path.join(directory, "tmp")
+        # Both computed lazily from one scan of the directory
+        self._disk_bytes: Optional[int] = None
+        self._disk_keys: Optional[Dict[int, Set[str]]] = None  # project id -> keys on disk
+
+    @staticmethod
+    def make_key(
+        generated_content: str,
+        title: str,
+        document_type: str,
+        artifact: str,
+        template_id: Optional[str] = None,
+        local_template: Optional[str] = None
+    ) -> str:
+        """Hash everything that influences the exported bytes"""
+        from app.services.file_exporter import FileExporter
+        from app.services.export_templates import DEFAULT_TEMPLATE
+
+        doc_type_str = str(document_type.value) if hasattr(document_type, 'value') else str(document_type)
+        parts = [
+            generated_content,
+            title,
+            doc_type_str,
+            artifact,
+            template_id or "",
+            FileExporter.EXPORTER_VERSION
+        ]
+        if local_template and local_template != DEFAULT_TEMPLATE:
+            # Appended only when set, so default-template keys stay as they were
+            parts.append(local_template)
+        payload = json.dumps(parts)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def get(self, project_id: int, key: str) -> Optional[bytes]:
+        """Return cached bytes from memory or disk, or None on a miss"""
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                self._memory.move_to_end(key)
+                return entry[1]
+
+        path = self._path(project_id, key)
+        try:
+            with open(path, "rb") as f:
+                data = f.read()
+            os.utime(path)  # Keep recently used files away from eviction
+        except OSError:
+            return None
+
+        with self._lock:
+            self._remember(project_id, key, data)
+        return data
+
+    def open(self, project_id: int, key: str) -> Optional[BinaryIO]:
+        """
+        A readable stream over a cached artifact, or None on a miss
+        Disk entries are streamed from the file instead of being loaded into memory.
+        """
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                self._memory.move_to_end(key)
+                return io.BytesIO(entry[1])
+
+        path = self._path(project_id, key)
+        try:
+            f = open(path, "rb")
+            os.utime(path)
+        except OSError:
+            return None
+        return f
+
+    def temp_path(self) -> str:
+        """A new file in the cache directory for an artifact to be written to before put_file"""
+        os.makedirs(self._tmp_dir, exist_ok=True)
+        fd, path = tempfile.mkstemp(dir=self._tmp_dir, suffix=".tmp")
+        os.close(fd)
+        return path
+
+    def put_file(self, project_id: int, key: str, tmp_path: str):
+        """Move a file made by temp_path into the disk tier; the memory tier is skipped"""
+        try:
+            path = self._path(project_id, key)
+            replaced_bytes = os.path.getsize(path) if os.path.exists(path) else 0
+            size = os.path.getsize(tmp_path)
+            os.replace(tmp_path, path)
+
+            with self._lock:
+                self._track(project_id, key, size - replaced_bytes)
+        except OSError as e:
+            print(f"Warning: Failed to write export cache entry {key}: {e}")
+            try:
+                os.remove(tmp_path)
+            except OSError:
+                pass
+
+    def put(self, project_id: int, key: str, data: bytes):
+        """Store an artifact in both tiers"""
+        with self._lock:
+            self._remember(project_id, key, data)
+
+        try:
+            path = self._path(project_id, key)
+            replaced_bytes = os.path.getsize(path) if os.path.exists(path) else 0
+            tmp_path = self.temp_path()
+            with open(tmp_path, "wb") as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+
+            with self._lock:
+                self._track(project_id, key, len(data) - replaced_bytes)
+        except OSError as e:
+            print(f"Warning: Failed to write export cache entry {key}: {e}")
+
+    def invalidate_project(self, project_id: int):
+        """Drop every cached artifact of a project"""
+        with self._lock:
+            for key in [k for k, (pid, _) in self._memory.items() if pid == project_id]:
+                _, data = self._memory.pop(key)
+                self._memory_bytes -= len(data)
+
+            self._ensure_scanned()
+            for key in list(self._disk_keys.get(project_id, ())):
+                self._remove_entry(project_id, key)
+
+    def clear(self):
+        """Drop everything (both tiers); files still being written are left alone"""
+        with self._lock:
+            self._memory.clear()
+            self._memory_bytes = 0
+            self._ensure_scanned()
+            for project_id, keys in list(self._disk_keys.items()):
+                for key in list(keys):
+                    self._remove_entry(project_id, key)
+
+    def _path(self, project_id: int, key: str) -> str:
+        return os.path.join(self.directory, f"{project_id}_{key}.bin")
+
+    def _remember(self, project_id: int, key: str, data: bytes):
+        """Insert into the memory tier and evict least recently used entries (lock held)"""
+        if len(data) > self.max_memory_bytes:
+            return
+
+        existing = self._memory.pop(key, None)
+        if existing is not None:
+            self._memory_bytes -= len(existing[1])
+
+        self._memory[key] = (project_id, data)
+        self._memory_bytes += len(data)
+
+        while self._memory_bytes > self.max_memory_bytes and self._memory:
+            _, (_, evicted) = self._memory.popitem(last=False)
+            self._memory_bytes -= len(evicted)
+
+    @staticmethod
+    def _parse_name(name: str) -> Optional[Tuple[int, str]]:
+        """(project id, key) of an entry's file name, None for anything else"""
+        stem, extension = os.path.splitext(name)
+        project_id, _, key = stem.partition("_")
+        if extension != ".bin" or not project_id.isdigit() or not key:
+            return None
+        return int(project_id), key
+
+    def _ensure_scanned(self):
+        """Build the size counter and project index from the directory once (lock held)"""
+        if self._disk_keys is not None:
+            return
+        self._disk_bytes = 0
+        self._disk_keys = {}
+        try:
+            entries = list(os.scandir(self.directory))
+        except OSError:
+            return
+        for entry in entries:
+            parsed = self._parse_name(entry.name)
+            if parsed and entry.is_file():
+                self._disk_bytes += entry.stat().st_size
+                self._disk_keys.setdefault(parsed[0], set()).add(parsed[1])
+        self._sweep_tmp()
+
+    def _sweep_tmp(self):
+        cutoff = time.time() - TMP_MAX_AGE
+        try:
+            entries = list(os.scandir(self._tmp_dir))
+        except OSError:
+            return
+        for entry in entries:
+            try:
+                if entry.stat().st_mtime < cutoff:
+                    os.remove(entry.path)
+            except OSError:
+                pass
+
+    def _track(self, project_id: int, key: str, added_bytes: int):
+        """Account for an entry just moved into the disk tier, then evict (lock held)"""
+        if self._disk_keys is None:
+            # The scan sees the new file itself
+            self._ensure_scanned()
+        else:
+            self._disk_bytes += added_bytes
+            self._disk_keys.setdefault(project_id, set()).add(key)
+        self._evict_disk()
+
+    def _evict_disk(self):
+        """Remove least recently used entries until the disk tier fits (lock held)"""
+        if self._disk_bytes <= self.max_disk_bytes:
+            return
+
+        entries = []
+        for entry in os.scandir(self.directory):
+            parsed = self._parse_name(entry.name)
+            if parsed and entry.is_file():
+                entries.append((entry.stat().st_mtime, parsed))
+        entries.sort()
+        for _, (project_id, key) in entries:
+            if self._disk_bytes <= self.max_disk_bytes:
+                break
+            self._remove_entry(project_id, key)
+
+    def _remove_entry(self, project_id: int, key: str):
+        """Delete a disk entry and keep the size counter and index in sync (lock held)"""
+        keys = self._disk_keys.get(project_id)
+        if keys is not None:
+            keys.discard(key)
+            if not keys:
+                del self._disk_keys[project_id]
+        path = self._path(project_id, key)
+        try:
+            size = os.path.getsize(path)
+            os.remove(path)
+        except OSError:
+            return
+        self._disk_bytes -= size
+
+
+export_cache = ExportCache(EXPORT_CACHE_DIR, EXPORT_CACHE_MEMORY_BYTES, EXPORT_CACHE_DISK_BYTES)
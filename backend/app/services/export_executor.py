@@ -0,0 +1,87 @@
+import os
+import asyncio
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Callable, Dict, Optional
+
+EXPORT_WORKERS = int(os.getenv("EXPORT_WORKERS", "2"))
+EXPORT_MAX_PENDING = int(os.getenv("EXPORT_MAX_PENDING", "16"))
+
+
+class ExportQueueFull(Exception):
+    """Raised when EXPORT_MAX_PENDING builds are already queued or running"""
+
+
+def _warm_worker():
+    """Pre-import the document libraries so the first export in a worker is not slow"""
+    import docx  # noqa: F401
+    import pptx  # noqa: F401
+    import PIL.Image  # noqa: F401
+    from app.services import slide_renderer
+    from app.services.export_templates import export_templates
+
+    # Parse the export templates once; each export works on a copy
+    export_templates.load()
+    # Measure the layouts the preview renderer draws into
+    slide_renderer._layout_geometry()
+
+
+def _ping() -> int:
+    return os.getpid()
+
+
+class ExportExecutor:
+    """
+    Bounded process pool for CPU-bound file building (python-docx, python-pptx, Pillow)
+    Keeps document rendering off the event loop and the API threadpool, and
+    rejects new work once too many builds are pending instead of queueing forever.
+    """
+
+    def __init__(self, max_workers: int, max_pending: int):
+        self.max_workers = max_workers
+        self.max_pending = max_pending
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self._pending = 0
+        self._completed = 0
+        self._rejected = 0
+
+    def start(self):
+        """Create the pool and spin up every worker ahead of the first request"""
+        if self._pool is not None:
+            return
+        self._pool = ProcessPoolExecutor(max_workers=self.max_workers, initializer=_warm_worker)
+        for _ in range(self.max_workers):
+            self._pool.submit(_ping)
+
+    def shutdown(self):
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+
+    async def run(self, fn: Callable[..., Any], *args) -> Any:
+        """Run a picklable function in the pool, applying backpressure"""
+        if self._pending >= self.max_pending:
+            self._rejected += 1
+            raise ExportQueueFull("Too many exports in progress, try again shortly")
+
+        if self._pool is None:
+            self.start()
+
+        self._pending += 1
+        try:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self._pool, fn, *args)
+        finally:
+            self._pending -= 1
+            self._completed += 1
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "workers": self.max_workers,
+            "pending": self._pending,
+            "max_pending": self.max_pending,
+            "completed": self._completed,
+            "rejected": self._rejected
+        }
+
+
+export_executor = ExportExecutor(EXPORT_WORKERS, EXPORT_MAX_PENDING)
@@ -0,0 +1,176 @@
+import io
+import os
+import copy
+import zipfile
+import threading
+from typing import Any, Dict, List, Optional, Tuple
+
+from app.models.project import DocumentType
+
+# Branded templates (.dotx/.docx for Word, .potx/.pptx for PowerPoint), named by file stem
+EXPORT_TEMPLATE_DIR = os.getenv("EXPORT_TEMPLATE_DIR")
+EXPORT_TEMPLATE = os.getenv("EXPORT_TEMPLATE", "default")
+# Per-user choice, e.g. "12=acme,40=acme-dark"; users not listed get EXPORT_TEMPLATE
+EXPORT_USER_TEMPLATES = os.getenv("EXPORT_USER_TEMPLATES", "")
+
+DEFAULT_TEMPLATE = "default"
+
+EXTENSIONS = {
+    ".dotx": DocumentType.DOCX,
+    ".docx": DocumentType.DOCX,
+    ".potx": DocumentType.PPTX,
+    ".pptx": DocumentType.PPTX
+}
+
+# python-docx/python-pptx only open documents, so template packages are relabelled on load
+TEMPLATE_CONTENT_TYPES = {
+    DocumentType.DOCX: (
+        b"application/vnd.openxmlformats-officedocument.wordprocessingml.template.main+xml",
+        b"application/vnd.openxmlformats-officedocument.wordprocessingml.document.main+xml"
+    ),
+    DocumentType.PPTX: (
+        b"application/vnd.openxmlformats-officedocument.presentationml.template.main+xml",
+        b"application/vnd.openxmlformats-officedocument.presentationml.presentation.main+xml"
+    )
+}
+
+
+def _parse_user_templates(value: str) -> Dict[int, str]:
+    choices = {}
+    for pair in value.split(","):
+        user_id, _, name = pair.partition("=")
+        if user_id.strip().isdigit() and name.strip():
+            choices[int(user_id)] = name.strip()
+    return choices
+
+
+def _open_package(document_type: DocumentType, path: Optional[str] = None):
+    """Parse a template file, or the library's bundled default when path is None"""
+    if document_type == DocumentType.DOCX:
+        from docx import Document as open_package
+    else:
+        from pptx import Presentation as open_package
+
+    if path is None:
+        return open_package()
+
+    with zipfile.ZipFile(path) as source:
+        template_type, document_content_type = TEMPLATE_CONTENT_TYPES[document_type]
+        if template_type not in source.read("[Content_Types].xml"):
+            return open_package(path)
+
+        relabelled = io.BytesIO()
+        with zipfile.ZipFile(relabelled, "w", zipfile.ZIP_DEFLATED) as target:
+            for item in source.infolist():
+                data = source.read(item.filename)
+                if item.filename == "[Content_Types].xml":
+                    data = data.replace(template_type, document_content_type)
+                target.writestr(item, data)
+    relabelled.seek(0)
+    return open_package(relabelled)
+
+
+def _read_only_parts(document_type: DocumentType, parsed) -> Dict[int, Any]:
+    """
+    Parts an export reads but never writes, keyed by id for copy.deepcopy's memo
+    The Word style sheet is most of what a clone would otherwise copy; paragraphs
+    only look styles up in it. Presentations are cheap to copy whole.
+    """
+    if document_type != DocumentType.DOCX:
+        return {}
+    from docx.parts.styles import StylesPart
+
+    return {
+        id(part): part
+        for part in parsed.part.package.iter_parts()
+        if isinstance(part, StylesPart)
+    }
+
+
+class ExportTemplateRegistry:
+    """
+    Parsed python-docx/python-pptx templates, loaded once per process
+    Building a Document() or Presentation() re-reads and re-parses the whole
+    template package; exports instead get a deep copy of an already parsed one.
+    """
+
+    def __init__(self, directory: Optional[str], default_name: str, user_templates: Dict[int, str]):
+        self.directory = directory
+        self.default_name = default_name
+        self.user_templates = user_templates
+        self._lock = threading.Lock()
+        self._paths = self._discover()
+        # document type -> template name -> (parsed package, deepcopy memo of parts clones share)
+        self._parsed: Dict[DocumentType, Dict[str, Tuple[Any, Dict[int, Any]]]] = {
+            DocumentType.DOCX: {},
+            DocumentType.PPTX: {}
+        }
+
+    def load(self):
+        """Parse every known template now instead of on first use"""
+        for document_type, names in self._paths.items():
+            for name in list(names):
+                try:
+                    self.template(document_type, name)
+                except Exception as e:
+                    if name == DEFAULT_TEMPLATE:
+                        raise
+                    print(f"Warning: Skipping export template {name}: {e}")
+                    del names[name]
+
+    def names(self, document_type: DocumentType) -> List[str]:
+        return sorted(self._paths[document_type])
+
+    def select(self, user_id: Optional[int], document_type: DocumentType) -> str:
+        """The template a user's exports of this type are built from"""
+        name = self.user_templates.get(user_id, self.default_name)
+        return name if name in self._paths[document_type] else DEFAULT_TEMPLATE
+
+    def template(self, document_type: DocumentType, name: str = DEFAULT_TEMPLATE):
+        """The shared parsed template; read it, never modify it"""
+        return self._entry(document_type, name)[0]
+
+    def clone(self, document_type: DocumentType, name: str = DEFAULT_TEMPLATE):
+        """A private copy of a template to build one export in"""
+        parsed, shared = self._entry(document_type, name)
+        # Seeding the memo makes every clone reference the shared parts instead of copying them
+        return copy.deepcopy(parsed, dict(shared))
+
+    def _entry(self, document_type: DocumentType, name: str) -> Tuple[Any, Dict[int, Any]]:
+        if name not in self._paths[document_type]:
+            name = DEFAULT_TEMPLATE
+        entry = self._parsed[document_type].get(name)
+        if entry is None:
+            with self._lock:
+                entry = self._parsed[document_type].get(name)
+                if entry is None:
+                    parsed = _open_package(document_type, self._paths[document_type][name])
+                    entry = (parsed, _read_only_parts(document_type, parsed))
+                    self._parsed[document_type][name] = entry
+        return entry
+
+    def _discover(self) -> Dict[DocumentType, Dict[str, Optional[str]]]:
+        paths: Dict[DocumentType, Dict[str, Optional[str]]] = {
+            DocumentType.DOCX: {DEFAULT_TEMPLATE: None},
+            DocumentType.PPTX: {DEFAULT_TEMPLATE: None}
+        }
+        if not self.directory:
+            return paths
+        try:
+            names = sorted(os.listdir(self.directory))
+        except OSError as e:
+            print(f"Warning: Export template directory unavailable: {e}")
+            return paths
+        for filename in names:
+            stem, extension = os.path.splitext(filename)
+            document_type = EXTENSIONS.get(extension.lower())
+            if document_type and stem != DEFAULT_TEMPLATE:
+                paths[document_type].setdefault(stem, os.path.join(self.directory, filename))
+        return paths
+
+
+export_templates = ExportTemplateRegistry(
+    EXPORT_TEMPLATE_DIR,
+    EXPORT_TEMPLATE,
+    _parse_user_templates(EXPORT_USER_TEMPLATES)
+)
@@ -0,0 +1,204 @@
+import os
+import re
+import json
+import time
+import asyncio
+import hashlib
+import threading
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from typing import Any, Dict, FrozenSet, Optional, Tuple
+
+from app.database import SessionLocal
+from app.models.generation_cache import GenerationCacheEntry
+
+GENERATION_CACHE_TTL = int(os.getenv("GENERATION_CACHE_TTL", str(24 * 3600)))  # seconds
+GENERATION_CACHE_SIZE = int(os.getenv("GENERATION_CACHE_SIZE", "512"))
+GENERATION_CACHE_PERSIST = os.getenv("GENERATION_CACHE_PERSIST", "true").lower() == "true"
+# Jaccard similarity over topic shingles needed for a near-duplicate hit; 0 disables the tier
+GENERATION_CACHE_SIMILARITY = float(os.getenv("GENERATION_CACHE_SIMILARITY", "0"))
+
+SHINGLE_SIZE = 4
+
+
+def normalize_text(text: str) -> str:
+    """Lowercase, drop punctuation and collapse whitespace"""
+    text = re.sub(r"[^\w\s]", " ", text.lower())
+    return " ".join(text.split())
+
+
+def _shingles(text: str) -> FrozenSet[str]:
+    padded = f" {text} "
+    if len(padded) <= SHINGLE_SIZE:
+        return frozenset([padded])
+    return frozenset(padded[i:i + SHINGLE_SIZE] for i in range(len(padded) - SHINGLE_SIZE + 1))
+
+
+class GenerationCache:
+    """
+    Cache of generated documents in front of Gemini
+    Exact hits are keyed on the normalized prompt, model, document type and mode,
+    with an in-process LRU and a database tier. An optional near-duplicate tier
+    matches recent topics by character-shingle similarity.
+    """
+
+    def __init__(self, ttl: int, max_entries: int, persist: bool, similarity: float):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.persist = persist
+        self.similarity = similarity
+
+        self._lock = threading.Lock()
+        # key -> (expires_at epoch, content JSON)
+        self._memory: "OrderedDict[str, Tuple[float, str]]" = OrderedDict()
+        # key -> (topic shingles, (model, document type, mode))
+        self._topics: "OrderedDict[str, Tuple[FrozenSet[str], Tuple[str, str, str]]]" = OrderedDict()
+        self.hits = 0
+        self.near_hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def make_key(prompt: str, model_name: str, document_type: str, mode: str) -> str:
+        payload = json.dumps([normalize_text(prompt), model_name, document_type, mode])
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    async def get(
+        self,
+        prompt: str,
+        topic: str,
+        model_name: str,
+        document_type: str,
+        mode: str
+    ) -> Optional[Dict[str, Any]]:
+        """Return a cached document or None"""
+        key = self.make_key(prompt, model_name, document_type, mode)
+
+        content = self._memory_get(key)
+        if content is None and self.persist:
+            content = await asyncio.to_thread(self._db_get, key)
+            if content is not None:
+                self._remember(key, content, normalize_text(topic), (model_name, document_type, mode))
+
+        if content is None and self.similarity > 0:
+            near_key = self._find_similar(normalize_text(topic), (model_name, document_type, mode))
+            if near_key:
+                content = self._memory_get(near_key)
+                if content is not None:
+                    self.near_hits += 1
+
+        if content is None:
+            self.misses += 1
+            return None
+
+        self.hits += 1
+        return json.loads(content)
+
+    async def put(
+        self,
+        prompt: str,
+        topic: str,
+        model_name: str,
+        document_type: str,
+        mode: str,
+        document: Dict[str, Any]
+    ):
+        """Store a freshly generated document"""
+        key = self.make_key(prompt, model_name, document_type, mode)
+        content = json.dumps(document)
+        normalized_topic = normalize_text(topic)
+
+        self._remember(key, content, normalized_topic, (model_name, document_type, mode))
+        if self.persist:
+            await asyncio.to_thread(
+                self._db_put, key, content, normalized_topic, model_name, document_type, mode
+            )
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "entries": len(self._memory),
+            "hits": self.hits,
+            "near_hits": self.near_hits,
+            "misses": self.misses
+        }
+
+    def _memory_get(self, key: str) -> Optional[str]:
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is None:
+                return None
+            expires_at, content = entry
+            if expires_at < time.time():
+                self._memory.pop(key, None)
+                self._topics.pop(key, None)
+                return None
+            self._memory.move_to_end(key)
+            return content
+
+    def _remember(self, key: str, content: str, normalized_topic: str, scope: Tuple[str, str, str]):
+        with self._lock:
+            self._memory[key] = (time.time() + self.ttl, content)
+            self._memory.move_to_end(key)
+            self._topics[key] = (_shingles(normalized_topic), scope)
+            self._topics.move_to_end(key)
+
+            while len(self._memory) > self.max_entries:
+                evicted, _ = self._memory.popitem(last=False)
+                self._topics.pop(evicted, None)
+
+    def _find_similar(self, normalized_topic: str, scope: Tuple[str, str, str]) -> Optional[str]:
+        """Most similar recent topic in the same scope, if it clears the threshold"""
+        shingles = _shingles(normalized_topic)
+        best_key, best_score = None, 0.0
+        with self._lock:
+            for key, (other, other_scope) in self._topics.items():
+                if other_scope != scope:
+                    continue
+                score = len(shingles & other) / len(shingles | other)
+                if score > best_score:
+                    best_key, best_score = key, score
+        return best_key if best_score >= self.similarity else None
+
+    def _db_get(self, key: str) -> Optional[str]:
+        db = SessionLocal()
+        try:
+            entry = db.query(GenerationCacheEntry).filter(
+                GenerationCacheEntry.key == key,
+                GenerationCacheEntry.expires_at > datetime.utcnow()
+            ).first()
+            return entry.content if entry else None
+        except Exception as e:
+            print(f"Warning: Generation cache lookup failed: {e}")
+            return None
+        finally:
+            db.close()
+
+    def _db_put(self, key: str, content: str, normalized_topic: str, model_name: str, document_type: str, mode: str):
+        db = SessionLocal()
+        try:
+            now = datetime.utcnow()
+            db.query(GenerationCacheEntry).filter(
+                GenerationCacheEntry.expires_at <= now
+            ).delete(synchronize_session=False)
+            db.merge(GenerationCacheEntry(
+                key=key,
+                model_name=model_name,
+                document_type=document_type,
+                mode=mode,
+                topic=normalized_topic,
+                content=content,
+                expires_at=now + timedelta(seconds=self.ttl)
+            ))
+            db.commit()
+        except Exception as e:
+            db.rollback()
+            print(f"Warning: Generation cache write failed: {e}")
+        finally:
+            db.close()
+
+
+generation_cache = GenerationCache(
+    GENERATION_CACHE_TTL,
+    GENERATION_CACHE_SIZE,
+    GENERATION_CACHE_PERSIST,
+    GENERATION_CACHE_SIMILARITY
+)
@@ -0,0 +1,272 @@
+import os
+import json
+import uuid
+import asyncio
+from datetime import datetime, timedelta
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Optional, Tuple
+
+from sqlalchemy import delete, select
+
+from app.database import AsyncSessionLocal
+from app.models.generation_run import GenerationRunEvent
+
+RUN_BUFFER_EVENTS = int(os.getenv("RUN_BUFFER_EVENTS", "256"))  # events a run keeps in memory
+RUN_RETENTION = float(os.getenv("RUN_RETENTION", "300"))  # seconds a finished run stays resumable
+# Spilled events older than this are left over from a previous process and purged at startup
+RUN_EVENT_MAX_AGE = int(os.getenv("RUN_EVENT_MAX_AGE", "3600"))
+RUN_SUBSCRIBER_QUEUE = int(os.getenv("RUN_SUBSCRIBER_QUEUE", "64"))  # live events buffered per subscriber
+# What happens to a subscriber whose queue fills up: "catchup" replays what it
+# missed from the run's log, "disconnect" ends its stream so the client resumes
+RUN_SLOW_CONSUMER = os.getenv("RUN_SLOW_CONSUMER", "catchup")
+
+
+class _Subscriber:
+    """A live listener's bounded queue of (seq, event JSON); None marks the end of the run"""
+
+    def __init__(self, size: int):
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=size)
+        self.lagged = False
+
+    def offer(self, item) -> bool:
+        """Queue an item without blocking the producer; False once the subscriber fell behind"""
+        try:
+            self.queue.put_nowait(item)
+            return True
+        except asyncio.QueueFull:
+            self.lagged = True
+            return False
+
+
+class GenerationRun:
+    """
+    One generation, the log of every event it produced and its live subscribers
+    Events are numbered from 1. The newest RUN_BUFFER_EVENTS stay in memory and
+    older ones move to the generation_run_events table, so a client can resume
+    from any event id while the run is retained. Subscribers that have caught up
+    with the log receive new events through their own bounded queue, so a slow
+    client never holds up the producer or the other subscribers.
+    """
+
+    def __init__(self, run_id: str, project_id: int, owner_id: int):
+        self.id = run_id
+        self.project_id = project_id
+        self.owner_id = owner_id
+        # (seq, event JSON) for seq >= first_seq
+        self.events: List[Tuple[int, str]] = []
+        self.first_seq = 1
+        self.last_seq = 0
+        self.spilled = 0
+        self.done = False
+        self.task: Optional[asyncio.Task] = None
+        self.lagged = 0
+        self._subscribers: List[_Subscriber] = []
+
+    def event_id(self, seq: int) -> str:
+        return f"{self.id}:{seq}"
+
+    @property
+    def subscribers(self) -> int:
+        return len(self._subscribers)
+
+    async def append(self, data: str):
+        self.last_seq += 1
+        item = (self.last_seq, data)
+        self.events.append(item)
+        for subscriber in list(self._subscribers):
+            if not subscriber.offer(item):
+                self._drop(subscriber)
+        if len(self.events) > RUN_BUFFER_EVENTS:
+            await self._spill()
+
+    def finish(self):
+        self.done = True
+        for subscriber in list(self._subscribers):
+            if not subscriber.offer(None):
+                self._drop(subscriber)
+
+    async def subscribe(self, after_seq: int = 0) -> AsyncIterator[Tuple[int, str]]:
+        """Every event after after_seq, then live events until the run finishes"""
+        cursor = after_seq
+        while True:
+            if cursor + 1 < self.first_seq:
+                spilled = await self._load_spilled(cursor + 1, self.first_seq)
+                if not spilled:
+                    # Rows already purged; skip to what is still in memory
+                    cursor = self.first_seq - 1
+                for seq, data in spilled:
+                    cursor = seq
+                    yield seq, data
+                continue
+
+            if cursor < self.last_seq:
+                for seq, data in self.events[cursor + 1 - self.first_seq:]:
+                    cursor = seq
+                    yield seq, data
+                continue
+
+            if self.done:
+                return
+
+            # Caught up: follow the run live. Nothing was awaited since the
+            # checks above, so no event can slip in between.
+            subscriber = _Subscriber(RUN_SUBSCRIBER_QUEUE)
+            self._subscribers.append(subscriber)
+            try:
+                while True:
+                    item = await subscriber.queue.get()
+                    if item is None:
+                        return
+                    cursor = item[0]
+                    yield item
+                    if subscriber.lagged and subscriber.queue.empty():
+                        break
+            finally:
+                if subscriber in self._subscribers:
+                    self._subscribers.remove(subscriber)
+
+            if RUN_SLOW_CONSUMER == "disconnect":
+                return
+            # Otherwise replay what was missed from the log and attach again
+
+    def _drop(self, subscriber: _Subscriber):
+        self.lagged += 1
+        if subscriber in self._subscribers:
+            self._subscribers.remove(subscriber)
+
+    async def _spill(self):
+        """Move the older half of the buffer to the database"""
+        count = len(self.events) - RUN_BUFFER_EVENTS // 2
+        moved = self.events[:count]
+        try:
+            async with AsyncSessionLocal() as db:
+                db.add_all([GenerationRunEvent(run_id=self.id, seq=seq, data=data) for seq, data in moved])
+                await db.commit()
+        except Exception as e:
+            # Keep everything in memory rather than lose events
+            print(f"Warning: Could not spill generation run events: {e}")
+            return
+        del self.events[:count]
+        self.first_seq = moved[-1][0] + 1
+        self.spilled += len(moved)
+
+    async def _load_spilled(self, start: int, end: int) -> List[Tuple[int, str]]:
+        async with AsyncSessionLocal() as db:
+            result = await db.execute(
+                select(GenerationRunEvent.seq, GenerationRunEvent.data)
+                .where(
+                    GenerationRunEvent.run_id == self.id,
+                    GenerationRunEvent.seq >= start,
+                    GenerationRunEvent.seq < end
+                )
+                .order_by(GenerationRunEvent.seq)
+            )
+            return [(seq, data) for seq, data in result.all()]
+
+
+class GenerationRunRegistry:
+    """
+    Generation runs that outlive the connection that started them
+    A run keeps going when its client disconnects and is kept for RUN_RETENTION
+    seconds after it finishes. At most one run per project is in flight: later
+    requests for the project subscribe to it instead of calling the model again.
+    Runs live in this process's memory, so a client only resumes or joins a run
+    on the worker that started it.
+    """
+
+    def __init__(self):
+        self._runs: Dict[str, GenerationRun] = {}
+        # project id -> its in-flight run
+        self._active: Dict[int, GenerationRun] = {}
+
+    async def start(self):
+        """Drop events spilled by runs of a previous process"""
+        cutoff = datetime.utcnow() - timedelta(seconds=RUN_EVENT_MAX_AGE)
+        try:
+            async with AsyncSessionLocal() as db:
+                await db.execute(delete(GenerationRunEvent).where(GenerationRunEvent.created_at < cutoff))
+                await db.commit()
+        except Exception as e:
+            print(f"Warning: Could not purge old generation run events: {e}")
+
+    async def stop(self):
+        tasks = [run.task for run in self._runs.values() if run.task]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self._runs.clear()
+
+    def create(
+        self,
+        project_id: int,
+        owner_id: int,
+        events: AsyncIterator[Dict[str, Any]],
+        on_complete: Callable[[Dict[str, Any]], Awaitable[None]]
+    ) -> GenerationRun:
+        """
+        Start a run in the background
+        on_complete receives the finished document before the complete event is
+        logged, so a client that sees it can rely on the content being stored.
+        Partial documents are not passed to it.
+        """
+        run = GenerationRun(uuid.uuid4().hex, project_id, owner_id)
+        self._runs[run.id] = run
+        self._active[project_id] = run
+        run.task = asyncio.create_task(self._produce(run, events, on_complete))
+        return run
+
+    def get(self, run_id: str) -> Optional[GenerationRun]:
+        return self._runs.get(run_id)
+
+    def in_flight(self, project_id: int) -> Optional[GenerationRun]:
+        """The project's run that is still generating, if any"""
+        run = self._active.get(project_id)
+        return run if run and not run.done else None
+
+    async def _produce(
+        self,
+        run: GenerationRun,
+        events: AsyncIterator[Dict[str, Any]],
+        on_complete: Callable[[Dict[str, Any]], Awaitable[None]]
+    ):
+        try:
+            try:
+                async for event in events:
+                    # A partial document (truncated stream) is shown but never saved
+                    if event.get("status") == "complete" and not event.get("partial"):
+                        await on_complete(event["content"])
+                    await run.append(json.dumps(event))
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                await run.append(json.dumps({"error": str(e)}))
+            finally:
+                run.finish()
+                if self._active.get(run.project_id) is run:
+                    del self._active[run.project_id]
+            await asyncio.sleep(RUN_RETENTION)
+        finally:
+            await self._discard(run)
+
+    async def _discard(self, run: GenerationRun):
+        self._runs.pop(run.id, None)
+        if not run.spilled:
+            return
+        try:
+            async with AsyncSessionLocal() as db:
+                await db.execute(delete(GenerationRunEvent).where(GenerationRunEvent.run_id == run.id))
+                await db.commit()
+        except Exception as e:
+            print(f"Warning: Could not delete generation run events: {e}")
+
+    def stats(self) -> Dict[str, int]:
+        runs = list(self._runs.values())
+        return {
+            "active": sum(1 for run in runs if not run.done),
+            "retained": sum(1 for run in runs if run.done),
+            "subscribers": sum(run.subscribers for run in runs),
+            "lagged_subscribers": sum(run.lagged for run in runs),
+            "spilled_events": sum(run.spilled for run in runs)
+        }
+
+
+generation_runs = GenerationRunRegistry()
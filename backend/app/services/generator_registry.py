@@ -0,0 +1,72 @@
+import os
+from typing import Any, Dict, Optional
+import google.generativeai as genai
+
+from app.models.project import DocumentType
+from app.services.document_generator import DocumentGenerator, DEFAULT_MODEL
+
+GEMINI_MODEL = os.getenv("GEMINI_MODEL", DEFAULT_MODEL)
+# Per document type overrides, e.g. a pro model for long Word documents
+GEMINI_MODEL_DOCX = os.getenv("GEMINI_MODEL_DOCX", GEMINI_MODEL)
+GEMINI_MODEL_PPTX = os.getenv("GEMINI_MODEL_PPTX", GEMINI_MODEL)
+# Leave unset for the library default (gRPC, one multiplexed channel per client)
+GEMINI_TRANSPORT = os.getenv("GEMINI_TRANSPORT")
+
+
+class GeneratorRegistry:
+    """
+    Application-scoped DocumentGenerator
+    The Gemini client is configured once and every document type shares one
+    GenerativeModel per model name, so requests reuse its connection instead
+    of re-running genai.configure and building a new model each time.
+    """
+
+    def __init__(self, model_names: Dict[DocumentType, str], transport: Optional[str] = None):
+        self.model_names = model_names
+        self.transport = transport
+        self._generator: Optional[DocumentGenerator] = None
+
+    def start(self):
+        """Configure the client and build the models; warns instead of failing without an API key"""
+        try:
+            self.get()
+        except ValueError as e:
+            print(f"Warning: Document generation unavailable: {e}")
+
+    def stop(self):
+        self._generator = None
+
+    def get(self) -> DocumentGenerator:
+        """The shared generator, configured on first use"""
+        if self._generator is None:
+            api_key = os.getenv("GEMINI_API_KEY")
+            if not api_key:
+                raise ValueError("GEMINI_API_KEY not found in environment variables")
+
+            options: Dict[str, Any] = {"api_key": api_key}
+            if self.transport:
+                options["transport"] = self.transport
+            genai.configure(**options)
+
+            models: Dict[str, Any] = {}
+            for model_name in set(self.model_names.values()):
+                models[model_name] = genai.GenerativeModel(model_name)
+
+            self._generator = DocumentGenerator({
+                document_type: models[model_name]
+                for document_type, model_name in self.model_names.items()
+            })
+        return self._generator
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "models": {document_type.value: name for document_type, name in self.model_names.items()},
+            "calls": self._generator.metrics if self._generator else {}
+        }
+
+
+generator_registry = GeneratorRegistry(
+    {DocumentType.DOCX: GEMINI_MODEL_DOCX, DocumentType.PPTX: GEMINI_MODEL_PPTX},
+    GEMINI_TRANSPORT
+)
+
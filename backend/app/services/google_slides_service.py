@@ -1,29 +1,109 @@
 import os
 import json
-from typing import Dict, List, Any, Optional
+import uuid
+import functools
+import threading
+from datetime import datetime, timedelta
+from typing import BinaryIO, Dict, List, Any, Optional
+import httplib2
+import google_auth_httplib2
 from google.oauth2 import service_account
-from googleapiclient.discovery import build
+from googleapiclient import discovery_cache
+from googleapiclient.discovery import build_from_document
+from googleapiclient.errors import HttpError
 from googleapiclient.http import MediaIoBaseDownload
-import io
+
+from app.services.slides_templates import slides_template_layouts
 
 SCOPES = [
     'https://www.googleapis.com/auth/presentations',
     'https://www.googleapis.com/auth/drive'
 ]
 
+GOOGLE_API_TIMEOUT = int(os.getenv("GOOGLE_API_TIMEOUT", "60"))  # seconds per HTTP request
+# Refresh the access token this long before it expires instead of on the first 401
+GOOGLE_TOKEN_REFRESH_MARGIN = int(os.getenv("GOOGLE_TOKEN_REFRESH_MARGIN", "300"))
+# Exports are downloaded in pieces of this size, so only one piece is in memory at a time
+GOOGLE_DOWNLOAD_CHUNK = int(os.getenv("GOOGLE_DOWNLOAD_CHUNK", str(1024 * 1024)))
+
+PPTX_MIME_TYPE = 'application/vnd.openxmlformats-officedocument.presentationml.presentation'
+
+TEMPLATE_PLACEHOLDERS = ('{{MAIN_TITLE}}', '{{SUBTITLE}}', '{{SLIDE_TITLE}}', '{{SLIDE_CONTENT}}')
+
+
+@functools.lru_cache(maxsize=None)
+def _discovery_document(api: str, version: str) -> Dict[str, Any]:
+    """Parsed discovery document bundled with google-api-python-client, loaded once"""
+    document = discovery_cache.get_static_doc(api, version)
+    if document is None:
+        raise RuntimeError(f"No bundled discovery document for {api} {version}")
+    return json.loads(document)
+
+
 class GoogleSlidesService:
-    """Service for interacting with Google Slides API"""
+    """
+    Service for interacting with Google Slides API
+    One instance is shared by the whole app (see get_google_slides_service): the
+    credential is shared and refreshed ahead of expiry, and each thread gets its
+    own keep-alive HTTP connection, since httplib2 is not thread-safe.
+    """
     
     def __init__(self):
         self.creds = None
-        self.slides_service = None
-        self.drive_service = None
+        self._refresh_lock = threading.Lock()
+        self._local = threading.local()
         self._authenticate()
+
+    @property
+    def slides_service(self):
+        return self._thread_services()[0]
+
+    @property
+    def drive_service(self):
+        return self._thread_services()[1]
+
+    def _presentations(self):
+        return self._thread_services()[2]
+
+    def _files(self):
+        return self._thread_services()[3]
+
+    def _thread_services(self):
+        """Slides/Drive clients and their collections, bound to this thread's HTTP connection"""
+        self._ensure_fresh_token()
+        services = getattr(self._local, 'services', None)
+        if services is None:
+            http = google_auth_httplib2.AuthorizedHttp(
+                self.creds, http=httplib2.Http(timeout=GOOGLE_API_TIMEOUT)
+            )
+            slides = build_from_document(_discovery_document('slides', 'v1'), http=http)
+            drive = build_from_document(_discovery_document('drive', 'v3'), http=http)
+            # Building a collection resource walks the discovery document, so keep them
+            services = (slides, drive, slides.presentations(), drive.files())
+            self._local.services = services
+        return services
+
+    def _token_expiring(self) -> bool:
+        if not self.creds.token:
+            return True
+        if self.creds.expiry is None:
+            return False
+        # google-auth keeps expiry as a naive UTC datetime
+        return self.creds.expiry - datetime.utcnow() < timedelta(seconds=GOOGLE_TOKEN_REFRESH_MARGIN)
+
+    def _ensure_fresh_token(self):
+        """Refresh the shared access token once, even with many threads exporting"""
+        from google.auth.transport.requests import Request
+
+        if not self._token_expiring():
+            return
+        with self._refresh_lock:
+            if self._token_expiring() and self.creds.refresh_token:
+                self.creds.refresh(Request())
         
     def _authenticate(self):
         """Authenticate using OAuth 2.0 token"""
         from google.oauth2.credentials import Credentials
-        from google.auth.transport.requests import Request
         
         creds = None
         
@@ -53,28 +133,29 @@ class GoogleSlidesService:
             if os.path.exists(token_path):
                 creds = Credentials.from_authorized_user_file(token_path, SCOPES)
             
-        # If there are no (valid) credentials available, let the user log in.
-        if not creds or not creds.valid:
-            if creds and creds.expired and creds.refresh_token:
-                creds.refresh(Request())
-            elif not creds: # Only raise if no creds at all (file missing AND env vars missing)
-                 raise FileNotFoundError(
-                    "Valid credentials not found. Set GOOGLE_CLIENT_ID/SECRET/REFRESH_TOKEN env vars OR run 'python setup_google_auth.py' locally."
-                )
+        # If there are no credentials available, let the user log in.
+        if not creds:
+            raise FileNotFoundError(
+                "Valid credentials not found. Set GOOGLE_CLIENT_ID/SECRET/REFRESH_TOKEN env vars OR run 'python setup_google_auth.py' locally."
+            )
         
         self.creds = creds
-        self.slides_service = build('slides', 'v1', credentials=self.creds)
-        self.drive_service = build('drive', 'v3', credentials=self.creds)
+        self._ensure_fresh_token()
         
-    def create_presentation_from_template(self, title: str, template_id: str) -> str:
+    def create_presentation_from_template(
+        self, title: str, template_id: str, app_properties: Optional[Dict[str, str]] = None
+    ) -> str:
         """
         Copy a template presentation to a new file
-        Returns the new presentation ID
+        Returns the new presentation ID. app_properties are private to this app
+        and can be searched with list_files_with_property.
         """
         body = {
             'name': title
         }
-        drive_response = self.drive_service.files().copy(
+        if app_properties:
+            body['appProperties'] = app_properties
+        drive_response = self._files().copy(
             fileId=template_id, body=body
         ).execute()
         
@@ -88,116 +169,218 @@ class GoogleSlidesService:
         body = {
             'requests': requests
         }
-        self.slides_service.presentations().batchUpdate(
+        self._presentations().batchUpdate(
             presentationId=presentation_id, body=body
         ).execute()
         
-    def replace_text(self, presentation_id: str, replacements: Dict[str, str], slide_ids: Optional[List[str]] = None):
-        """
-        Replace text placeholders in the presentation
-        replacements: dict of { '{{placeholder}}': 'replacement_text' }
-        slide_ids: optional list of slide IDs to restrict replacement to
-        """
-        requests = []
-        for placeholder, text in replacements.items():
-            req = {
-                'replaceAllText': {
-                    'containsText': {
-                        'text': placeholder,
-                        'matchCase': True
-                    },
-                    'replaceText': text
-                }
-            }
-            if slide_ids:
-                req['replaceAllText']['pageObjectIds'] = slide_ids
-            requests.append(req)
-            
-        self.batch_update(presentation_id, requests)
-        
     def get_presentation_slides(self, presentation_id: str) -> List[Dict]:
         """Get list of slides in the presentation"""
-        presentation = self.slides_service.presentations().get(
+        presentation = self._presentations().get(
             presentationId=presentation_id
         ).execute()
         return presentation.get('slides', [])
 
-    def duplicate_slide(self, presentation_id: str, slide_id: str, insertion_index: Optional[int] = None) -> str:
-        """Duplicate a slide and return the new slide's object ID"""
-        req = {
-            'duplicateObject': {
-                'objectId': slide_id
-            }
+    def get_file_revision(self, file_id: str) -> str:
+        """
+        An id that changes whenever the file is edited
+        Native Slides files have no headRevisionId, so Drive's version number is used for them.
+        """
+        meta = self._files().get(fileId=file_id, fields='headRevisionId,version').execute()
+        return str(meta.get('headRevisionId') or meta.get('version'))
+
+    @staticmethod
+    def find_template_layout(presentation_slides: List[Dict]) -> Dict[str, Any]:
+        """
+        Locate the title slide and the content template slide
+        The content slide is the one carrying {{SLIDE_TITLE}} and {{SLIDE_CONTENT}}.
+        Also records which slide and shape each placeholder was found in.
+        """
+        if len(presentation_slides) < 2:
+            raise ValueError("Template must have at least 2 slides")
+
+        title_slide_id = presentation_slides[0]['objectId']
+
+        # placeholder -> [{'slide_id', 'object_id'}, ...]
+        placeholders: Dict[str, List[Dict[str, str]]] = {p: [] for p in TEMPLATE_PLACEHOLDERS}
+
+        # Prefer a slide that has BOTH {{SLIDE_TITLE}} and {{SLIDE_CONTENT}}
+        content_slide_id = None
+        best_score = 0
+
+        for slide in presentation_slides:
+            found = set()
+
+            for element in slide.get('pageElements', []):
+                shape = element.get('shape')
+                if shape and shape.get('text'):
+                    text = "".join(
+                        te['textRun']['content']
+                        for te in shape['text']['textElements']
+                        if 'textRun' in te
+                    )
+                    for placeholder in TEMPLATE_PLACEHOLDERS:
+                        if placeholder in text:
+                            found.add(placeholder)
+                            placeholders[placeholder].append({
+                                'slide_id': slide['objectId'],
+                                'object_id': element.get('objectId')
+                            })
+
+            score = int('{{SLIDE_CONTENT}}' in found) + int('{{SLIDE_TITLE}}' in found)
+            if score > best_score:
+                best_score = score
+                content_slide_id = slide['objectId']
+
+        # Fallback if no placeholder was found
+        if not content_slide_id:
+            if len(presentation_slides) > 3:
+                content_slide_id = presentation_slides[3]['objectId']
+            else:
+                content_slide_id = presentation_slides[1]['objectId']
+
+        content_slide_index = 0
+        for i, slide in enumerate(presentation_slides):
+            if slide['objectId'] == content_slide_id:
+                content_slide_index = i
+                break
+
+        return {
+            'title_slide_id': title_slide_id,
+            'content_slide_id': content_slide_id,
+            'content_slide_index': content_slide_index,
+            'placeholders': placeholders
         }
-            
-        response = self.slides_service.presentations().batchUpdate(
-            presentationId=presentation_id, 
-            body={'requests': [req]}
-        ).execute()
-        
-        new_slide_id = response.get('replies')[0].get('duplicateObject').get('objectId')
-        
-        if insertion_index is not None:
-            # Move the slide to the correct position
-            move_req = {
-                'updateSlidesPosition': {
-                    'slideObjectIds': [new_slide_id],
-                    'insertionIndex': insertion_index
+
+    @staticmethod
+    def build_deck_requests(
+        title: str,
+        slides: List[Dict[str, Any]],
+        layout: Dict[str, Any],
+        subtitle: str = "Generated by OceanAI"
+    ) -> List[Dict[str, Any]]:
+        """
+        Build every request needed to populate a copied template
+        Duplicates get client-assigned object IDs so the per-slide text
+        replacements can target them within the same batchUpdate.
+        """
+        title_slide_id = layout['title_slide_id']
+        content_slide_id = layout['content_slide_id']
+
+        requests = [
+            {
+                'replaceAllText': {
+                    'containsText': {'text': placeholder, 'matchCase': True},
+                    'replaceText': text,
+                    'pageObjectIds': [title_slide_id]
                 }
             }
-            self.slides_service.presentations().batchUpdate(
-                presentationId=presentation_id, 
-                body={'requests': [move_req]}
-            ).execute()
-            
-        return new_slide_id
-
-    def export_presentation(self, presentation_id: str) -> bytes:
-        """Export presentation to PPTX bytes"""
-        request = self.drive_service.files().export_media(
-            fileId=presentation_id,
-            mimeType='application/vnd.openxmlformats-officedocument.presentationml.presentation'
-        )
-        
-        file_stream = io.BytesIO()
-        downloader = MediaIoBaseDownload(file_stream, request)
-        
-        done = False
-        while done is False:
-            status, done = downloader.next_chunk()
-            
-        file_stream.seek(0)
-        return file_stream.read()
+            for placeholder, text in (("{{MAIN_TITLE}}", title), ("{{SUBTITLE}}", subtitle))
+        ]
+
+        # A duplicate is created immediately after its source slide, so
+        # duplicating in reverse order leaves the new slides in reading order
+        # right after the template slide without any updateSlidesPosition.
+        batch_prefix = uuid.uuid4().hex[:12]
+        new_slide_ids = [f"oceanai_{batch_prefix}_{i}" for i in range(len(slides))]
+
+        for new_slide_id in reversed(new_slide_ids):
+            requests.append({
+                'duplicateObject': {
+                    'objectId': content_slide_id,
+                    'objectIds': {content_slide_id: new_slide_id}
+                }
+            })
+
+        for new_slide_id, slide_data in zip(new_slide_ids, slides):
+            bullets = slide_data.get("bullets", [])
+            content_text = "\n".join(bullets) if bullets else ""
+            for placeholder, text in (
+                ("{{SLIDE_TITLE}}", slide_data.get("title", "")),
+                ("{{SLIDE_CONTENT}}", content_text)
+            ):
+                requests.append({
+                    'replaceAllText': {
+                        'containsText': {'text': placeholder, 'matchCase': True},
+                        'replaceText': text,
+                        'pageObjectIds': [new_slide_id]
+                    }
+                })
+
+        # Remove the original template content slide
+        requests.append({'deleteObject': {'objectId': content_slide_id}})
+        return requests
+
+    def build_deck(self, presentation_id: str, title: str, slides: List[Dict[str, Any]], template_id: Optional[str] = None):
+        """
+        Populate a copied template with the generated slides
+        With the template id, the layout comes from the template layout cache and
+        the whole deck is one batchUpdate; otherwise the copy is fetched and scanned first.
+        """
+        if template_id is None:
+            layout = self.find_template_layout(self.get_presentation_slides(presentation_id))
+            self.batch_update(presentation_id, self.build_deck_requests(title, slides, layout))
+            return
+
+        layout = slides_template_layouts.layout(self, template_id)
+        try:
+            self.batch_update(presentation_id, self.build_deck_requests(title, slides, layout))
+        except HttpError as e:
+            # A batchUpdate is all or nothing, so the copy is untouched: the
+            # template changed since its revision was checked, read the copy itself
+            if e.resp.status != 400:
+                raise
+            slides_template_layouts.invalidate(template_id)
+            layout = self.find_template_layout(self.get_presentation_slides(presentation_id))
+            self.batch_update(presentation_id, self.build_deck_requests(title, slides, layout))
+
+    def export_presentation_to(self, presentation_id: str, file_stream: BinaryIO):
+        """Download the presentation as PPTX into a file, one chunk at a time"""
+        self._download_export(presentation_id, PPTX_MIME_TYPE, file_stream)
     
-    def export_presentation_as_pdf(self, presentation_id: str) -> bytes:
-        """Export presentation to PDF bytes"""
-        request = self.drive_service.files().export_media(
-            fileId=presentation_id,
-            mimeType='application/pdf'
-        )
-        
-        file_stream = io.BytesIO()
-        downloader = MediaIoBaseDownload(file_stream, request)
+    def export_presentation_as_pdf_to(self, presentation_id: str, file_stream: BinaryIO):
+        """Download the presentation as PDF into a file, one chunk at a time"""
+        self._download_export(presentation_id, 'application/pdf', file_stream)
+
+    def _download_export(self, presentation_id: str, mime_type: str, file_stream: BinaryIO):
+        request = self._files().export_media(fileId=presentation_id, mimeType=mime_type)
+        downloader = MediaIoBaseDownload(file_stream, request, chunksize=GOOGLE_DOWNLOAD_CHUNK)
         
         done = False
         while done is False:
             status, done = downloader.next_chunk()
-            
-        file_stream.seek(0)
-        return file_stream.read()
+
+    def list_files_with_property(self, key: str, value: str) -> List[Dict[str, Any]]:
+        """This account's files whose appProperties have key set to value, with their id and appProperties"""
+        escaped = value.replace("\\", "\\\\").replace("'", "\\'")
+        query = f"appProperties has {{ key='{key}' and value='{escaped}' }} and trashed = false"
+        files = []
+        page_token = None
+        while True:
+            response = self._files().list(
+                q=query, fields='nextPageToken, files(id, appProperties)', pageToken=page_token
+            ).execute()
+            files.extend(response.get('files', []))
+            page_token = response.get('nextPageToken')
+            if not page_token:
+                return files
 
     def delete_file(self, file_id: str):
         """Delete file from Drive (cleanup)"""
         try:
-            self.drive_service.files().delete(fileId=file_id).execute()
+            self._files().delete(fileId=file_id).execute()
         except Exception as e:
             print(f"Warning: Failed to delete temp file {file_id}: {e}")
 
-    def delete_slide(self, presentation_id: str, slide_id: str):
-        """Delete a slide from the presentation"""
-        req = {
-            'deleteObject': {
-                'objectId': slide_id
-            }
-        }
-        self.batch_update(presentation_id, [req])
+
+_service: Optional[GoogleSlidesService] = None
+_service_lock = threading.Lock()
+
+
+def get_google_slides_service() -> GoogleSlidesService:
+    """The application-wide GoogleSlidesService, authenticated on first use"""
+    global _service
+    if _service is None:
+        with _service_lock:
+            if _service is None:
+                _service = GoogleSlidesService()
+    return _service
@@ -0,0 +1,371 @@
+import os
+import shutil
+import socket
+import asyncio
+import itertools
+import tempfile
+import uuid
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Any, Awaitable, BinaryIO, Callable, Dict, Optional, Set
+
+from sqlalchemy import delete, func, or_, select, update
+from sqlalchemy.orm import Session
+
+from app.database import AsyncSessionLocal
+from app.models.job import Job, JobStatus
+
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", "4"))
+JOB_QUEUE_MAX = int(os.getenv("JOB_QUEUE_MAX", "1000"))
+JOB_RETENTION_HOURS = int(os.getenv("JOB_RETENTION_HOURS", "24"))
+JOB_RESULTS_DIR = os.getenv(
+    "JOB_RESULTS_DIR",
+    os.path.join(tempfile.gettempdir(), "oceanai_job_results")
+)
+JOB_HEARTBEAT_INTERVAL = float(os.getenv("JOB_HEARTBEAT_INTERVAL", "15"))  # seconds
+# A running job whose process has not reported in for this long is failed
+JOB_STALE_AFTER = float(os.getenv("JOB_STALE_AFTER", "90"))
+
+
+class JobQueueFull(Exception):
+    """Raised when the queue already holds JOB_QUEUE_MAX pending jobs"""
+
+
+@dataclass
+class JobOutcome:
+    """What a job handler produced: a JSON result, a file, or both"""
+    result: Optional[Dict[str, Any]] = None
+    file_bytes: Optional[bytes] = None
+    # A file given as an open stream is copied in chunks and closed
+    file_stream: Optional[BinaryIO] = None
+    filename: Optional[str] = None
+    media_type: Optional[str] = None
+
+
+# handler(job, report_progress) -> JobOutcome
+JobHandler = Callable[[Job, Callable[[float], None]], Awaitable[JobOutcome]]
+
+
+class JobQueue:
+    """
+    In-process async worker pool backed by the jobs table
+    Workers pick the highest-priority job first; the table is the source of
+    truth, so a job is claimed with a conditional UPDATE before it runs. Each
+    process stamps the jobs it runs with its worker id and a heartbeat, so a
+    process only fails jobs whose owner stopped reporting in.
+    """
+
+    def __init__(self, concurrency: int, max_pending: int):
+        self.concurrency = concurrency
+        self.max_pending = max_pending
+        self.worker_id = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self._handlers: Dict[str, JobHandler] = {}
+        self._queue: Optional[asyncio.PriorityQueue] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._workers = []
+        self._heartbeat: Optional[asyncio.Task] = None
+        self._running: Dict[str, asyncio.Task] = {}
+        # Jobs whose owner asked to cancel them, as opposed to the worker being stopped
+        self._cancelled: Set[str] = set()
+        self._sequence = itertools.count()
+
+    def register(self, kind: str, handler: JobHandler):
+        """Register the coroutine that executes jobs of a kind"""
+        self._handlers[kind] = handler
+
+    async def start(self):
+        """Recover persisted jobs and start the workers"""
+        self._queue = asyncio.PriorityQueue()
+        self._loop = asyncio.get_running_loop()
+        os.makedirs(JOB_RESULTS_DIR, exist_ok=True)
+
+        await self._recover()
+
+        self._workers = [asyncio.create_task(self._worker()) for _ in range(self.concurrency)]
+        self._heartbeat = asyncio.create_task(self._beat())
+
+    async def stop(self):
+        """Cancel the workers and fail the jobs they were running"""
+        tasks = self._workers + ([self._heartbeat] if self._heartbeat else [])
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self._workers = []
+        self._heartbeat = None
+
+        async with AsyncSessionLocal() as db:
+            await db.execute(
+                update(Job)
+                .where(Job.worker_id == self.worker_id, Job.status == JobStatus.RUNNING.value)
+                .values(
+                    status=JobStatus.FAILED.value,
+                    error="Interrupted by server shutdown",
+                    finished_at=datetime.utcnow()
+                )
+            )
+            await db.commit()
+
+    def submit(
+        self,
+        db: Session,
+        kind: str,
+        owner_id: int,
+        project_id: Optional[int] = None,
+        params: Optional[Dict[str, Any]] = None,
+        priority: int = 5
+    ) -> Job:
+        """Persist a new job and put it in the queue"""
+        if kind not in self._handlers:
+            raise ValueError(f"Unsupported job kind: {kind}")
+        if self.pending_count() >= self.max_pending:
+            raise JobQueueFull("Job queue is full, try again later")
+
+        job = Job(
+            id=uuid.uuid4().hex,
+            kind=kind,
+            status=JobStatus.QUEUED.value,
+            priority=priority,
+            owner_id=owner_id,
+            project_id=project_id,
+            params=params or {},
+            progress=0.0
+        )
+        db.add(job)
+        db.commit()
+        db.refresh(job)
+
+        self._enqueue(job.id, priority)
+        return job
+
+    def cancel(self, db: Session, job: Job) -> Job:
+        """
+        Cancel a queued or running job
+        A job running in another process is flagged with cancel_requested; that
+        process cancels it at its next heartbeat.
+        """
+        if job.status == JobStatus.QUEUED.value:
+            job.status = JobStatus.CANCELLED.value
+            job.finished_at = datetime.utcnow()
+            db.commit()
+        elif job.status == JobStatus.RUNNING.value:
+            task = self._running.get(job.id)
+            if task:
+                # Sync endpoints call this from the threadpool; the worker records the cancellation
+                self._cancelled.add(job.id)
+                self._loop.call_soon_threadsafe(task.cancel)
+            else:
+                job.cancel_requested = True
+                db.commit()
+        return job
+
+    def pending_count(self) -> int:
+        return self._queue.qsize() if self._queue else 0
+
+    def running_count(self) -> int:
+        return len(self._running)
+
+    def _enqueue(self, job_id: str, priority: int):
+        if self._queue is None:
+            raise RuntimeError("Job queue is not running")
+        # asyncio queues are not thread-safe and submit() runs in the threadpool
+        self._loop.call_soon_threadsafe(self._queue.put_nowait, (priority, next(self._sequence), job_id))
+
+    async def _recover(self):
+        """Fail jobs whose process stopped, requeue pending ones and purge old results"""
+        now = datetime.utcnow()
+        async with AsyncSessionLocal() as db:
+            await self._fail_stale(db, now)
+
+            cutoff = now - timedelta(hours=JOB_RETENTION_HOURS)
+            expired = (await db.execute(
+                select(Job.id, Job.result_path).where(Job.finished_at.isnot(None), Job.finished_at < cutoff)
+            )).all()
+            paths = [path for _, path in expired if path]
+            if paths:
+                await asyncio.to_thread(_remove_files, paths)
+            if expired:
+                await db.execute(delete(Job).where(Job.id.in_([job_id for job_id, _ in expired])))
+            await db.commit()
+
+            queued = (await db.execute(
+                select(Job.id, Job.priority).where(Job.status == JobStatus.QUEUED.value).order_by(Job.created_at)
+            )).all()
+        for job_id, priority in queued:
+            self._enqueue(job_id, priority)
+
+    @staticmethod
+    async def _fail_stale(db, now: datetime):
+        """Fail running jobs whose process has not reported in for JOB_STALE_AFTER"""
+        stale = now - timedelta(seconds=JOB_STALE_AFTER)
+        await db.execute(
+            update(Job)
+            .where(
+                Job.status == JobStatus.RUNNING.value,
+                or_(
+                    func.coalesce(Job.heartbeat_at, Job.started_at) < stale,
+                    func.coalesce(Job.heartbeat_at, Job.started_at).is_(None)
+                )
+            )
+            .values(
+                status=JobStatus.FAILED.value,
+                error="Interrupted by server restart",
+                finished_at=now
+            )
+            .execution_options(synchronize_session=False)
+        )
+
+    async def _beat(self):
+        while True:
+            await asyncio.sleep(JOB_HEARTBEAT_INTERVAL)
+            try:
+                await self._check_in()
+            except Exception as e:
+                print(f"Warning: Job heartbeat failed: {e}")
+
+    async def _check_in(self):
+        """
+        Keep this process's running jobs fresh, cancel those their owners asked
+        to stop from another process, and fail those of processes that died
+        """
+        now = datetime.utcnow()
+        async with AsyncSessionLocal() as db:
+            if self._running:
+                running = list(self._running)
+                await db.execute(
+                    update(Job)
+                    .where(Job.id.in_(running), Job.worker_id == self.worker_id)
+                    .values(heartbeat_at=now)
+                )
+                requested = (await db.execute(
+                    select(Job.id).where(Job.id.in_(running), Job.cancel_requested.is_(True))
+                )).scalars().all()
+                for job_id in requested:
+                    task = self._running.get(job_id)
+                    if task:
+                        self._cancelled.add(job_id)
+                        task.cancel()
+            await self._fail_stale(db, now)
+            await db.commit()
+
+    async def _worker(self):
+        while True:
+            _, _, job_id = await self._queue.get()
+            try:
+                await self._run(job_id)
+            except Exception as e:
+                print(f"Warning: Job worker failed on {job_id}: {e}")
+            finally:
+                self._queue.task_done()
+
+    async def _run(self, job_id: str):
+        async with AsyncSessionLocal() as db:
+            # Claim the job; another process (or a cancel) may have got there first
+            now = datetime.utcnow()
+            claimed = await db.execute(
+                update(Job)
+                .where(Job.id == job_id, Job.status == JobStatus.QUEUED.value)
+                .values(
+                    status=JobStatus.RUNNING.value,
+                    started_at=now,
+                    worker_id=self.worker_id,
+                    heartbeat_at=now
+                )
+            )
+            await db.commit()
+            if not claimed.rowcount:
+                return
+
+            job = await db.get(Job, job_id)
+            handler = self._handlers[job.kind]
+            progress = _ProgressWriter(job_id)
+
+            task = asyncio.create_task(handler(job, progress.report))
+            self._running[job_id] = task
+            try:
+                outcome = await task
+            except asyncio.CancelledError:
+                # Only swallow a cancel the job's owner asked for; if this
+                # worker is being stopped, let the cancellation through
+                if job_id not in self._cancelled or asyncio.current_task().cancelling():
+                    raise
+                job.status = JobStatus.CANCELLED.value
+            except Exception as e:
+                job.status = JobStatus.FAILED.value
+                job.error = str(e)
+            else:
+                job.result = outcome.result
+                job.result_path = await asyncio.to_thread(self._write_result_file, job_id, outcome)
+                if job.result_path:
+                    job.result_filename = outcome.filename
+                    job.result_media_type = outcome.media_type
+                job.status = JobStatus.SUCCEEDED.value
+                job.progress = 1.0
+            finally:
+                self._running.pop(job_id, None)
+                self._cancelled.discard(job_id)
+                await progress.close()
+
+            if job.status != JobStatus.SUCCEEDED.value:
+                job.progress = progress.fraction
+            job.finished_at = datetime.utcnow()
+            await db.commit()
+
+    @staticmethod
+    def _write_result_file(job_id: str, outcome: JobOutcome) -> Optional[str]:
+        """Save the outcome's file under JOB_RESULTS_DIR; runs in a thread"""
+        if outcome.file_bytes is None and outcome.file_stream is None:
+            return None
+        path = os.path.join(JOB_RESULTS_DIR, job_id)
+        with open(path, "wb") as f:
+            if outcome.file_stream is not None:
+                with outcome.file_stream:
+                    shutil.copyfileobj(outcome.file_stream, f)
+            else:
+                f.write(outcome.file_bytes)
+        return path
+
+
+def _remove_files(paths):
+    for path in paths:
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+
+class _ProgressWriter:
+    """
+    Records a running job's progress without blocking its handler
+    report() may be called often; at most one write is in flight and it
+    stores the latest fraction.
+    """
+
+    def __init__(self, job_id: str):
+        self.job_id = job_id
+        self.fraction = 0.0
+        self._written = 0.0
+        self._task: Optional[asyncio.Task] = None
+
+    def report(self, fraction: float):
+        self.fraction = max(0.0, min(1.0, fraction))
+        if self._task is None or self._task.done():
+            self._task = asyncio.get_running_loop().create_task(self._write())
+
+    async def _write(self):
+        while self._written != self.fraction:
+            fraction = self.fraction
+            try:
+                async with AsyncSessionLocal() as db:
+                    await db.execute(update(Job).where(Job.id == self.job_id).values(progress=fraction))
+                    await db.commit()
+            except Exception as e:
+                print(f"Warning: Could not record job progress: {e}")
+                return
+            self._written = fraction
+
+    async def close(self):
+        if self._task is not None:
+            await asyncio.gather(self._task, return_exceptions=True)
+
+
+job_queue = JobQueue(JOB_WORKERS, JOB_QUEUE_MAX)
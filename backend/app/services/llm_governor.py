@@ -0,0 +1,318 @@
+import os
+import time
+import random
+import asyncio
+import itertools
+import contextvars
+from contextlib import contextmanager
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Optional, Tuple
+from google.api_core import exceptions as google_exceptions
+
+LLM_GLOBAL_RATE = float(os.getenv("LLM_GLOBAL_RATE", "10"))  # calls per second across the app
+LLM_GLOBAL_BURST = int(os.getenv("LLM_GLOBAL_BURST", "20"))
+LLM_USER_RATE = float(os.getenv("LLM_USER_RATE", "1"))  # calls per second per signed-in user
+LLM_USER_BURST = int(os.getenv("LLM_USER_BURST", "8"))
+# All guests share one identity, so they share one bucket
+LLM_GUEST_RATE = float(os.getenv("LLM_GUEST_RATE", "2"))
+LLM_GUEST_BURST = int(os.getenv("LLM_GUEST_BURST", "10"))
+LLM_MIN_CONCURRENCY = int(os.getenv("LLM_MIN_CONCURRENCY", "1"))
+LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", "16"))
+LLM_INITIAL_CONCURRENCY = int(os.getenv("LLM_INITIAL_CONCURRENCY", "4"))
+# A stream whose first chunk is slower than this counts as a latency spike and
+# shrinks the window; whole non-streamed calls are only judged against a target
+# their caller passes, since a full document routinely takes longer
+LLM_LATENCY_TARGET = float(os.getenv("LLM_LATENCY_TARGET", "30"))
+LLM_MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", "3"))
+LLM_RETRY_BASE_DELAY = float(os.getenv("LLM_RETRY_BASE_DELAY", "1"))
+LLM_MAX_WAIT = float(os.getenv("LLM_MAX_WAIT", "120"))  # seconds a call may queue before giving up
+
+# Shrink the window at most once per cooldown, so one burst of 429s halves it once
+DECREASE_COOLDOWN = 2.0
+
+RATE_LIMIT_ERRORS = (google_exceptions.ResourceExhausted, google_exceptions.TooManyRequests)
+TRANSIENT_ERRORS = (
+    google_exceptions.ServiceUnavailable,
+    google_exceptions.InternalServerError,
+    google_exceptions.DeadlineExceeded
+)
+
+
+class LLMPriority:
+    """Lanes served in order: signed-in users, then guests, then background jobs"""
+    USER = 0
+    GUEST = 1
+    BACKGROUND = 2
+
+    NAMES = {USER: "user", GUEST: "guest", BACKGROUND: "background"}
+
+
+class LLMBusy(Exception):
+    """Raised when a call waited LLM_MAX_WAIT seconds without getting capacity"""
+
+
+class TokenBucket:
+    """Refills `rate` tokens per second up to `burst`"""
+
+    def __init__(self, rate: float, burst: int):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = float(burst)
+        self.updated = time.monotonic()
+
+    def _refill(self, now: float):
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self, now: float) -> float:
+        """Seconds until a token is available, 0 if one is available now"""
+        self._refill(now)
+        if self.tokens >= 1:
+            return 0.0
+        return (1 - self.tokens) / self.rate if self.rate > 0 else float("inf")
+
+    def take(self):
+        self.tokens -= 1
+
+    def full(self, now: float) -> bool:
+        self._refill(now)
+        return self.tokens >= self.burst
+
+
+# (bucket key, priority) of the code currently calling the model
+_caller: contextvars.ContextVar[Tuple[str, int]] = contextvars.ContextVar(
+    "llm_caller", default=("anonymous", LLMPriority.USER)
+)
+
+
+class LLMGovernor:
+    """
+    Admission control for Gemini calls
+    A call waits in its priority lane until the global bucket, its caller's bucket
+    and the concurrency window all have room. The window grows by one per window of
+    successful calls and halves on rate-limit errors or latency spikes (AIMD), and
+    rate-limited or transient failures are retried with jittered exponential backoff.
+    """
+
+    def __init__(self):
+        self.global_bucket = TokenBucket(LLM_GLOBAL_RATE, LLM_GLOBAL_BURST)
+        self.window = float(LLM_INITIAL_CONCURRENCY)
+        self.in_flight = 0
+
+        self._buckets: Dict[str, TokenBucket] = {}
+        # (priority, sequence, bucket key, enqueued at, future)
+        self._waiters: List[Tuple[int, int, str, float, asyncio.Future]] = []
+        self._sequence = itertools.count()
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._last_decrease = 0.0
+
+        self.calls = 0
+        self.rate_limited = 0
+        self.retries = 0
+        self.timeouts = 0
+        self.latency_spikes = 0
+        self._wait_total = 0.0
+        self._wait_max = 0.0
+        self._admitted = 0
+
+    @contextmanager
+    def caller(self, key: str, priority: int):
+        """Attribute model calls made inside the block to a user and lane"""
+        token = _caller.set((key, priority))
+        try:
+            yield
+        finally:
+            _caller.reset(token)
+
+    async def run(self, fn: Callable[[], Awaitable[Any]], latency_target: Optional[float] = None) -> Any:
+        """
+        Run one model call under admission control, retrying rate limits and transient errors
+        The call's duration grows with the size of the answer, so it only counts
+        as a latency spike against a latency_target given for calls of bounded
+        length; otherwise the window shrinks on rate limits alone.
+        """
+        for attempt in range(LLM_MAX_RETRIES + 1):
+            await self._acquire()
+            started = time.monotonic()
+            try:
+                result = await fn()
+            except BaseException as e:
+                # Cancellation included: the slot must always come back
+                self._release()
+                if not isinstance(e, Exception) or not self._should_retry(e, attempt):
+                    raise
+                await self._backoff(attempt)
+                continue
+            self._release(time.monotonic() - started, latency_target)
+            return result
+
+    async def stream(self, fn: Callable[[], Awaitable[Any]]) -> AsyncIterator[Any]:
+        """
+        Like run, for streamed responses
+        The slot is held until the stream is drained; only failures before the
+        first chunk are retried, since chunks already yielded cannot be taken back.
+        The window reacts to the time to the first chunk, not to the length of
+        the whole document.
+        """
+        for attempt in range(LLM_MAX_RETRIES + 1):
+            await self._acquire()
+            started = time.monotonic()
+            try:
+                response = await fn()
+                iterator = response.__aiter__()
+                first = await iterator.__anext__()
+            except StopAsyncIteration:
+                self._release(time.monotonic() - started, LLM_LATENCY_TARGET)
+                return
+            except BaseException as e:
+                self._release()
+                if not isinstance(e, Exception) or not self._should_retry(e, attempt):
+                    raise
+                await self._backoff(attempt)
+                continue
+            break
+
+        first_chunk_latency = time.monotonic() - started
+        completed = False
+        try:
+            yield first
+            async for chunk in iterator:
+                yield chunk
+            completed = True
+        finally:
+            self._release(first_chunk_latency if completed else None, LLM_LATENCY_TARGET)
+
+    def stats(self) -> Dict[str, Any]:
+        lanes = {name: 0 for name in LLMPriority.NAMES.values()}
+        for priority, *_ in self._waiters:
+            lanes[LLMPriority.NAMES[priority]] += 1
+        return {
+            "window": round(self.window, 2),
+            "in_flight": self.in_flight,
+            "queued": lanes,
+            "calls": self.calls,
+            "rate_limited": self.rate_limited,
+            "retries": self.retries,
+            "timeouts": self.timeouts,
+            "latency_spikes": self.latency_spikes,
+            "avg_wait_seconds": round(self._wait_total / self._admitted, 3) if self._admitted else 0.0,
+            "max_wait_seconds": round(self._wait_max, 3)
+        }
+
+    async def _acquire(self):
+        key, priority = _caller.get()
+        future = asyncio.get_running_loop().create_future()
+        waiter = (priority, next(self._sequence), key, time.monotonic(), future)
+        self._waiters.append(waiter)
+        self._dispatch()
+
+        try:
+            await asyncio.wait_for(asyncio.shield(future), LLM_MAX_WAIT)
+        except asyncio.TimeoutError:
+            if future.done() and not future.cancelled():
+                # Admitted just as the timeout fired
+                return
+            self._remove(waiter)
+            self.timeouts += 1
+            raise LLMBusy("The AI service is busy, try again shortly")
+        except asyncio.CancelledError:
+            if future.done() and not future.cancelled():
+                self._release()
+            else:
+                self._remove(waiter)
+            raise
+
+    def _remove(self, waiter):
+        if waiter in self._waiters:
+            self._waiters.remove(waiter)
+        waiter[4].cancel()
+
+    def _bucket(self, key: str) -> TokenBucket:
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            if len(self._buckets) > 10000:
+                # Forget idle callers; a full bucket carries no state
+                now = time.monotonic()
+                self._buckets = {k: b for k, b in self._buckets.items() if not b.full(now)}
+            if key == "guest":
+                bucket = TokenBucket(LLM_GUEST_RATE, LLM_GUEST_BURST)
+            else:
+                bucket = TokenBucket(LLM_USER_RATE, LLM_USER_BURST)
+            self._buckets[key] = bucket
+        return bucket
+
+    def _dispatch(self):
+        """Admit waiters in priority order while every limit has room"""
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+
+        now = time.monotonic()
+        next_check = None
+        self._waiters.sort(key=lambda w: (w[0], w[1]))
+
+        for waiter in list(self._waiters):
+            if self.in_flight >= int(self.window):
+                # A release will dispatch again
+                break
+            global_wait = self.global_bucket.wait_time(now)
+            if global_wait > 0:
+                next_check = global_wait
+                break
+
+            priority, _, key, enqueued_at, future = waiter
+            user_bucket = self._bucket(key)
+            user_wait = user_bucket.wait_time(now)
+            if user_wait > 0:
+                # This caller is over its rate; let the next one through
+                next_check = user_wait if next_check is None else min(next_check, user_wait)
+                continue
+
+            self._waiters.remove(waiter)
+            self.global_bucket.take()
+            user_bucket.take()
+            self.in_flight += 1
+            self.calls += 1
+            waited = now - enqueued_at
+            self._admitted += 1
+            self._wait_total += waited
+            self._wait_max = max(self._wait_max, waited)
+            future.set_result(None)
+
+        if self._waiters and next_check is not None:
+            self._timer = asyncio.get_running_loop().call_later(next_check, self._dispatch)
+
+    def _release(self, latency: Optional[float] = None, target: Optional[float] = None):
+        """Free a slot; latency is given for calls that succeeded, and shrinks the window past target"""
+        self.in_flight -= 1
+        if latency is not None:
+            if target is not None and latency > target:
+                self.latency_spikes += 1
+                self._decrease()
+            else:
+                self.window = min(LLM_MAX_CONCURRENCY, self.window + 1 / self.window)
+        self._dispatch()
+
+    def _decrease(self):
+        now = time.monotonic()
+        if now - self._last_decrease < DECREASE_COOLDOWN:
+            return
+        self._last_decrease = now
+        self.window = max(LLM_MIN_CONCURRENCY, self.window / 2)
+
+    def _should_retry(self, error: Exception, attempt: int) -> bool:
+        if isinstance(error, RATE_LIMIT_ERRORS):
+            self.rate_limited += 1
+            self._decrease()
+        elif not isinstance(error, TRANSIENT_ERRORS):
+            return False
+        if attempt >= LLM_MAX_RETRIES:
+            return False
+        self.retries += 1
+        return True
+
+    async def _backoff(self, attempt: int):
+        # Full jitter keeps retries from many callers from landing together
+        await asyncio.sleep(random.uniform(0, LLM_RETRY_BASE_DELAY * 2 ** attempt))
+
+
+llm_governor = LLMGovernor()
@@ -0,0 +1,102 @@
+import os
+import time
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional, Tuple
+from passlib.context import CryptContext
+
+PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", "2"))
+PASSWORD_HASH_MAX_PENDING = int(os.getenv("PASSWORD_HASH_MAX_PENDING", "64"))
+# Raising this rehashes each user's password at their next login
+BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", "12"))
+
+
+class HashQueueFull(Exception):
+    """Raised when PASSWORD_HASH_MAX_PENDING hashes are already queued or running"""
+
+
+class PasswordHasher:
+    """
+    Dedicated threads for bcrypt
+    bcrypt releases the GIL, so a small thread pool runs hashes in parallel without
+    taking slots from the API threadpool; login storms queue here, bounded by
+    max_pending, instead of stalling document requests.
+    """
+
+    def __init__(self, max_workers: int, max_pending: int, rounds: int):
+        self.max_workers = max_workers
+        self.max_pending = max_pending
+        self.context = CryptContext(schemes=["bcrypt"], deprecated="auto", bcrypt__rounds=rounds)
+        self._pool: Optional[ThreadPoolExecutor] = None
+        self._pending = 0
+        self._rejected = 0
+        self.rehashed = 0
+        # operation -> [count, total seconds, max seconds, total queue wait]
+        self._timings: Dict[str, list] = {"hash": [0, 0.0, 0.0, 0.0], "verify": [0, 0.0, 0.0, 0.0]}
+
+    def start(self):
+        if self._pool is None:
+            self._pool = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="password-hash")
+
+    def shutdown(self):
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+
+    async def hash(self, password: str) -> str:
+        return await self._run("hash", self.context.hash, password)
+
+    async def verify_and_update(self, password: str, hashed_password: str) -> Tuple[bool, Optional[str]]:
+        """Check a password; the second item is a new hash when the stored one uses outdated settings"""
+        valid, new_hash = await self._run("verify", self.context.verify_and_update, password, hashed_password)
+        if new_hash:
+            self.rehashed += 1
+        return valid, new_hash
+
+    async def _run(self, operation: str, fn: Callable[..., Any], *args) -> Any:
+        if self._pending >= self.max_pending:
+            self._rejected += 1
+            raise HashQueueFull("Too many sign-ins in progress, try again shortly")
+
+        if self._pool is None:
+            self.start()
+
+        queued_at = time.perf_counter()
+
+        def timed():
+            started = time.perf_counter()
+            result = fn(*args)
+            return result, started - queued_at, time.perf_counter() - started
+
+        self._pending += 1
+        try:
+            result, waited, seconds = await asyncio.get_running_loop().run_in_executor(self._pool, timed)
+        finally:
+            self._pending -= 1
+
+        timing = self._timings[operation]
+        timing[0] += 1
+        timing[1] += seconds
+        timing[2] = max(timing[2], seconds)
+        timing[3] += waited
+        return result
+
+    def stats(self) -> Dict[str, Any]:
+        data: Dict[str, Any] = {
+            "workers": self.max_workers,
+            "pending": self._pending,
+            "max_pending": self.max_pending,
+            "rejected": self._rejected,
+            "rehashed": self.rehashed
+        }
+        for operation, (count, total, longest, waited) in self._timings.items():
+            data[operation] = {
+                "count": count,
+                "avg_ms": round(total / count * 1000, 1) if count else 0.0,
+                "max_ms": round(longest * 1000, 1),
+                "avg_wait_ms": round(waited / count * 1000, 1) if count else 0.0
+            }
+        return data
+
+
+password_hasher = PasswordHasher(PASSWORD_HASH_WORKERS, PASSWORD_HASH_MAX_PENDING, BCRYPT_ROUNDS)
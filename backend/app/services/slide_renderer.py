@@ -0,0 +1,227 @@
+import io
+import functools
+from typing import Dict, Any, List, Optional
+
+PREVIEW_DPI = 96
+
+# Colors roughly matching the default python-pptx theme
+BACKGROUND = (255, 255, 255)
+TEXT_COLOR = (0, 0, 0)
+SUBTITLE_COLOR = (137, 137, 137)
+
+
+def _emu_to_px(emu: int) -> int:
+    """Convert English Metric Units to pixels at the preview resolution"""
+    return round(emu / 914400 * PREVIEW_DPI)
+
+
+def _pt_to_px(points: float) -> int:
+    return round(points / 72 * PREVIEW_DPI)
+
+
+@functools.lru_cache(maxsize=1)
+def _layout_geometry() -> Dict[str, Any]:
+    """
+    Read placeholder boxes from the same layouts the python-pptx export uses
+    Cached per process, so the template is parsed once per worker.
+    """
+    from app.models.project import DocumentType
+    from app.services.export_templates import export_templates
+    from app.services.file_exporter import FileExporter
+
+    # Only read, so the shared parsed template will do
+    prs = export_templates.template(DocumentType.PPTX)
+
+    def boxes(layout_index: int) -> Dict[int, tuple]:
+        layout = prs.slide_layouts[layout_index]
+        return {
+            ph.placeholder_format.idx: tuple(_emu_to_px(v) for v in (ph.left, ph.top, ph.width, ph.height))
+            for ph in layout.placeholders
+        }
+
+    return {
+        "size": (_emu_to_px(FileExporter.SLIDE_WIDTH), _emu_to_px(FileExporter.SLIDE_HEIGHT)),
+        "title_slide": boxes(FileExporter.TITLE_LAYOUT_INDEX),
+        "content_slide": boxes(FileExporter.CONTENT_LAYOUT_INDEX),
+    }
+
+
+@functools.lru_cache(maxsize=32)
+def _font(size_px: int):
+    from PIL import ImageFont
+
+    try:
+        return ImageFont.truetype("DejaVuSans.ttf", size_px)
+    except OSError:
+        return ImageFont.load_default(size=size_px)
+
+
+class SlideRenderer:
+    """Render generated slides to PDF pages or PNG thumbnails without Google Slides"""
+
+    # Default theme sizes: 44pt titles, 32pt first-level bullets
+    TITLE_FONT_PT = 44
+    SUBTITLE_FONT_PT = 32
+    BODY_FONT_PT = 32
+    MIN_FONT_PT = 10
+
+    @staticmethod
+    def render_pdf(content_data: Dict[str, Any]) -> bytes:
+        """Render the title slide plus every content slide as a multi-page PDF"""
+        images = SlideRenderer._render_images(content_data)
+
+        file_stream = io.BytesIO()
+        images[0].save(
+            file_stream, "PDF", save_all=True, append_images=images[1:], resolution=PREVIEW_DPI
+        )
+        file_stream.seek(0)
+        return file_stream.read()
+
+    @staticmethod
+    def render_thumbnail(content_data: Dict[str, Any], slide_index: int, width: Optional[int] = None) -> bytes:
+        """Render one slide (0 is the title slide) as PNG bytes"""
+        images = SlideRenderer._render_images(content_data, only=slide_index)
+        image = images[0]
+
+        if width and width < image.width:
+            height = round(image.height * width / image.width)
+            image = image.resize((width, height))
+
+        file_stream = io.BytesIO()
+        image.save(file_stream, "PNG", optimize=False)
+        file_stream.seek(0)
+        return file_stream.read()
+
+    @staticmethod
+    async def render_pdf_async(content_data: Dict[str, Any]) -> bytes:
+        """Render a PDF in the export process pool"""
+        from app.services.export_executor import export_executor
+        return await export_executor.run(SlideRenderer.render_pdf, content_data)
+
+    @staticmethod
+    async def render_thumbnail_async(content_data: Dict[str, Any], slide_index: int, width: Optional[int] = None) -> bytes:
+        """Render a PNG thumbnail in the export process pool"""
+        from app.services.export_executor import export_executor
+        return await export_executor.run(SlideRenderer.render_thumbnail, content_data, slide_index, width)
+
+    @staticmethod
+    def _render_images(content_data: Dict[str, Any], only: Optional[int] = None) -> List[Any]:
+        slides = content_data.get("slides", [])
+        page_count = len(slides) + 1
+
+        if only is not None and not 0 <= only < page_count:
+            raise IndexError(f"Slide index {only} out of range")
+
+        images = []
+        for page in range(page_count):
+            if only is not None and page != only:
+                continue
+            if page == 0:
+                images.append(SlideRenderer._render_title_slide(content_data.get("title", "")))
+            else:
+                images.append(SlideRenderer._render_content_slide(slides[page - 1]))
+        return images
+
+    @staticmethod
+    def _new_canvas():
+        from PIL import Image, ImageDraw
+
+        geometry = _layout_geometry()
+        image = Image.new("RGB", geometry["size"], BACKGROUND)
+        return image, ImageDraw.Draw(image), geometry
+
+    @staticmethod
+    def _render_title_slide(title: str):
+        image, draw, geometry = SlideRenderer._new_canvas()
+        boxes = geometry["title_slide"]
+
+        SlideRenderer._draw_text_box(
+            draw, boxes[0], [title], SlideRenderer.TITLE_FONT_PT, TEXT_COLOR, center=True
+        )
+        SlideRenderer._draw_text_box(
+            draw, boxes[1], ["Generated by OceanAI"], SlideRenderer.SUBTITLE_FONT_PT, SUBTITLE_COLOR,
+            center=True, anchor_top=True
+        )
+        return image
+
+    @staticmethod
+    def _render_content_slide(slide_data: Dict[str, Any]):
+        image, draw, geometry = SlideRenderer._new_canvas()
+        boxes = geometry["content_slide"]
+
+        SlideRenderer._draw_text_box(
+            draw, boxes[0], [slide_data.get("title", "")], SlideRenderer.TITLE_FONT_PT, TEXT_COLOR, center=True
+        )
+
+        bullets = slide_data.get("bullets", [])
+        if isinstance(bullets, list):
+            bullets = [b for b in bullets if b]
+        else:
+            bullets = []
+        SlideRenderer._draw_text_box(
+            draw, boxes[1], bullets, SlideRenderer.BODY_FONT_PT, TEXT_COLOR, bullet="• ", anchor_top=True
+        )
+        return image
+
+    @staticmethod
+    def _draw_text_box(
+        draw,
+        box: tuple,
+        paragraphs: List[str],
+        font_pt: int,
+        color: tuple,
+        center: bool = False,
+        bullet: str = "",
+        anchor_top: bool = False
+    ):
+        """Word-wrap paragraphs into a placeholder box, shrinking the font until it fits"""
+        left, top, width, height = box
+        if not paragraphs:
+            return
+
+        size = font_pt
+        while True:
+            font = _font(_pt_to_px(size))
+            line_height = round(_pt_to_px(size) * 1.2)
+            lines = []
+            for paragraph in paragraphs:
+                lines.extend(SlideRenderer._wrap(draw, bullet + str(paragraph), font, width, indent=bullet))
+                # Paragraph spacing similar to the default body style
+                if bullet:
+                    lines.append(None)
+            if lines and lines[-1] is None:
+                lines.pop()
+
+            total_height = sum(line_height if line is not None else line_height // 3 for line in lines)
+            if total_height <= height or size <= SlideRenderer.MIN_FONT_PT:
+                break
+            size -= 2
+
+        y = top if anchor_top else top + max(0, (height - total_height) // 2)
+        for line in lines:
+            if line is None:
+                y += line_height // 3
+                continue
+            x = left
+            if center:
+                x = left + max(0, (width - draw.textlength(line, font=font)) // 2)
+            draw.text((x, y), line, font=font, fill=color)
+            y += line_height
+
+    @staticmethod
+    def _wrap(draw, text: str, font, max_width: int, indent: str = "") -> List[str]:
+        """Greedy word wrap; continuation lines are indented to line up after the bullet"""
+        hanging = " " * (len(indent) * 2) if indent else ""
+        lines = []
+        current = ""
+        for word in text.split():
+            candidate = f"{current} {word}" if current else word
+            if not current or draw.textlength(candidate, font=font) <= max_width:
+                current = candidate
+            else:
+                lines.append(current)
+                current = hanging + word
+        if current:
+            lines.append(current)
+        return lines
+
@@ -0,0 +1,264 @@
+import os
+import math
+import time
+import uuid
+import socket
+import asyncio
+import threading
+from collections import deque
+from typing import Any, Callable, Deque, Dict, List, Optional, Tuple
+
+SLIDES_COPY_POOL_MIN = int(os.getenv("SLIDES_COPY_POOL_MIN", "1"))
+SLIDES_COPY_POOL_MAX = int(os.getenv("SLIDES_COPY_POOL_MAX", "8"))  # 0 turns the pool off
+SLIDES_COPY_POOL_TTL = int(os.getenv("SLIDES_COPY_POOL_TTL", "1800"))  # seconds an unused copy is kept
+# Keep enough copies for this many seconds of exports at the rate seen over SLIDES_COPY_POOL_WINDOW
+SLIDES_COPY_POOL_LEAD = float(os.getenv("SLIDES_COPY_POOL_LEAD", "60"))
+SLIDES_COPY_POOL_WINDOW = float(os.getenv("SLIDES_COPY_POOL_WINDOW", "600"))
+SLIDES_COPY_POOL_INTERVAL = float(os.getenv("SLIDES_COPY_POOL_INTERVAL", "10"))  # seconds between refills
+# Seconds past its expiry before a leftover copy is deleted: this process's own copies
+# (long enough for an export still using one to finish), and copies from other processes
+SLIDES_COPY_POOL_ORPHAN_GRACE = float(os.getenv("SLIDES_COPY_POOL_ORPHAN_GRACE", "600"))
+SLIDES_COPY_POOL_ORPHAN_AGE = float(os.getenv("SLIDES_COPY_POOL_ORPHAN_AGE", "86400"))
+
+POOL_COPY_NAME = "OceanAI pooled template copy"
+# appProperties set on every pooled copy
+POOL_PROPERTY = "oceanai_pool_template"
+OWNER_PROPERTY = "oceanai_pool_owner"
+EXPIRES_PROPERTY = "oceanai_pool_expires"  # epoch seconds after which the owner stops handing it out
+
+
+def _default_service():
+    from app.services.google_slides_service import get_google_slides_service
+
+    return get_google_slides_service()
+
+
+class SlidesCopyPool:
+    """
+    Copies of the Google Slides template made ahead of the exports that need them
+    Copying the template is one of the slowest Drive calls of an export, so a
+    background task keeps copies ready and exports take one instead. The pool
+    is sized by the recent export rate, between min_size and max_size; copies
+    unused after ttl seconds are deleted and replaced, so a template edit
+    reaches the pool within ttl. When the pool is empty, exports copy inline.
+    service_factory returns the object used for Drive calls (the Slides service,
+    or a fake one): create_presentation_from_template, delete_file and
+    list_files_with_property.
+    Each copy is tagged in Drive with the template, this process's owner id and
+    its expiry. Leftovers from crashes or failed deletes are swept every ttl:
+    this process's own copies once orphan_grace past their expiry, other
+    processes' only once orphan_age past it, so a copy another worker is about
+    to hand out is never touched.
+    """
+
+    def __init__(
+        self,
+        template_id: Optional[str],
+        min_size: int,
+        max_size: int,
+        ttl: float,
+        lead: float,
+        window: float,
+        interval: float,
+        service_factory: Callable[[], Any] = _default_service,
+        orphan_grace: float = SLIDES_COPY_POOL_ORPHAN_GRACE,
+        orphan_age: float = SLIDES_COPY_POOL_ORPHAN_AGE,
+        owner_id: Optional[str] = None
+    ):
+        self.template_id = template_id
+        self.min_size = min_size
+        self.max_size = max_size
+        self.ttl = ttl
+        self.lead = lead
+        self.window = window
+        self.interval = interval
+        self.service_factory = service_factory
+        self.orphan_grace = orphan_grace
+        self.orphan_age = orphan_age
+        self.owner_id = owner_id or f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+
+        self._lock = threading.Lock()
+        # (presentation id, monotonic time it was copied), oldest first
+        self._copies: Deque[Tuple[str, float]] = deque()
+        # expired copies taken off the pool, waiting to be deleted
+        self._stale: List[str] = []
+        # monotonic times of recent takes, for the export rate
+        self._takes: Deque[float] = deque()
+        self._task: Optional[asyncio.Task] = None
+        self._wake: Optional[asyncio.Event] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._swept_at: Optional[float] = None
+        self.hits = 0
+        self.misses = 0
+        self.created = 0
+        self.expired = 0
+        self.failures = 0
+        self.orphans = 0
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.template_id) and self.max_size > 0
+
+    async def start(self):
+        if not self.enabled or self._task is not None:
+            return
+        self._loop = asyncio.get_running_loop()
+        self._wake = asyncio.Event()
+        self._task = asyncio.create_task(self._replenish())
+
+    async def stop(self):
+        """Stop refilling and delete every copy still in the pool"""
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        with self._lock:
+            leftover = [presentation_id for presentation_id, _ in self._copies]
+            self._copies.clear()
+        if leftover:
+            await asyncio.to_thread(self._delete, leftover)
+
+    def take(self, title: str, template_id: str) -> str:
+        """
+        A copy of the template for one export, from the pool when one is ready
+        The caller owns the returned presentation and deletes it when done.
+        """
+        if not self.enabled or template_id != self.template_id:
+            return self.service_factory().create_presentation_from_template(title, template_id)
+
+        now = time.monotonic()
+        presentation_id = None
+        with self._lock:
+            self._takes.append(now)
+            while self._copies:
+                candidate, copied_at = self._copies.popleft()
+                if now - copied_at < self.ttl:
+                    presentation_id = candidate
+                    break
+                self._stale.append(candidate)
+            if presentation_id:
+                self.hits += 1
+            else:
+                self.misses += 1
+        self._notify()
+
+        if presentation_id:
+            return presentation_id
+        return self.service_factory().create_presentation_from_template(title, template_id)
+
+    def target_size(self) -> int:
+        """Copies to keep ready for the export rate over the last window"""
+        cutoff = time.monotonic() - self.window
+        with self._lock:
+            while self._takes and self._takes[0] < cutoff:
+                self._takes.popleft()
+            rate = len(self._takes) / self.window
+        return max(self.min_size, min(self.max_size, math.ceil(rate * self.lead)))
+
+    async def replenish_once(self):
+        """Delete expired copies and orphans, then copy the template until the pool reaches its target size"""
+        now = time.monotonic()
+        with self._lock:
+            expired = self._stale
+            self._stale = []
+            while self._copies and now - self._copies[0][1] >= self.ttl:
+                expired.append(self._copies.popleft()[0])
+            self.expired += len(expired)
+        if expired:
+            await asyncio.to_thread(self._delete, expired)
+        if self._swept_at is None or now - self._swept_at >= self.ttl:
+            self._swept_at = now
+            await asyncio.to_thread(self._delete_orphans)
+
+        while len(self._copies) < self.target_size():
+            app_properties = {
+                POOL_PROPERTY: self.template_id,
+                OWNER_PROPERTY: self.owner_id,
+                EXPIRES_PROPERTY: str(int(time.time() + self.ttl))
+            }
+            try:
+                presentation_id = await asyncio.to_thread(
+                    self.service_factory().create_presentation_from_template,
+                    POOL_COPY_NAME, self.template_id, app_properties
+                )
+            except Exception as e:
+                self.failures += 1
+                print(f"Warning: Could not copy Slides template for the pool: {e}")
+                return
+            with self._lock:
+                self._copies.append((presentation_id, time.monotonic()))
+                self.created += 1
+
+    async def _replenish(self):
+        while True:
+            await self.replenish_once()
+            try:
+                await asyncio.wait_for(self._wake.wait(), timeout=self.interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wake.clear()
+
+    def _notify(self):
+        """Wake the replenisher from an export thread"""
+        if self._loop is not None and self._wake is not None:
+            try:
+                self._loop.call_soon_threadsafe(self._wake.set)
+            except RuntimeError:
+                pass  # loop already closed
+
+    def _delete(self, presentation_ids: List[str]):
+        service = self.service_factory()
+        for presentation_id in presentation_ids:
+            service.delete_file(presentation_id)
+
+    def _delete_orphans(self):
+        """Delete pooled copies of the template that no process will hand out or clean up"""
+        try:
+            files = self.service_factory().list_files_with_property(POOL_PROPERTY, self.template_id)
+        except Exception as e:
+            print(f"Warning: Could not list pooled Slides copies: {e}")
+            return
+        with self._lock:
+            pooled = {presentation_id for presentation_id, _ in self._copies}
+
+        now = time.time()
+        orphans = []
+        for file in files:
+            properties = file.get("appProperties") or {}
+            try:
+                expires = float(properties[EXPIRES_PROPERTY])
+            except (KeyError, ValueError):
+                continue
+            own = properties.get(OWNER_PROPERTY) == self.owner_id
+            if own and file["id"] in pooled:
+                continue
+            if now - expires >= (self.orphan_grace if own else self.orphan_age):
+                orphans.append(file["id"])
+        self.orphans += len(orphans)
+        self._delete(orphans)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            ready = len(self._copies)
+        return {
+            "enabled": self.enabled,
+            "ready": ready,
+            "target": self.target_size() if self.enabled else 0,
+            "hits": self.hits,
+            "misses": self.misses,
+            "created": self.created,
+            "expired": self.expired,
+            "failures": self.failures,
+            "orphans": self.orphans
+        }
+
+
+slides_copy_pool = SlidesCopyPool(
+    os.getenv("GOOGLE_SLIDES_TEMPLATE_ID"),
+    SLIDES_COPY_POOL_MIN,
+    SLIDES_COPY_POOL_MAX,
+    SLIDES_COPY_POOL_TTL,
+    SLIDES_COPY_POOL_LEAD,
+    SLIDES_COPY_POOL_WINDOW,
+    SLIDES_COPY_POOL_INTERVAL
+)
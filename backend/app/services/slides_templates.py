@@ -0,0 +1,99 @@
+import os
+import json
+import time
+import threading
+from typing import Any, Dict, Optional, Tuple
+
+from app.database import SessionLocal
+from app.models.slides_template import SlidesTemplateLayout
+
+# Seconds a template's Drive revision is trusted before it is checked again
+SLIDES_TEMPLATE_CHECK_INTERVAL = float(os.getenv("SLIDES_TEMPLATE_CHECK_INTERVAL", "60"))
+
+
+class SlidesTemplateLayouts:
+    """
+    Layout of each Google Slides template, read once per Drive revision
+    A Drive copy keeps the template's slide and element object ids, so the
+    layout found in the template applies to every copy made from it and exports
+    no longer fetch and scan the copy. Layouts are kept in memory and in the
+    slides_template_layouts table, keyed on template id and revision; the
+    revision itself is re-read at most every SLIDES_TEMPLATE_CHECK_INTERVAL.
+    """
+
+    def __init__(self, check_interval: float):
+        self.check_interval = check_interval
+        self._lock = threading.Lock()
+        # template id -> lock held while that template's revision is re-checked
+        self._template_locks: Dict[str, threading.Lock] = {}
+        # template id -> (revision, layout, monotonic time the revision was confirmed)
+        self._layouts: Dict[str, Tuple[str, Dict[str, Any], float]] = {}
+        self.hits = 0
+        self.revision_checks = 0
+        self.db_hits = 0
+        self.analyses = 0
+
+    def layout(self, service, template_id: str) -> Dict[str, Any]:
+        """The template's current layout, analysing the template only when its revision is new"""
+        cached = self._layouts.get(template_id)
+        if cached and time.monotonic() - cached[2] < self.check_interval:
+            self.hits += 1
+            return cached[1]
+
+        # One thread per template re-checks; the others wait for its answer,
+        # while lookups for other templates go ahead
+        with self._lock:
+            template_lock = self._template_locks.setdefault(template_id, threading.Lock())
+        with template_lock:
+            cached = self._layouts.get(template_id)
+            if cached and time.monotonic() - cached[2] < self.check_interval:
+                self.hits += 1
+                return cached[1]
+
+            revision = service.get_file_revision(template_id)
+            self.revision_checks += 1
+            if cached and cached[0] == revision:
+                layout = cached[1]
+            else:
+                layout = self._db_get(template_id, revision)
+                if layout is not None:
+                    self.db_hits += 1
+                else:
+                    layout = service.find_template_layout(service.get_presentation_slides(template_id))
+                    self.analyses += 1
+                    self._db_put(template_id, revision, layout)
+            self._layouts[template_id] = (revision, layout, time.monotonic())
+            return layout
+
+    def invalidate(self, template_id: str):
+        """Forget the in-memory layout so the next export re-checks the template"""
+        self._layouts.pop(template_id, None)
+
+    def _db_get(self, template_id: str, revision: str) -> Optional[Dict[str, Any]]:
+        try:
+            with SessionLocal() as db:
+                row = db.get(SlidesTemplateLayout, (template_id, revision))
+                return json.loads(row.layout) if row else None
+        except Exception as e:
+            print(f"Warning: Could not read cached template layout: {e}")
+            return None
+
+    def _db_put(self, template_id: str, revision: str, layout: Dict[str, Any]):
+        try:
+            with SessionLocal() as db:
+                db.merge(SlidesTemplateLayout(template_id=template_id, revision=revision, layout=json.dumps(layout)))
+                db.commit()
+        except Exception as e:
+            print(f"Warning: Could not store template layout: {e}")
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "templates": len(self._layouts),
+            "hits": self.hits,
+            "revision_checks": self.revision_checks,
+            "db_hits": self.db_hits,
+            "analyses": self.analyses
+        }
+
+
+slides_template_layouts = SlidesTemplateLayouts(SLIDES_TEMPLATE_CHECK_INTERVAL)
@@ -0,0 +1,96 @@
+import json
+from typing import Any, Dict, List, Optional
+
+
+class IncrementalDocumentParser:
+    """
+    Scan a streamed JSON document and emit each section/slide as soon as it closes
+    Every character is looked at once and node text is collected as chunk slices,
+    so the cost stays linear in the size of the stream.
+    """
+
+    NODE_KEYS = {"sections": "section", "slides": "slide"}
+
+    def __init__(self):
+        self.nodes: List[Dict[str, Any]] = []
+        self.node_kind: Optional[str] = None
+
+        self._parts: List[str] = []  # every chunk, joined once at the end
+        self._stack: List[str] = []  # open '{' / '[' containers
+        self._in_string = False
+        self._escape = False
+        self._capture_key = False  # collecting a string that may be a root-level key
+        self._key_chars: List[str] = []
+        self._last_string: Optional[str] = None
+        self._current_key: Optional[str] = None
+        self._node_depth: Optional[int] = None  # stack depth of the sections/slides array
+        self._node_parts: Optional[List[str]] = None  # slices of the node being captured
+        self._node_index = 0
+
+    def feed(self, chunk: str) -> List[Dict[str, Any]]:
+        """Consume one chunk and return the events it completed"""
+        events = []
+        self._parts.append(chunk)
+        node_start = 0 if self._node_parts is not None else None
+
+        for i, ch in enumerate(chunk):
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif ch == "\\":
+                    self._escape = True
+                elif ch == '"':
+                    self._in_string = False
+                    if self._capture_key:
+                        self._last_string = "".join(self._key_chars)
+                elif self._capture_key:
+                    self._key_chars.append(ch)
+                continue
+
+            if ch == '"':
+                self._in_string = True
+                self._capture_key = len(self._stack) == 1
+                self._key_chars = []
+            elif ch == "{" or ch == "[":
+                if ch == "{" and self._node_depth is not None and len(self._stack) == self._node_depth:
+                    self._node_parts = []
+                    node_start = i
+                    events.append({"event": f"{self.node_kind}_started", "index": self._node_index})
+                self._stack.append(ch)
+                if ch == "[" and len(self._stack) == 2 and self._current_key in self.NODE_KEYS and self.node_kind is None:
+                    self.node_kind = self.NODE_KEYS[self._current_key]
+                    self._node_depth = 2
+            elif ch == "}" or ch == "]":
+                if self._stack:
+                    self._stack.pop()
+                if ch == "}" and self._node_parts is not None and len(self._stack) == self._node_depth:
+                    self._node_parts.append(chunk[node_start:i + 1])
+                    events.extend(self._complete_node("".join(self._node_parts)))
+                    self._node_parts = None
+                    node_start = None
+                elif ch == "]" and self._node_depth is not None and len(self._stack) == self._node_depth - 1:
+                    self._node_depth = None
+            elif ch == ":" and len(self._stack) == 1:
+                self._current_key = self._last_string
+            elif ch == "," and len(self._stack) == 1:
+                self._current_key = None
+
+        if self._node_parts is not None and node_start is not None:
+            self._node_parts.append(chunk[node_start:])
+        return events
+
+    def text(self) -> str:
+        """The full streamed text"""
+        return "".join(self._parts)
+
+    def _complete_node(self, node_text: str) -> List[Dict[str, Any]]:
+        index = self._node_index
+        self._node_index += 1
+        try:
+            node = json.loads(node_text)
+        except ValueError:
+            # Leave malformed nodes to the final full-document parse
+            return [{"event": f"{self.node_kind}_error", "index": index}]
+
+        self.nodes.append(node)
+        return [{"event": f"{self.node_kind}_complete", "index": index, self.node_kind: node}]
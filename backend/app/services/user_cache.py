@@ -0,0 +1,69 @@
+import os
+import time
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+from sqlalchemy import event
+
+from app.models.user import User
+
+AUTH_CACHE_TTL = float(os.getenv("AUTH_CACHE_TTL", "60"))  # seconds a cached user is trusted
+AUTH_CACHE_SIZE = int(os.getenv("AUTH_CACHE_SIZE", "10000"))
+
+# Columns copied into the cache; enough for every route and UserResponse
+USER_FIELDS = ("id", "email", "full_name", "is_active", "created_at", "updated_at")
+
+
+class UserCache:
+    """
+    Short-lived LRU of user records keyed by id
+    Authenticated requests read the user from here instead of the users table.
+    Entries are dropped when the row is updated or deleted in this process,
+    and expire after the TTL so changes made elsewhere are picked up.
+    """
+
+    def __init__(self, ttl: float, max_entries: int):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        # user id -> (expires_at monotonic, fields)
+        self._entries: "OrderedDict[int, Tuple[float, Dict[str, Any]]]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, user_id: int) -> Optional[User]:
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry is None or entry[0] < time.monotonic():
+                self._entries.pop(user_id, None)
+                self.misses += 1
+                return None
+            self._entries.move_to_end(user_id)
+            self.hits += 1
+            fields = entry[1]
+        return User(**fields)
+
+    def put(self, user: User):
+        fields = {name: getattr(user, name) for name in USER_FIELDS}
+        with self._lock:
+            self._entries[user.id] = (time.monotonic() + self.ttl, fields)
+            self._entries.move_to_end(user.id)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, user_id: int):
+        with self._lock:
+            self._entries.pop(user_id, None)
+
+    def stats(self) -> Dict[str, int]:
+        return {"entries": len(self._entries), "hits": self.hits, "misses": self.misses}
+
+
+user_cache = UserCache(AUTH_CACHE_TTL, AUTH_CACHE_SIZE)
+
+
+@event.listens_for(User, "after_update")
+@event.listens_for(User, "after_delete")
+def _invalidate_user(mapper, connection, target):
+    user_cache.invalidate(target.id)
@@ -0,0 +1,72 @@
+"""
+Compare building exports from a fresh template parse with cloning a preloaded one
+
+    cd backend && python benchmark_templates.py [--runs 50] [--template-dir DIR]
+"""
+import argparse
+import io
+import os
+import sys
+import time
+
+
+def _time(fn, runs: int) -> float:
+    """Average milliseconds per call"""
+    fn()  # warm up imports and caches
+    started = time.perf_counter()
+    for _ in range(runs):
+        fn()
+    return (time.perf_counter() - started) / runs * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=50)
+    parser.add_argument("--template-dir", help="Also benchmark the branded templates in this directory")
+    args = parser.parse_args()
+
+    if args.template_dir:
+        os.environ["EXPORT_TEMPLATE_DIR"] = args.template_dir
+    sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+    from docx import Document
+    from pptx import Presentation
+    from app.models.project import DocumentType
+    from app.services.export_templates import export_templates, _open_package
+    from app.services.file_exporter import FileExporter
+
+    export_templates.load()
+    content = {
+        DocumentType.DOCX: {
+            "title": "Benchmark",
+            "sections": [{"title": f"Section {i}", "content": ["Paragraph text."] * 3} for i in range(5)]
+        },
+        DocumentType.PPTX: {
+            "title": "Benchmark",
+            "slides": [{"title": f"Slide {i}", "bullets": ["Point one", "Point two"]} for i in range(5)]
+        }
+    }
+    fresh = {DocumentType.DOCX: Document, DocumentType.PPTX: Presentation}
+    builders = {DocumentType.DOCX: FileExporter._build_docx, DocumentType.PPTX: FileExporter._build_pptx_legacy}
+
+    print(f"{'template':<24}{'parse ms':>10}{'clone ms':>10}{'export ms':>11}")
+    for document_type in (DocumentType.DOCX, DocumentType.PPTX):
+        for name in export_templates.names(document_type):
+            path = export_templates._paths[document_type][name]
+            parse = _time(
+                (lambda: fresh[document_type]()) if path is None else (lambda: _open_package(document_type, path)),
+                args.runs
+            )
+            clone = _time(lambda: export_templates.clone(document_type, name), args.runs)
+
+            def export():
+                builders[document_type](content[document_type], name).save(io.BytesIO())
+
+            total = _time(export, args.runs)
+            print(f"{document_type.value + '/' + name:<24}{parse:>10.2f}{clone:>10.2f}{total:>11.2f}")
+
+    print("\nparse: what every export paid before; clone: what it pays now; export: full build and save")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,43 @@
+import os
+import tempfile
+import uuid
+
+import pytest
+from fastapi.testclient import TestClient
+
+# Point the app at a throwaway database and result directory before it is imported
+_tmp = tempfile.mkdtemp(prefix="oceanai_tests_")
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{os.path.join(_tmp, 'test.db')}")
+os.environ.setdefault("JOB_RESULTS_DIR", os.path.join(_tmp, "job_results"))
+os.environ.setdefault("EXPORT_CACHE_DIR", os.path.join(_tmp, "export_cache"))
+
+from app.database import upgrade_database  # noqa: E402
+
+upgrade_database()
+
+
+@pytest.fixture
+def client():
+    """A TestClient with the app's lifespan running"""
+    from app.main import app
+
+    with TestClient(app) as test_client:
+        yield test_client
+
+
+@pytest.fixture
+def login(client):
+    """Registers and logs in a user (a fresh one unless email is given); returns their token"""
+    def login_as(email: str = None) -> str:
+        email = email or f"user-{uuid.uuid4().hex[:8]}@example.com"
+        client.post("/api/auth/register", json={"email": email, "password": "secret123", "full_name": "Test"})
+        response = client.post("/api/auth/login", data={"username": email, "password": "secret123"})
+        return response.json()["access_token"]
+
+    return login_as
+
+
+@pytest.fixture
+def auth_headers(login):
+    """Authorization headers for a fresh user"""
+    return {"Authorization": f"Bearer {login()}"}
@@ -0,0 +1,10 @@
+def test_token_in_query_string_is_only_accepted_by_the_stream(client, login):
+    token = login()
+
+    assert client.get("/api/auth/me", headers={"Authorization": f"Bearer {token}"}).status_code == 200
+    assert client.get(f"/api/auth/me?token={token}").status_code == 401
+    assert client.get(f"/api/projects/?token={token}").status_code == 401
+
+    # Past authentication (no Gemini key here, so the generator is unavailable)
+    assert client.get(f"/api/projects/999999/generate/stream?token={token}").status_code not in (401, 422)
+    assert client.get("/api/projects/999999/generate/stream?token=bogus").status_code == 401
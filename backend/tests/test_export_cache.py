@@ -0,0 +1,38 @@
+import os
+
+from app.services.export_cache import ExportCache
+
+
+def test_unfinished_files_survive_clear_and_eviction(tmp_path):
+    cache = ExportCache(str(tmp_path), max_memory_bytes=0, max_disk_bytes=10)
+    in_flight = cache.temp_path()
+    with open(in_flight, "wb") as f:
+        f.write(b"x" * 100)
+
+    cache.put(1, "a", b"12345678")
+    cache.put(2, "b", b"12345678")  # over the limit: evicts "a", not the file being written
+    assert os.path.exists(in_flight)
+    assert cache._disk_bytes == 8
+
+    cache.clear()
+    assert os.path.exists(in_flight)
+    assert cache._disk_bytes == 0
+
+
+def test_invalidate_project_removes_only_that_project(tmp_path):
+    cache = ExportCache(str(tmp_path), max_memory_bytes=0, max_disk_bytes=1000)
+    cache.put(1, "a", b"one")
+    cache.put(12, "b", b"twelve")
+
+    cache.invalidate_project(1)
+    assert cache.get(1, "a") is None
+    assert cache.get(12, "b") == b"twelve"
+
+
+def test_index_is_rebuilt_from_disk(tmp_path):
+    ExportCache(str(tmp_path), max_memory_bytes=0, max_disk_bytes=1000).put(3, "c", b"three")
+
+    restarted = ExportCache(str(tmp_path), max_memory_bytes=0, max_disk_bytes=1000)
+    restarted.invalidate_project(3)
+    assert restarted.get(3, "c") is None
+    assert restarted._disk_bytes == 0
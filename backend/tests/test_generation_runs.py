@@ -0,0 +1,74 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+from app.models.project import DocumentType
+from app.services.document_generator import DocumentGenerator
+from app.services.generation_runs import GenerationRunRegistry
+
+
+class _FailingStreamModel:
+    """Streams the start of a document, then fails the way a dropped connection does"""
+    model_name = "fake-model"
+
+    async def generate_content_async(self, prompt, stream=False):
+        async def chunks():
+            yield SimpleNamespace(text='{"sections": [{"title": "Intro", "content": ["Hello"]}')
+            raise ConnectionError("stream reset")
+        return chunks()
+
+
+def _run_events(events):
+    """Run a generation through the registry; returns the events it logged and what it stored"""
+    stored = []
+
+    async def scenario():
+        registry = GenerationRunRegistry()
+
+        async def on_complete(content):
+            stored.append(content)
+
+        run = registry.create(1, 1, events, on_complete)
+        while not run.done:
+            await asyncio.sleep(0.01)
+        logged = [data for _, data in run.events]
+        await registry.stop()
+        return logged
+
+    return asyncio.run(scenario()), stored
+
+
+def test_partial_document_is_not_saved():
+    async def events():
+        yield {"status": "complete", "content": {"sections": [{"title": "Intro"}]}, "partial": True}
+
+    logged, stored = _run_events(events())
+    assert len(logged) == 1
+    assert stored == []
+
+
+def test_complete_document_is_saved():
+    async def events():
+        yield {"status": "complete", "content": {"sections": []}}
+
+    _, stored = _run_events(events())
+    assert stored == [{"sections": []}]
+
+
+def test_failed_stream_raises_instead_of_yielding_error_text():
+    generator = DocumentGenerator({document_type: _FailingStreamModel() for document_type in DocumentType})
+
+    async def consume():
+        return [chunk async for chunk in generator.generate_document_stream("Topic", DocumentType.DOCX)]
+
+    with pytest.raises(Exception, match="stream reset"):
+        asyncio.run(consume())
+
+
+def test_failed_generation_logs_an_error_and_saves_nothing():
+    generator = DocumentGenerator({document_type: _FailingStreamModel() for document_type in DocumentType})
+    logged, stored = _run_events(generator._generate_single_events("Topic", DocumentType.DOCX))
+    assert stored == []
+    assert '"error"' in logged[-1]
+    assert not any("Error:" in data for data in logged[:-1])
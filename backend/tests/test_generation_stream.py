@@ -0,0 +1,53 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+
+from app.api import projects as projects_api
+from app.api.projects import get_generator
+from app.main import app
+
+
+class _CountingGenerator:
+    """Streams a one-slide deck and counts how many generations were started"""
+
+    def __init__(self):
+        self.started = 0
+
+    async def generate_document_events(self, topic, document_type, mode, use_cache=True):
+        self.started += 1
+        await asyncio.sleep(0.1)
+        yield {"status": "complete", "content": {"type": "pptx", "slides": [{"title": "Only", "bullets": []}]}}
+
+
+def test_streams_opened_together_share_one_generation(client, login, monkeypatch):
+    generator = _CountingGenerator()
+    load_project = projects_api._load_project
+    arrived = []
+
+    async def slow_load(db, project_id, owner_id):
+        # Hold each request inside the load until both have passed the first check
+        arrived.append(project_id)
+        for _ in range(100):
+            if len(arrived) >= 2:
+                break
+            await asyncio.sleep(0.01)
+        return await load_project(db, project_id, owner_id)
+
+    token = login()
+    project_id = client.post(
+        "/api/projects/", json={"title": "Deck", "topic": "t", "document_type": "pptx"},
+        headers={"Authorization": f"Bearer {token}"}
+    ).json()["id"]
+
+    app.dependency_overrides[get_generator] = lambda: generator
+    monkeypatch.setattr(projects_api, "_load_project", slow_load)
+    try:
+        url = f"/api/projects/{project_id}/generate/stream?token={token}"
+        with ThreadPoolExecutor(2) as pool:
+            responses = list(pool.map(lambda _: client.get(url), range(2)))
+    finally:
+        app.dependency_overrides.pop(get_generator, None)
+
+    assert generator.started == 1
+    for response in responses:
+        assert response.status_code == 200
+        assert '"status": "complete"' in response.text
@@ -0,0 +1,113 @@
+import asyncio
+from datetime import datetime, timedelta
+
+from app.database import SessionLocal
+from app.models.job import Job, JobStatus
+from app.services.job_queue import JobOutcome, JobQueue
+
+
+async def _wait_for(predicate, timeout: float = 5.0):
+    deadline = asyncio.get_running_loop().time() + timeout
+    while not predicate():
+        if asyncio.get_running_loop().time() > deadline:
+            raise AssertionError("condition not reached")
+        await asyncio.sleep(0.01)
+
+
+def _job(job_id: str) -> Job:
+    with SessionLocal() as db:
+        return db.get(Job, job_id)
+
+
+def _queue_with_handlers() -> JobQueue:
+    queue = JobQueue(concurrency=1, max_pending=10)
+
+    async def block(job, report_progress):
+        report_progress(0.5)
+        await asyncio.sleep(3600)
+
+    async def finish(job, report_progress):
+        return JobOutcome(result={"ok": True})
+
+    queue.register("block", block)
+    queue.register("finish", finish)
+    return queue
+
+
+def test_shutdown_while_job_running_returns_and_fails_the_job():
+    async def scenario():
+        queue = _queue_with_handlers()
+        await queue.start()
+        with SessionLocal() as db:
+            job_id = queue.submit(db, "block", owner_id=1).id
+        await _wait_for(lambda: queue.running_count() == 1)
+
+        await asyncio.wait_for(queue.stop(), timeout=5)
+        return job_id
+
+    job = _job(asyncio.run(scenario()))
+    assert job.status == JobStatus.FAILED.value
+    assert job.error == "Interrupted by server shutdown"
+
+
+def test_cancelled_job_leaves_worker_running():
+    async def scenario():
+        queue = _queue_with_handlers()
+        await queue.start()
+        with SessionLocal() as db:
+            blocked_id = queue.submit(db, "block", owner_id=1).id
+            next_id = queue.submit(db, "finish", owner_id=1).id
+        await _wait_for(lambda: queue.running_count() == 1)
+
+        with SessionLocal() as db:
+            queue.cancel(db, db.get(Job, blocked_id))
+        await _wait_for(lambda: _job(next_id).status == JobStatus.SUCCEEDED.value)
+        await asyncio.wait_for(queue.stop(), timeout=5)
+        return blocked_id, next_id
+
+    blocked_id, next_id = asyncio.run(scenario())
+    assert _job(blocked_id).status == JobStatus.CANCELLED.value
+    assert _job(next_id).result == {"ok": True}
+
+
+def test_recovery_only_fails_jobs_whose_process_stopped():
+    now = datetime.utcnow()
+    with SessionLocal() as db:
+        live = Job(
+            id="live-sibling", kind="block", status=JobStatus.RUNNING.value, owner_id=1,
+            worker_id="other-process", started_at=now, heartbeat_at=now
+        )
+        dead = Job(
+            id="dead-process", kind="block", status=JobStatus.RUNNING.value, owner_id=1,
+            worker_id="gone", started_at=now - timedelta(hours=1), heartbeat_at=now - timedelta(hours=1)
+        )
+        db.add_all([live, dead])
+        db.commit()
+
+    async def scenario():
+        queue = _queue_with_handlers()
+        await queue.start()
+        await queue.stop()
+
+    asyncio.run(scenario())
+    assert _job("live-sibling").status == JobStatus.RUNNING.value
+    assert _job("dead-process").status == JobStatus.FAILED.value
+
+
+def test_cancel_from_another_process_stops_the_job_at_its_next_heartbeat():
+    async def scenario():
+        queue = _queue_with_handlers()
+        elsewhere = _queue_with_handlers()  # the process that received the cancel request
+        await queue.start()
+        with SessionLocal() as db:
+            job_id = queue.submit(db, "block", owner_id=1).id
+        await _wait_for(lambda: queue.running_count() == 1)
+
+        with SessionLocal() as db:
+            assert elsewhere.cancel(db, db.get(Job, job_id)).cancel_requested
+        await queue._check_in()
+        await _wait_for(lambda: _job(job_id).status == JobStatus.CANCELLED.value)
+        await asyncio.wait_for(queue.stop(), timeout=5)
+        return job_id
+
+    assert _job(asyncio.run(scenario())).status == JobStatus.CANCELLED.value
@@ -0,0 +1,16 @@
+def test_refine_job_rejects_a_section_index_outside_the_document(client, auth_headers):
+    project_id = client.post(
+        "/api/projects/", json={"title": "Doc", "topic": "t", "document_type": "docx"}, headers=auth_headers
+    ).json()["id"]
+    sections = [{"title": f"Section {i}", "content": ["text"]} for i in range(3)]
+    client.patch(
+        f"/api/projects/{project_id}/content", json={"content": {"type": "docx", "sections": sections}}, headers=auth_headers
+    )
+
+    for section_index in (3, -1, "1"):
+        response = client.post("/api/jobs/", json={
+            "kind": "refine",
+            "project_id": project_id,
+            "params": {"refinement_prompt": "shorter", "section_index": section_index}
+        }, headers=auth_headers)
+        assert response.status_code == 400
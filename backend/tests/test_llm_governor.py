@@ -0,0 +1,102 @@
+import asyncio
+
+from app.services import llm_governor as governor_module
+from app.services.llm_governor import LLMGovernor
+
+
+class _Stream:
+    """A streamed response whose first chunk is quick and whose remaining chunks are slow"""
+
+    def __init__(self, chunks, delay):
+        self.chunks = chunks
+        self.delay = delay
+
+    async def _generate(self):
+        for index, chunk in enumerate(self.chunks):
+            if index:
+                await asyncio.sleep(self.delay)
+            yield chunk
+
+    def __aiter__(self):
+        return self._generate()
+
+
+def test_cancelled_calls_release_their_slots():
+    async def scenario():
+        governor = LLMGovernor()
+
+        async def hang():
+            await asyncio.sleep(3600)
+
+        tasks = [asyncio.create_task(governor.run(hang)) for _ in range(3)]
+        await asyncio.sleep(0.05)
+        assert governor.in_flight == 3
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        return governor
+
+    governor = asyncio.run(scenario())
+    assert governor.in_flight == 0
+
+
+def test_cancelled_stream_releases_its_slot():
+    async def scenario():
+        governor = LLMGovernor()
+
+        async def respond():
+            return _Stream(["a", "b", "c"], delay=3600)
+
+        async def consume():
+            return [chunk async for chunk in governor.stream(respond)]
+
+        task = asyncio.create_task(consume())
+        await asyncio.sleep(0.05)
+        assert governor.in_flight == 1
+        task.cancel()
+        await asyncio.gather(task, return_exceptions=True)
+        return governor
+
+    governor = asyncio.run(scenario())
+    assert governor.in_flight == 0
+
+
+def test_long_stream_is_judged_by_time_to_first_chunk(monkeypatch):
+    monkeypatch.setattr(governor_module, "LLM_LATENCY_TARGET", 0.05)
+
+    async def scenario():
+        governor = LLMGovernor()
+        window = governor.window
+
+        async def respond():
+            return _Stream(["a", "b", "c"], delay=0.05)
+
+        chunks = [chunk async for chunk in governor.stream(respond)]
+        return governor, window, chunks
+
+    governor, window, chunks = asyncio.run(scenario())
+    assert chunks == ["a", "b", "c"]
+    assert governor.latency_spikes == 0
+    assert governor.window > window
+
+
+def test_slow_whole_calls_do_not_shrink_the_window_without_a_target(monkeypatch):
+    monkeypatch.setattr(governor_module, "LLM_LATENCY_TARGET", 0.01)
+
+    async def scenario():
+        governor = LLMGovernor()
+        window = governor.window
+
+        async def slow():
+            await asyncio.sleep(0.05)
+            return "document"
+
+        assert await governor.run(slow) == "document"
+        grown = governor.window
+        await governor.run(slow, latency_target=0.01)
+        return governor, window, grown
+
+    governor, window, grown = asyncio.run(scenario())
+    assert grown > window
+    assert governor.latency_spikes == 1
+    assert governor.window < grown
@@ -0,0 +1,11 @@
+from app.api import metrics
+
+
+def test_metrics_need_the_configured_token(client, auth_headers, monkeypatch):
+    monkeypatch.setattr(metrics, "METRICS_TOKEN", None)
+    assert client.get("/api/metrics/llm", headers=auth_headers).status_code == 404
+
+    monkeypatch.setattr(metrics, "METRICS_TOKEN", "s3cret")
+    assert client.get("/api/metrics/llm").status_code == 401
+    assert client.get("/api/metrics/llm", headers={**auth_headers, "X-Metrics-Token": "wrong"}).status_code == 401
+    assert client.get("/api/metrics/exports", headers={"X-Metrics-Token": "s3cret"}).status_code == 200
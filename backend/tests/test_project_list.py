@@ -0,0 +1,49 @@
+import base64
+import json
+from datetime import datetime, timedelta
+
+from app.database import SessionLocal
+from app.models.project import DocumentType, Project
+from app.models.user import User
+
+
+def _user_id(email: str) -> int:
+    with SessionLocal() as db:
+        return db.query(User).filter(User.email == email).one().id
+
+
+def _add_project(owner_id: int, title: str, created_at: datetime, content: dict = None) -> int:
+    with SessionLocal() as db:
+        project = Project(title=title, topic="t", document_type=DocumentType.PPTX, owner_id=owner_id, created_at=created_at)
+        if content is not None:
+            # Stored whole, as rows written before project_nodes existed
+            project._content = json.dumps(content)
+        db.add(project)
+        db.commit()
+        return project.id
+
+
+def test_summary_counts_sections_of_documents_stored_whole(client, login):
+    headers = {"Authorization": f"Bearer {login('legacy-list@example.com')}"}
+    _add_project(
+        _user_id("legacy-list@example.com"), "Legacy", datetime.utcnow(),
+        {"type": "pptx", "slides": [{"title": "A"}, {"title": "B"}, {"title": "C"}]}
+    )
+    summary = client.get("/api/projects/", headers=headers).json()[0]
+    assert summary["title"] == "Legacy"
+    assert summary["section_count"] == 3
+
+
+def test_cursor_cannot_anchor_on_another_users_project(client, login):
+    headers = {"Authorization": f"Bearer {login('cursor-b@example.com')}"}
+    login("cursor-a@example.com")
+    owner_b = _user_id("cursor-b@example.com")
+    now = datetime.utcnow()
+    _add_project(owner_b, "b-old", now - timedelta(days=3))
+    _add_project(owner_b, "b-new", now - timedelta(days=1))
+    foreign = _add_project(_user_id("cursor-a@example.com"), "a", now - timedelta(days=2))
+
+    cursor = base64.urlsafe_b64encode(f"p{foreign}".encode()).decode().rstrip("=")
+    titles = [p["title"] for p in client.get(f"/api/projects/?cursor={cursor}", headers=headers).json()]
+    # The foreign project's timestamp is not used: both of b's (older id) projects follow
+    assert titles == ["b-new", "b-old"]
@@ -0,0 +1,57 @@
+import json
+
+from sqlalchemy import event
+
+from app.database import SessionLocal
+from app.models.project import Project
+from app.models.project_node import ProjectNode
+
+
+def _add_deck(client, headers) -> int:
+    project_id = client.post(
+        "/api/projects/", json={"title": "Deck", "topic": "t", "document_type": "pptx"}, headers=headers
+    ).json()["id"]
+    slides = [{"title": f"Slide {i}", "bullets": [str(i)]} for i in range(5)]
+    client.patch(
+        f"/api/projects/{project_id}/content", json={"content": {"type": "pptx", "slides": slides}}, headers=headers
+    )
+    return project_id
+
+
+def test_node_read_and_write_load_only_that_node(client, auth_headers):
+    loaded = []
+
+    def count(target, context):
+        loaded.append(target.position)
+
+    project_id = _add_deck(client, auth_headers)
+    event.listen(ProjectNode, "load", count)
+    try:
+        response = client.get(f"/api/projects/{project_id}/nodes/3", headers=auth_headers)
+        assert response.json()["body"]["title"] == "Slide 3"
+        response = client.patch(
+            f"/api/projects/{project_id}/nodes/2", json={"body": {"title": "Edited", "bullets": []}}, headers=auth_headers
+        )
+        assert response.json()["title"] == "Edited"
+    finally:
+        event.remove(ProjectNode, "load", count)
+
+    assert loaded == [3, 2]
+    assert client.get(f"/api/projects/{project_id}/nodes/9", headers=auth_headers).status_code == 404
+
+
+def test_node_read_splits_a_document_stored_whole(client, auth_headers):
+    project_id = client.post(
+        "/api/projects/", json={"title": "Legacy", "topic": "t", "document_type": "docx"}, headers=auth_headers
+    ).json()["id"]
+    with SessionLocal() as db:
+        # Stored whole, as rows written before project_nodes existed
+        db.get(Project, project_id)._content = json.dumps(
+            {"type": "docx", "sections": [{"title": "A", "content": []}, {"title": "B", "content": []}]}
+        )
+        db.commit()
+
+    response = client.get(f"/api/projects/{project_id}/nodes/1", headers=auth_headers)
+    assert response.json()["body"]["title"] == "B"
+    with SessionLocal() as db:
+        assert db.query(ProjectNode).filter(ProjectNode.project_id == project_id).count() == 2
@@ -0,0 +1,75 @@
+import asyncio
+import json
+from types import SimpleNamespace
+
+import pytest
+
+from app.models.project import DocumentType
+from app.services.document_generator import DocumentGenerator, RefinementNotApplied
+
+
+class _ReplyModel:
+    """Answers every prompt with the same canned text"""
+    model_name = "fake-model"
+
+    def __init__(self, text):
+        self.text = text
+
+    async def generate_content_async(self, prompt, stream=False):
+        return SimpleNamespace(text=self.text)
+
+
+DECK = {"type": "pptx", "slides": [{"title": f"Slide {i}", "bullets": [str(i)]} for i in range(1, 4)]}
+REFINED = {"title": "Better", "bullets": ["new"]}
+
+
+def _refine(reply, indices=(1,)):
+    generator = DocumentGenerator({DocumentType.PPTX: _ReplyModel(reply)})
+    return asyncio.run(generator.refine_sections(DECK, "improve it", DocumentType.PPTX, list(indices)))
+
+
+@pytest.mark.parametrize("reply", [
+    json.dumps({"2": REFINED}),
+    json.dumps([REFINED]),
+    "```json\n" + json.dumps([REFINED]) + "\n```",
+    json.dumps({"slides": [REFINED]}),
+])
+def test_documented_reply_shapes_update_the_target(reply):
+    slides = _refine(reply)["slides"]
+    assert slides[1] == REFINED
+    assert slides[0] == DECK["slides"][0] and slides[2] == DECK["slides"][2]
+
+
+def test_reply_that_updates_nothing_is_an_error():
+    with pytest.raises(RefinementNotApplied):
+        _refine(json.dumps({"3": REFINED}))
+    with pytest.raises(RefinementNotApplied):
+        _refine(json.dumps({"slides": []}))
+
+
+TITLED = {"slides": [{"title": t} for t in ["Introduction", "Tone", "Market Overview", "Overview", "Next Steps"]]}
+
+
+@pytest.mark.parametrize("prompt, targets", [
+    ("shorten slide 1 to 3 bullets", [0]),
+    ("shorten section 1 to 30 words", [0]),
+    ("rewrite slides 2 to 4", [1, 2, 3]),
+    ("rewrite slide 2 to slide 4", [1, 2, 3]),
+    ("fix slides 2-3", [1, 2]),
+    ("slides 1, 3 and 5 need sources", [0, 2, 4]),
+    ("the last slide needs a summary", [4]),
+    ('rewrite "next steps" as a checklist', [4]),
+    ("expand the market overview", [2]),
+])
+def test_targets_named_in_the_prompt(prompt, targets):
+    assert DocumentGenerator.infer_refinement_targets(prompt, TITLED) == targets
+
+
+@pytest.mark.parametrize("prompt", [
+    "Make the whole document's tone more formal",
+    "Add an introductory paragraph",
+    "make every slide punchier",
+    "use a friendlier tone in the introduction",
+])
+def test_document_wide_or_ambiguous_prompts_refine_everything(prompt):
+    assert DocumentGenerator.infer_refinement_targets(prompt, TITLED) == []
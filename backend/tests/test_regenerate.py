@@ -0,0 +1,31 @@
+from app.api.projects import get_generator
+from app.main import app
+
+
+class _RecordingGenerator:
+    """Returns a new deck on every call and records whether the cache was allowed"""
+
+    def __init__(self):
+        self.use_cache = []
+
+    async def generate_document(self, topic, document_type, mode, use_cache=True):
+        self.use_cache.append(use_cache)
+        return {"type": "pptx", "slides": [{"title": f"Version {len(self.use_cache)}", "bullets": []}]}
+
+
+def test_regenerating_a_project_skips_the_generation_cache(client, auth_headers):
+    generator = _RecordingGenerator()
+    app.dependency_overrides[get_generator] = lambda: generator
+    try:
+        project_id = client.post(
+            "/api/projects/", json={"title": "Deck", "topic": "t", "document_type": "pptx"}, headers=auth_headers
+        ).json()["id"]
+
+        for _ in range(2):
+            response = client.post(f"/api/projects/{project_id}/generate", json={}, headers=auth_headers)
+            assert response.status_code == 200
+    finally:
+        app.dependency_overrides.pop(get_generator, None)
+
+    assert generator.use_cache == [True, False]
+    assert "Version 2" in response.json()["generated_content"]
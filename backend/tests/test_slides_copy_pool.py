@@ -0,0 +1,98 @@
+import asyncio
+import threading
+import time
+
+from app.services.slides_copy_pool import (
+    SlidesCopyPool,
+    POOL_COPY_NAME,
+    POOL_PROPERTY,
+    OWNER_PROPERTY,
+    EXPIRES_PROPERTY,
+)
+
+
+class FakeDrive:
+    """Local stand-in for the Drive calls the pool makes; files live in a dict"""
+
+    def __init__(self):
+        self.files = {}
+        self.copies = 0
+        self._lock = threading.Lock()
+
+    def create_presentation_from_template(self, title, template_id, app_properties=None):
+        with self._lock:
+            self.copies += 1
+            file_id = f"copy{self.copies}"
+            self.files[file_id] = {"name": title, "appProperties": dict(app_properties or {})}
+        return file_id
+
+    def delete_file(self, file_id):
+        with self._lock:
+            self.files.pop(file_id, None)
+
+    def list_files_with_property(self, key, value):
+        with self._lock:
+            return [
+                {"id": file_id, "appProperties": dict(file["appProperties"])}
+                for file_id, file in self.files.items()
+                if file["appProperties"].get(key) == value
+            ]
+
+    def add_pooled(self, file_id, owner, expires):
+        self.files[file_id] = {
+            "name": POOL_COPY_NAME,
+            "appProperties": {POOL_PROPERTY: "tpl", OWNER_PROPERTY: owner, EXPIRES_PROPERTY: str(int(expires))},
+        }
+
+
+def _pool(drive, **overrides):
+    settings = dict(min_size=2, max_size=4, ttl=60, lead=60, window=600, interval=10, owner_id="me")
+    settings.update(overrides)
+    return SlidesCopyPool("tpl", service_factory=lambda: drive, **settings)
+
+
+def test_take_uses_a_ready_copy_and_refill_tops_the_pool_up():
+    drive = FakeDrive()
+    pool = _pool(drive)
+    asyncio.run(pool.replenish_once())
+    assert pool.stats()["ready"] == 2
+    assert all(f["appProperties"][OWNER_PROPERTY] == "me" for f in drive.files.values())
+
+    first = pool.take("Deck", "tpl")
+    assert first in drive.files and pool.hits == 1
+    assert pool.take("Other", "another-template") != first
+    assert pool.stats()["ready"] == 1
+
+    asyncio.run(pool.replenish_once())
+    assert pool.stats()["ready"] == 2
+
+
+def test_expired_copies_are_deleted_not_handed_out():
+    drive = FakeDrive()
+    pool = _pool(drive, ttl=0.05)
+    asyncio.run(pool.replenish_once())
+    stale = set(drive.files)
+    time.sleep(0.1)
+
+    taken = pool.take("Deck", "tpl")
+    assert taken not in stale and pool.misses == 1
+
+    asyncio.run(pool.replenish_once())
+    assert not stale & set(drive.files)
+    assert pool.expired == 2
+
+
+def test_orphan_sweep_leaves_other_workers_live_copies_alone():
+    drive = FakeDrive()
+    now = time.time()
+    drive.add_pooled("peer-fresh", "peer", now + 30)
+    drive.add_pooled("peer-expired", "peer", now - 120)
+    drive.add_pooled("peer-dead", "peer", now - 7200)
+    drive.add_pooled("mine-leaked", "me", now - 120)
+    drive.add_pooled("mine-in-use", "me", now - 5)
+
+    pool = _pool(drive, min_size=0, orphan_grace=60, orphan_age=3600)
+    asyncio.run(pool.replenish_once())
+
+    assert set(drive.files) == {"peer-fresh", "peer-expired", "mine-in-use"}
+    assert pool.orphans == 2
@@ -0,0 +1,40 @@
+import threading
+
+from app.services.slides_templates import SlidesTemplateLayouts
+
+
+class _BlockingService:
+    """Holds revision checks of the "slow" template until released"""
+
+    def __init__(self):
+        self.release = threading.Event()
+        self.checking = threading.Event()
+
+    def get_file_revision(self, template_id):
+        if template_id == "slow":
+            self.checking.set()
+            self.release.wait(5)
+        return f"{template_id}-rev"
+
+    def get_presentation_slides(self, template_id):
+        return []
+
+    def find_template_layout(self, slides):
+        return {"slides": len(slides)}
+
+
+def test_a_slow_template_check_does_not_block_other_templates():
+    service = _BlockingService()
+    layouts = SlidesTemplateLayouts(check_interval=60)
+    slow = threading.Thread(target=layouts.layout, args=(service, "slow"))
+    slow.start()
+    try:
+        assert service.checking.wait(5)
+        fast = threading.Thread(target=layouts.layout, args=(service, "fast"))
+        fast.start()
+        fast.join(2)
+        assert not fast.is_alive()
+    finally:
+        service.release.set()
+        slow.join(5)
+    assert layouts.revision_checks == 2
@@ -122,10 +122,12 @@ export default function ProjectDetail() {
         saveVersion()
 
         try {
+            // Regenerating must not be answered from the generation cache
             const updatedProject = await projectApi.generateDocument(
                 parseInt(id),
                 project.topic,
-                project.document_type
+                project.document_type,
+                !!project.generated_content
             )
             setProject(updatedProject)
             setStreamedContent(updatedProject.generated_content ? JSON.parse(updatedProject.generated_content) : '')
@@ -84,8 +84,17 @@ export const projectApi = {
   },
 
   getProjects: async (): Promise<Project[]> => {
-    const response = await api.get<Project[]>('/api/projects')
-    return response.data
+    // Summaries only, following the keyset cursor until the last page
+    const projects: Project[] = []
+    let cursor: string | undefined
+    do {
+      const response = await api.get<Project[]>('/api/projects', {
+        params: { view: 'summary', limit: 200, cursor },
+      })
+      projects.push(...response.data)
+      cursor = response.headers['x-next-cursor']
+    } while (cursor)
+    return projects
   },
 
   getProject: async (id: number): Promise<Project> => {
@@ -93,18 +102,20 @@ export const projectApi = {
     return response.data
   },
 
-  generateDocument: async (id: number, topic?: string, document_type?: string): Promise<Project> => {
+  generateDocument: async (id: number, topic?: string, document_type?: string, bypassCache = false): Promise<Project> => {
     const response = await api.post<Project>(`/api/projects/${id}/generate`, {
       project_id: id,
       topic,
-      document_type
+      document_type,
+      bypass_cache: bypassCache
     })
     return response.data
   },
 
-  refineDocument: async (id: number, refinementPrompt: string): Promise<Project> => {
+  refineDocument: async (id: number, refinementPrompt: string, sectionIndex?: number): Promise<Project> => {
     const response = await api.post<Project>(`/api/projects/${id}/refine`, {
       refinement_prompt: refinementPrompt,
+      section_index: sectionIndex,
     })
     return response.data
   },
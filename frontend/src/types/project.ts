@@ -4,6 +4,8 @@ export interface Project {
   topic: string
   document_type: 'docx' | 'pptx'
   generated_content?: string
+  content_size?: number
+  section_count?: number
   owner_id: number
   created_at: string
   updated_at?: string